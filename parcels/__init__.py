@@ -6,6 +6,7 @@ from parcels.particle import *  # noqa
 from parcels.collection import *  # noqa
 from parcels.particleset import *  # noqa
 from parcels.particlefile import *  # noqa
+from parcels.analytics import *  # noqa
 from parcels.field import *  # noqa
 from parcels.particleset import *  # noqa
 from parcels.kernel import *  # noqa
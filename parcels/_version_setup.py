@@ -0,0 +1 @@
+version = '2.3.0'
@@ -0,0 +1,208 @@
+"""Module for analytics that are accumulated on the fly while a ParticleSet is executed"""
+from abc import ABC
+from abc import abstractmethod
+from datetime import timedelta as delta
+
+import numpy as np
+from scipy.sparse import coo_matrix
+
+from parcels.collection.collectionsoa import _to_write_particles
+from parcels.grid import GridCode
+try:
+    from mpi4py import MPI
+except:
+    MPI = None
+
+__all__ = ['BaseAnalytics', 'ParticleBinning', 'TransitionMatrix']
+
+
+def bin_indices(values, edges):
+    """Returns the flat index of the bin that each set of values falls in, or -1 if outside the bins.
+
+    :param values: list of arrays of particle values, one per dimension of the bins
+    :param edges: list of arrays of monotonically increasing bin edges, one per dimension of the bins.
+                  Like in np.histogramdd, the last edge is included in the last bin
+    """
+    flat = np.zeros(len(values[0]), dtype=np.int64)
+    valid = np.ones(len(values[0]), dtype=bool)
+    for vals, edg in zip(values, edges):
+        nbins = len(edg) - 1
+        index = np.searchsorted(edg, vals, side='right') - 1
+        index[vals == edg[-1]] = nbins - 1
+        valid &= (index >= 0) & (index < nbins)
+        flat = flat * nbins + index
+    return np.where(valid, flat, -1)
+
+
+class BaseAnalytics(ABC):
+    """Base class for analytics that are sampled at every outputdt of :meth:`ParticleSet.execute`,
+    as given through its `analytics` argument, instead of writing the trajectories to a ParticleFile.
+
+    Each MPI rank accumulates the particles it holds; the results are reduced over all ranks
+    at the end of each execute.
+
+    :param outputdt: Interval at which the ParticleSet is sampled.
+                     It is either a timedelta object or a positive double.
+    """
+
+    def __init__(self, outputdt):
+        self.outputdt = outputdt.total_seconds() if isinstance(outputdt, delta) else outputdt
+        assert self.outputdt is not None and self.outputdt > 0, 'outputdt must be positive'
+        self.lasttime_sampled = None
+        self.nsamples = 0
+
+    def sample(self, pset, time):
+        """Samples the particles of a ParticleSet at a time, unless this time has already been sampled"""
+        time = time.total_seconds() if isinstance(time, delta) else time
+        if self.lasttime_sampled == time:
+            return
+        if not isinstance(pset.collection._data, dict):
+            raise NotImplementedError('Analytics are only implemented for SoA ParticleSets')
+        data = pset.collection._data
+        self.accumulate(data, np.where(_to_write_particles(data, time))[0], time)
+        self.lasttime_sampled = time
+        self.nsamples += 1
+
+    @abstractmethod
+    def accumulate(self, data, indices, time):
+        """Adds the particles `indices` of the SoA particle data `data`, sampled at `time`, to the local result"""
+        pass
+
+    @abstractmethod
+    def reduce(self):
+        """Combines the local results of all MPI ranks into the results of these analytics"""
+        pass
+
+    @staticmethod
+    def allreduce(local):
+        """Returns the sum of an array over all MPI ranks"""
+        if MPI and MPI.COMM_WORLD.Get_size() > 1:
+            total = np.empty_like(local)
+            MPI.COMM_WORLD.Allreduce(local, total, op=MPI.SUM)
+            return total
+        return local.copy()
+
+
+class ParticleBinning(BaseAnalytics):
+    """Histogram of particle positions on a 2D (lat, lon) or 3D (depth, lat, lon) grid of bins,
+    accumulated at every outputdt during :meth:`ParticleSet.execute`.
+
+    The histogram of all samples, summed over the MPI ranks, is in `counts`; `mean` is that histogram
+    averaged over the number of samples.
+
+    :param lon_edges: Monotonically increasing edges of the bins in longitude (or x)
+    :param lat_edges: Monotonically increasing edges of the bins in latitude (or y)
+    :param depth_edges: Optional monotonically increasing edges of the bins in depth, for a 3D histogram
+    :param weight: Optional name of the particle Variable to weigh each particle with. Default is None,
+                   resulting in a weight of 1 for each particle
+    :param outputdt: Interval at which the particles are binned.
+                     It is either a timedelta object or a positive double.
+    """
+
+    def __init__(self, lon_edges, lat_edges, depth_edges=None, weight=None, outputdt=None):
+        super(ParticleBinning, self).__init__(outputdt)
+        self.variables = ['lat', 'lon'] if depth_edges is None else ['depth', 'lat', 'lon']
+        self.edges = [np.asarray(e, dtype=np.float64) for e in [depth_edges, lat_edges, lon_edges] if e is not None]
+        self.weight = weight
+        self.shape = tuple(len(e) - 1 for e in self.edges)
+        self._local_counts = np.zeros(self.shape, dtype=np.float64)
+        self.counts = np.zeros(self.shape, dtype=np.float64)
+
+    def accumulate(self, data, indices, time):
+        flat = bin_indices([data[v][indices] for v in self.variables], self.edges)
+        valid = flat >= 0
+        weights = None if self.weight is None else data[self.weight][indices][valid]
+        self._local_counts += np.bincount(flat[valid], weights=weights, minlength=self._local_counts.size).reshape(self.shape)
+
+    def reduce(self):
+        self.counts = self.allreduce(self._local_counts)
+
+    @property
+    def mean(self):
+        return self.counts / max(self.nsamples, 1)
+
+
+class TransitionMatrix(BaseAnalytics):
+    """Sparse connectivity matrix between regions, accumulated at every outputdt during
+    :meth:`ParticleSet.execute`.
+
+    The source region of each particle is recorded the first time it is sampled. At every sample,
+    the particle is then counted in the (source, destination, lag) entry of the matrix, where
+    destination is the region it is in and lag the number of outputdt since its source was recorded.
+    Particles outside of all regions (region id < 0) are not counted.
+
+    The (source, destination, lag) entries with a non-zero count, summed over the MPI ranks,
+    are in the `source`, `destination`, `lag` and `count` arrays; see also :meth:`matrix`.
+
+    :param regions: :mod:`parcels.field.Field` on a rectilinear grid with the integer region id of each grid cell.
+                    The region of a particle is that of the nearest grid point (of the first time and depth level)
+    :param outputdt: Interval at which the particles are sampled.
+                     It is either a timedelta object or a positive double.
+    """
+
+    def __init__(self, regions, outputdt=None):
+        super(TransitionMatrix, self).__init__(outputdt)
+        if regions.grid.gtype not in [GridCode.RectilinearZGrid, GridCode.RectilinearSGrid]:
+            raise NotImplementedError('TransitionMatrix is only implemented for regions on a rectilinear grid')
+        data = np.asarray(regions.data)
+        data = data.reshape((-1,) + data.shape[-2:])[0]
+        self.region_ids = np.where(np.isfinite(data), data, -1).astype(np.int64)
+        self.nregions = int(self.region_ids.max()) + 1
+        self._lon_mid = 0.5 * (regions.grid.lon[1:] + regions.grid.lon[:-1])
+        self._lat_mid = 0.5 * (regions.grid.lat[1:] + regions.grid.lat[:-1])
+        # sorted particle ids with the source region and time at which that was recorded
+        self._ids = np.empty(0, dtype=np.int64)
+        self._sources = np.empty(0, dtype=np.int64)
+        self._starttimes = np.empty(0, dtype=np.float64)
+        self._local_keys = np.empty(0, dtype=np.int64)
+        self._local_counts = np.empty(0, dtype=np.int64)
+        self.source, self.destination, self.lag, self.count = [np.empty(0, dtype=np.int64) for _ in range(4)]
+
+    def region(self, lon, lat):
+        """Returns the region id at each of the (lon, lat) locations, vectorized"""
+        xi = np.searchsorted(self._lon_mid, lon)
+        yi = np.searchsorted(self._lat_mid, lat)
+        return self.region_ids[yi, xi]
+
+    def accumulate(self, data, indices, time):
+        ids = data['id'][indices].astype(np.int64)
+        regions = self.region(data['lon'][indices], data['lat'][indices])
+
+        pos = np.searchsorted(self._ids, ids)
+        known = pos < len(self._ids)
+        known[known] = self._ids[pos[known]] == ids[known]
+        if not np.all(known):
+            ids_all = np.concatenate((self._ids, ids[~known]))
+            order = np.argsort(ids_all)
+            self._ids = ids_all[order]
+            self._sources = np.concatenate((self._sources, regions[~known]))[order]
+            self._starttimes = np.concatenate((self._starttimes, np.full(np.count_nonzero(~known), time)))[order]
+            pos = np.searchsorted(self._ids, ids)
+
+        sources = self._sources[pos]
+        lags = np.rint(np.abs(time - self._starttimes[pos]) / self.outputdt).astype(np.int64)
+        counted = (sources >= 0) & (regions >= 0)
+        keys = (lags[counted] * self.nregions + sources[counted]) * self.nregions + regions[counted]
+        self._local_keys, self._local_counts = self._sum_by_key(np.concatenate((self._local_keys, keys)),
+                                                                np.concatenate((self._local_counts, np.ones(keys.size, dtype=np.int64))))
+
+    @staticmethod
+    def _sum_by_key(keys, counts):
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        return unique_keys, np.bincount(inverse, weights=counts, minlength=unique_keys.size).astype(np.int64)
+
+    def reduce(self):
+        keys, counts = self._local_keys, self._local_counts
+        if MPI and MPI.COMM_WORLD.Get_size() > 1:
+            gathered = MPI.COMM_WORLD.allgather((keys, counts))
+            keys, counts = self._sum_by_key(np.concatenate([g[0] for g in gathered]), np.concatenate([g[1] for g in gathered]))
+        self.destination = keys % self.nregions
+        self.source = (keys // self.nregions) % self.nregions
+        self.lag = keys // (self.nregions * self.nregions)
+        self.count = counts
+
+    def matrix(self, lag):
+        """Returns the (source x destination) scipy.sparse matrix of particle counts after `lag` outputdt"""
+        select = self.lag == lag
+        return coo_matrix((self.count[select], (self.source[select], self.destination[select])),
+                          shape=(self.nregions, self.nregions))
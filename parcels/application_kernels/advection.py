@@ -1,11 +1,11 @@
 """Collection of pre-built advection kernels"""
 import math
 
-from parcels.tools.statuscodes import OperationCode
+from parcels.tools.statuscodes import ErrorCode, OperationCode
 
 
 __all__ = ['AdvectionRK4', 'AdvectionEE', 'AdvectionRK45', 'AdvectionRK4_3D',
-           'AdvectionAnalytical']
+           'AdvectionAnalytical', 'AdvectionDormandPrince']
 
 
 def AdvectionRK4(particle, fieldset, time):
@@ -103,6 +103,86 @@ def AdvectionRK45(particle, fieldset, time):
         return OperationCode.Repeat
 
 
+def AdvectionDormandPrince(particle, fieldset, time):
+    """Advection of particles using adaptive Dormand-Prince 5(4) integration.
+
+    Unlike AdvectionRK45, step-size control happens inside the kernel: the particle
+    is advanced over the full particle.dt in sub-steps, and a rejected sub-step is
+    retried here without returning OperationCode.Repeat, so the other kernels are
+    not re-executed. The last stage of an accepted sub-step is reused as the first
+    stage of the next one (FSAL), and sub-step sizes are chosen by a PI controller.
+    The step size proposed after the last sub-step is used as the next particle.dt.
+    The error tolerance is 1e-5 * dt, as in AdvectionRK45."""
+    rk45tol = 1e-5
+    h = particle.dt
+    t_done = 0.
+    lon = particle.lon
+    lat = particle.lat
+    kappa_prev = 1e-4
+    last_step = False
+    (u1, v1) = fieldset.UV[particle]
+    while True:
+        h_step = h
+        if math.fabs(h) >= math.fabs(particle.dt - t_done):
+            h_step = particle.dt - t_done
+            last_step = True
+        t = time + t_done
+        lon2 = lon + h_step * (1./5.) * u1
+        lat2 = lat + h_step * (1./5.) * v1
+        (u2, v2) = fieldset.UV[t + h_step * (1./5.), particle.depth, lat2, lon2, particle]
+        lon3 = lon + h_step * ((3./40.) * u1 + (9./40.) * u2)
+        lat3 = lat + h_step * ((3./40.) * v1 + (9./40.) * v2)
+        (u3, v3) = fieldset.UV[t + h_step * (3./10.), particle.depth, lat3, lon3, particle]
+        lon4 = lon + h_step * ((44./45.) * u1 - (56./15.) * u2 + (32./9.) * u3)
+        lat4 = lat + h_step * ((44./45.) * v1 - (56./15.) * v2 + (32./9.) * v3)
+        (u4, v4) = fieldset.UV[t + h_step * (4./5.), particle.depth, lat4, lon4, particle]
+        lon5 = lon + h_step * ((19372./6561.) * u1 - (25360./2187.) * u2 + (64448./6561.) * u3 - (212./729.) * u4)
+        lat5 = lat + h_step * ((19372./6561.) * v1 - (25360./2187.) * v2 + (64448./6561.) * v3 - (212./729.) * v4)
+        (u5, v5) = fieldset.UV[t + h_step * (8./9.), particle.depth, lat5, lon5, particle]
+        lon6 = lon + h_step * ((9017./3168.) * u1 - (355./33.) * u2 + (46732./5247.) * u3 + (49./176.) * u4 - (5103./18656.) * u5)
+        lat6 = lat + h_step * ((9017./3168.) * v1 - (355./33.) * v2 + (46732./5247.) * v3 + (49./176.) * v4 - (5103./18656.) * v5)
+        (u6, v6) = fieldset.UV[t + h_step, particle.depth, lat6, lon6, particle]
+        lon7 = lon + h_step * ((35./384.) * u1 + (500./1113.) * u3 + (125./192.) * u4 - (2187./6784.) * u5 + (11./84.) * u6)
+        lat7 = lat + h_step * ((35./384.) * v1 + (500./1113.) * v3 + (125./192.) * v4 - (2187./6784.) * v5 + (11./84.) * v6)
+        (u7, v7) = fieldset.UV[t + h_step, particle.depth, lat7, lon7, particle]
+
+        # difference between the embedded 5th and 4th order solutions
+        err_lon = h_step * ((71./57600.) * u1 - (71./16695.) * u3 + (71./1920.) * u4 - (17253./339200.) * u5 + (22./525.) * u6 - (1./40.) * u7)
+        err_lat = h_step * ((71./57600.) * v1 - (71./16695.) * v3 + (71./1920.) * v4 - (17253./339200.) * v5 + (22./525.) * v6 - (1./40.) * v7)
+        kappa = math.sqrt(math.pow(err_lon, 2) + math.pow(err_lat, 2)) / math.fabs(h_step * rk45tol)
+
+        # PI step-size controller, with the growth factor limited to [0.2, 5]
+        fac = 5.
+        if kappa > 0:
+            fac = 0.9 * math.pow(kappa, -0.17) * math.pow(kappa_prev, 0.04)
+        if fac > 5.:
+            fac = 5.
+        if fac < 0.2 or math.isnan(kappa):
+            fac = 0.2
+        if kappa <= 1.:
+            t_done += h_step
+            lon = lon7
+            lat = lat7
+            u1 = u7  # first-same-as-last: the last stage is the first stage of the next sub-step
+            v1 = v7
+            kappa_prev = kappa
+            if kappa_prev < 1e-4:
+                kappa_prev = 1e-4
+            h = h_step * fac
+            if last_step:
+                break
+        else:
+            if fac > 1.:
+                fac = 1.
+            h = h_step * fac
+            last_step = False
+            if math.fabs(h) < math.fabs(particle.dt) * 1e-10:
+                return ErrorCode.Error
+    particle.lon = lon
+    particle.lat = lat
+    particle.update_next_dt(h)
+
+
 def AdvectionAnalytical(particle, fieldset, time):
     """Advection of particles using 'analytical advection' integration
 
@@ -127,26 +207,46 @@ def AdvectionAnalytical(particle, fieldset, time):
     xsi, eta, zeta, xi, yi, zi = fieldset.U.search_indices(particle.lon, particle.lat, particle.depth, particle=particle)
     if withW:
         if abs(xsi - 1) < tol:
-            if fieldset.U.data[0, zi+1, yi+1, xi+1] > 0:
+            if direction * fieldset.U.data[0, zi+1, yi+1, xi+1] > 0:
                 xi += 1
                 xsi = 0
+        elif abs(xsi) < tol and xi > 0:
+            if direction * fieldset.U.data[0, zi+1, yi+1, xi] < 0:
+                xi -= 1
+                xsi = 1
         if abs(eta - 1) < tol:
-            if fieldset.V.data[0, zi+1, yi+1, xi+1] > 0:
+            if direction * fieldset.V.data[0, zi+1, yi+1, xi+1] > 0:
                 yi += 1
                 eta = 0
+        elif abs(eta) < tol and yi > 0:
+            if direction * fieldset.V.data[0, zi+1, yi, xi+1] < 0:
+                yi -= 1
+                eta = 1
         if abs(zeta - 1) < tol:
-            if fieldset.W.data[0, zi+1, yi+1, xi+1] > 0:
+            if direction * fieldset.W.data[0, zi+1, yi+1, xi+1] > 0:
                 zi += 1
                 zeta = 0
+        elif abs(zeta) < tol and zi > 0:
+            if direction * fieldset.W.data[0, zi, yi+1, xi+1] < 0:
+                zi -= 1
+                zeta = 1
     else:
         if abs(xsi - 1) < tol:
-            if fieldset.U.data[0, yi+1, xi+1] > 0:
+            if direction * fieldset.U.data[0, yi+1, xi+1] > 0:
                 xi += 1
                 xsi = 0
+        elif abs(xsi) < tol and xi > 0:
+            if direction * fieldset.U.data[0, yi+1, xi] < 0:
+                xi -= 1
+                xsi = 1
         if abs(eta - 1) < tol:
-            if fieldset.V.data[0, yi+1, xi+1] > 0:
+            if direction * fieldset.V.data[0, yi+1, xi+1] > 0:
                 yi += 1
                 eta = 0
+        elif abs(eta) < tol and yi > 0:
+            if direction * fieldset.V.data[0, yi, xi+1] < 0:
+                yi -= 1
+                eta = 1
 
     particle.xi[:] = xi
     particle.yi[:] = yi
@@ -161,7 +261,7 @@ def AdvectionAnalytical(particle, fieldset, time):
         py = np.array([grid.lat[yi, xi], grid.lat[yi, xi + 1], grid.lat[yi + 1, xi + 1], grid.lat[yi + 1, xi]])
     if grid.mesh == 'spherical':
         px[0] = px[0]+360 if px[0] < particle.lon-225 else px[0]
-        px[0] = px[0]-360 if px[0] > particle.lat+225 else px[0]
+        px[0] = px[0]-360 if px[0] > particle.lon+225 else px[0]
         px[1:] = np.where(px[1:] - px[0] > 180, px[1:]-360, px[1:])
         px[1:] = np.where(-px[1:] + px[0] > 180, px[1:]+360, px[1:])
     if withW:
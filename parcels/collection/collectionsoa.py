@@ -132,6 +132,7 @@ class ParticleCollectionSOA(ParticleCollection):
 
         self._ptype = pclass.getPType()
         self._data = {}
+        self._cstruct = None
         initialised = set()
 
         self._ncount = len(lon)
@@ -802,18 +803,25 @@ class ParticleCollectionSOA(ParticleCollection):
     def cstruct(self):
         """
         'cstruct' returns the ctypes mapping of the particle data. This depends on the specific structure in question.
+        The struct is kept between calls, and only the pointers of variables whose array has been reallocated
+        (e.g. after adding or removing particles) are updated.
         """
-        class CParticles(Structure):
-            _fields_ = [(v.name, POINTER(np.ctypeslib.as_ctypes_type(v.dtype))) for v in self._ptype.variables]
-
         def flatten_dense_data_array(vname):
             data_flat = self._data[vname].view()
             data_flat.shape = -1
             return np.ctypeslib.as_ctypes(data_flat)
 
-        cdata = [flatten_dense_data_array(v.name) for v in self._ptype.variables]
-        cstruct = CParticles(*cdata)
-        return cstruct
+        if self._cstruct is None:
+            class CParticles(Structure):
+                _fields_ = [(v.name, POINTER(np.ctypeslib.as_ctypes_type(v.dtype))) for v in self._ptype.variables]
+
+            self._cstruct = CParticles()
+            self._cstruct_arrays = {}
+        for v in self._ptype.variables:
+            if self._cstruct_arrays.get(v.name) is not self._data[v.name]:
+                setattr(self._cstruct, v.name, flatten_dense_data_array(v.name))
+                self._cstruct_arrays[v.name] = self._data[v.name]
+        return self._cstruct
 
     def toDictionary(self, pfile, time, deleted_only=False):
         """
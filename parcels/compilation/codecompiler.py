@@ -8,6 +8,27 @@ except:
     MPI = None
 
 
+# Optimisation flags of the named compiler profiles for JIT kernels. The 'fast' profiles
+# keep NaN and inf semantics, as Parcels relies on them to detect land and unset values
+compiler_profiles = {'debug': ['-g', '-O0'],
+                     'default': ['-g', '-O3'],
+                     'fast': ['-O3', '-ffast-math', '-fno-finite-math-only', '-flto'],
+                     'native': ['-O3', '-ffast-math', '-fno-finite-math-only', '-flto', '-march=native']}
+
+
+def get_compiler_profile(profile=None):
+    """Return the name of the compiler optimisation profile to use for JIT kernels
+
+    :param profile: Name of the profile (one of the keys of `compiler_profiles`).
+           If None, the environment variable ``PARCELS_COMPILER_PROFILE`` is used,
+           and 'default' if that is not set either"""
+    if profile is None:
+        profile = os.getenv('PARCELS_COMPILER_PROFILE', 'default')
+    if profile not in compiler_profiles:
+        raise ValueError("Unknown compiler profile '%s'; choose from %s" % (profile, list(compiler_profiles.keys())))
+    return profile
+
+
 class Compiler_parameters(object):
     def __init__(self):
         self._compiler = ""
@@ -63,7 +84,7 @@ class Compiler_parameters(object):
 
 
 class GNU_parameters(Compiler_parameters):
-    def __init__(self, cppargs=None, ldargs=None, incdirs=None, libdirs=None, libs=None):
+    def __init__(self, cppargs=None, ldargs=None, incdirs=None, libdirs=None, libs=None, profile='default'):
         super(GNU_parameters, self).__init__()
         if cppargs is None:
             cppargs = []
@@ -99,12 +120,13 @@ class GNU_parameters(Compiler_parameters):
             mpicc = "mpiCC" if mpicc is None and os._exists("mpiCC") else None
             os.system("%s --version" % (mpicc))
         self._compiler = mpicc if MPI and mpicc is not None else cc_env if cc_env is not None else "gcc"
-        opt_flags = ['-g', '-O3']
+        opt_flags = compiler_profiles[profile]
         arch_flag = ['-m64' if calcsize("P") == 8 else '-m32']
         self._cppargs = ['-Wall', '-fPIC', '-std=gnu11']
         self._cppargs += Iflags
         self._cppargs += opt_flags + cppargs + arch_flag
         self._ldargs = ['-shared']
+        self._ldargs += [f for f in opt_flags if f == '-flto']
         self._ldargs += Lflags
         self._ldargs += lflags
         self._ldargs += ldargs
@@ -273,9 +295,10 @@ class GNUCompiler_SS(CCompiler_SS):
 
     :arg cppargs: A list of arguments to pass to the C compiler
          (optional).
-    :arg ldargs: A list of arguments to pass to the linker (optional)."""
-    def __init__(self, cppargs=None, ldargs=None, incdirs=None, libdirs=None, libs=None, tmp_dir=os.getcwd()):
-        c_params = GNU_parameters(cppargs, ldargs, incdirs, libdirs, libs)
+    :arg ldargs: A list of arguments to pass to the linker (optional).
+    :arg profile: Name of the optimisation profile, see `compiler_profiles` (optional)."""
+    def __init__(self, cppargs=None, ldargs=None, incdirs=None, libdirs=None, libs=None, tmp_dir=os.getcwd(), profile='default'):
+        c_params = GNU_parameters(cppargs, ldargs, incdirs, libdirs, libs, profile=profile)
         super(GNUCompiler_SS, self).__init__(c_params.compiler, cppargs=c_params.cppargs, ldargs=c_params.ldargs, incdirs=c_params.incdirs, libdirs=c_params.libdirs, libs=c_params.libs, tmp_dir=tmp_dir)
         self._dynlib_ext = c_params.dynlib_ext
         self._stclib_ext = c_params.stclib_ext
@@ -5,6 +5,7 @@ import collections
 import math
 import numpy as np
 import random
+import re
 from copy import copy
 
 import cgen as c
@@ -46,6 +47,8 @@ class FieldSetNode(IntrinsicNode):
         elif isinstance(getattr(self.obj, attr), VectorField):
             return VectorFieldNode(getattr(self.obj, attr),
                                    ccode="%s->%s" % (self.ccode, attr))
+        elif attr == "sample":
+            return FieldSetSampleCallNode(self)
         else:
             return ConstNode(getattr(self.obj, attr),
                              ccode="%s" % (attr))
@@ -77,10 +80,30 @@ class FieldEvalNode(IntrinsicNode):
         self.convert = convert  # whether to convert the result (like field.applyConversion)
 
 
+class FieldSetSampleCallNode(IntrinsicNode):
+    def __init__(self, fieldset):
+        self.fieldset = fieldset
+        self.obj = fieldset.obj
+        self.ccode = ""
+
+
+class FieldSetSampleNode(IntrinsicNode):
+    def __init__(self, fields, args, var):
+        self.fields = fields
+        self.args = args
+        self.var = var  # the variables in which the interpolated fields are written
+
+
 class VectorFieldNode(IntrinsicNode):
     def __getitem__(self, attr):
         return VectorFieldEvalNode(self.obj, attr)
 
+    def __getattr__(self, attr):
+        if attr == "advect_analytical":
+            return AdvectionAnalyticalCallNode(self)
+        else:
+            raise AttributeError("Access to VectorField attribute %s is not (yet) implemented in JIT mode" % attr)
+
 
 class VectorFieldEvalNode(IntrinsicNode):
     def __init__(self, field, args, var, var2, var3):
@@ -91,6 +114,19 @@ class VectorFieldEvalNode(IntrinsicNode):
         self.var3 = var3  # third variable for UVW interpolation
 
 
+class AdvectionAnalyticalCallNode(IntrinsicNode):
+    def __init__(self, field):
+        self.field = field
+        self.obj = field.obj
+        self.ccode = ""
+
+
+class AdvectionAnalyticalNode(IntrinsicNode):
+    def __init__(self, field, args):
+        self.field = field
+        self.args = args  # the particle and the time
+
+
 class SummedFieldNode(IntrinsicNode):
     def __getitem__(self, attr):
         return SummedFieldEvalNode(self.obj, attr)
@@ -220,7 +256,11 @@ class ObjectParticleAttributeNode(GenericParticleAttributeNode):
 
 class ArrayParticleAttributeNode(GenericParticleAttributeNode):
     def __init__(self, obj, attr):
-        ccode = "%s->%s[pnum]" % (obj.ccode, attr)
+        if attr in ['xi', 'yi', 'zi', 'ti']:
+            ccode = "%s->%s[pnum]" % (obj.ccode, attr)
+        else:
+            # held in a local copy for the duration of the kernel, see ArrayKernelGenerator
+            ccode = "__particle_%s" % attr
         super(ArrayParticleAttributeNode, self).__init__(obj, attr, ccode)
 
 
@@ -387,6 +427,16 @@ class IntrinsicTransformer(ast.NodeTransformer):
             self.stmt_stack = []
         return stmts
 
+    def visit_Expr(self, node):
+        node.value = self.visit(node.value)
+        if isinstance(node.value, IntrinsicNode) and getattr(node.value, 'ccode', None) == "return DELETE":
+            # particle.delete() ends the kernel like a return statement
+            return ast.Return(value=IntrinsicNode(None, ccode="DELETE"))
+        if isinstance(node.value, AdvectionAnalyticalNode):
+            # The native analytical advection is a statement by itself
+            return node.value
+        return node
+
     def visit_Call(self, node):
         node.func = self.visit(node.func)
         node.args = [self.visit(a) for a in node.args]
@@ -412,6 +462,28 @@ class IntrinsicTransformer(ast.NodeTransformer):
             self.stmt_stack += [FieldEvalNode(node.func.field, args, tmp, convert)]
             return ast.Name(id=tmp)
 
+        elif isinstance(node.func, FieldSetSampleCallNode):
+            names = node.args[0] if len(node.args) > 0 else None
+            names = [getattr(n, 'value', getattr(n, 's', None)) for n in names.elts] \
+                if isinstance(names, (ast.List, ast.Tuple)) else None
+            if names is None or not all(isinstance(n, str) for n in names):
+                raise NotImplementedError("fieldset.sample() in JIT mode requires a literal list of Field names")
+            fields = [getattr(node.func.obj, n) for n in names]
+            if not all(type(f) is Field for f in fields):
+                raise NotImplementedError("fieldset.sample() in JIT mode is only implemented for (scalar) Fields")
+            tmp = [self.get_tmp() for _ in fields]
+            if len(node.args) == 2:
+                args = node.args[1]
+            else:
+                args = ast.Index(value=ast.Tuple(node.args[1:], ast.Load()))
+            self.stmt_stack += [FieldSetSampleNode(fields, args, tmp)]
+            return ast.Tuple([ast.Name(id=t) for t in tmp], ast.Load())
+
+        elif isinstance(node.func, AdvectionAnalyticalCallNode):
+            if len(node.args) != 2 or not isinstance(node.args[0], ParticleNode):
+                raise NotImplementedError("advect_analytical() in JIT mode takes the particle and the time as arguments")
+            return AdvectionAnalyticalNode(node.func.field, node.args)
+
         return node
 
 
@@ -433,6 +505,91 @@ class TupleSplitter(ast.NodeTransformer):
         return node
 
 
+class FieldEvalDeduplicator(ast.NodeTransformer):
+    """AST transformer that removes repeated evaluations of the same Field at
+    identical (time, depth, lat, lon) in the straight-line part of a kernel, e.g.
+    when two concatenated kernels sample the same Field at the particle location.
+    A repeated evaluation is replaced by a copy of the earlier temporary, as long
+    as none of the variables its arguments depend on has been written in between."""
+
+    def visit_FunctionDef(self, node):
+        memo = {}
+        body = []
+        for stmt in node.body:
+            if isinstance(stmt, (FieldEvalNode, VectorFieldEvalNode)):
+                key, deps = self._eval_key(stmt)
+                variables = [stmt.var] if isinstance(stmt, FieldEvalNode) else [stmt.var, stmt.var2, stmt.var3]
+                if key in memo:
+                    body += [ast.Assign(targets=[ast.Name(id=var)], value=ast.Name(id=prev))
+                             for var, prev in zip(variables, memo[key][1]) if var is not None]
+                    continue
+                if key is not None:
+                    memo[key] = (deps, variables)
+            else:
+                written = self._written_vars(stmt)
+                if written is None:
+                    memo = {}
+                else:
+                    memo = {k: v for k, v in memo.items() if not (v[0] & written)}
+            body.append(stmt)
+        node.body = body
+        return node
+
+    def _eval_key(self, node):
+        deps = set()
+        try:
+            args = self._expr_key(node.args, deps)
+        except NotImplementedError:
+            return None, deps
+        return (type(node).__name__, id(node.field.obj), getattr(node, 'convert', True), args), deps
+
+    def _expr_key(self, node, deps):
+        if isinstance(node, ParticleNode):
+            deps.update([('particle', 'lon'), ('particle', 'lat'), ('particle', 'depth'), ('name', 'time')])
+            return 'particle'
+        elif isinstance(node, GenericParticleAttributeNode):
+            deps.add(('particle', node.attr))
+            return ('particle', node.attr)
+        elif isinstance(node, IntrinsicNode):
+            return ('intrinsic', node.ccode)
+        elif isinstance(node, ast.Name):
+            deps.add(('name', node.id))
+            return ('name', node.id)
+        elif isinstance(node, ast.Constant):
+            return ('const', repr(node.value))
+        elif isinstance(node, ast.Index):
+            return self._expr_key(node.value, deps)
+        elif isinstance(node, ast.Tuple):
+            return tuple(self._expr_key(e, deps) for e in node.elts)
+        elif isinstance(node, ast.BinOp):
+            return (type(node.op).__name__, self._expr_key(node.left, deps), self._expr_key(node.right, deps))
+        elif isinstance(node, ast.UnaryOp):
+            return (type(node.op).__name__, self._expr_key(node.operand, deps))
+        raise NotImplementedError
+
+    @staticmethod
+    def _written_vars(stmt):
+        """Return the set of variables written by a statement, or None if unknown"""
+        if isinstance(stmt, AdvectionAnalyticalNode):
+            return None
+        written = set()
+        for node in ast.walk(stmt):
+            if isinstance(node, (ast.Assign, ast.AugAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for t in targets:
+                    if isinstance(t, GenericParticleAttributeNode):
+                        written.add(('particle', t.attr))
+                    elif isinstance(t, ast.Name):
+                        written.add(('name', t.id))
+                    elif isinstance(t, ast.Subscript) and isinstance(t.value, ast.Name):
+                        written.add(('name', t.value.id))
+                    else:
+                        return None
+            elif isinstance(node, ast.Constant) and node.value == 'parcels_customed_Cfunc_pointer_args':
+                return None
+        return written
+
+
 class AbstractKernelGenerator(ABC, ast.NodeVisitor):
     """Code generator class that translates simple Python kernel
     functions into C functions by populating and accessing the `ccode`
@@ -441,6 +598,8 @@ class AbstractKernelGenerator(ABC, ast.NodeVisitor):
     # Intrinsic variables that appear as function arguments
     kernel_vars = ['particle', 'fieldset', 'time', 'output_time', 'tol']
     array_vars = []
+    # Statement that leaves the kernel if a call returned an error
+    checkstatus = "CHECKSTATUS(err)"
 
     def __init__(self, fieldset=None, ptype=JITParticle):
         self.fieldset = fieldset
@@ -457,6 +616,9 @@ class AbstractKernelGenerator(ABC, ast.NodeVisitor):
         # Untangle Pythonic tuple-assignment statements
         py_ast = TupleSplitter().visit(py_ast)
 
+        # Reuse repeated Field evaluations at identical locations
+        py_ast = FieldEvalDeduplicator().visit(py_ast)
+
         # Generate C-code for all nodes in the Python AST
         self.visit(py_ast)
         self.ccode = py_ast.ccode
@@ -553,7 +715,7 @@ class AbstractKernelGenerator(ABC, ast.NodeVisitor):
                     rhs = "%s(%s)" % (node.func.ccode, ccode_args)
                     if parcels_customed_Cfunc:
                         node.ccode = str(c.Block([c.Assign("err", rhs),
-                                                  c.Statement("CHECKSTATUS(err)")]))
+                                                  c.Statement(self.checkstatus)]))
                     else:
                         node.ccode = rhs
             except:
@@ -781,10 +943,28 @@ class AbstractKernelGenerator(ABC, ast.NodeVisitor):
     def visit_ConstNode(self, node):
         self.const_args[node.ccode] = node.obj
 
+    @staticmethod
+    def _group_sampled_fields(fields, variables):
+        """Groups the Fields of a FieldSetSampleNode that can be interpolated after a single index search"""
+        groups = collections.OrderedDict()
+        for fld, var in zip(fields, variables):
+            key = (id(fld.grid), fld.gridindexingtype, fld.time_periodic, fld.allow_time_extrapolation,
+                   fld.interp_method in ['bgrid_velocity', 'bgrid_w_velocity', 'bgrid_tracer'])
+            groups.setdefault(key, []).append((fld, var))
+        return list(groups.values())
+
     @abstractmethod
     def visit_FieldEvalNode(self, node):
         pass
 
+    @abstractmethod
+    def visit_FieldSetSampleNode(self, node):
+        pass
+
+    @abstractmethod
+    def visit_AdvectionAnalyticalNode(self, node):
+        pass
+
     @abstractmethod
     def visit_VectorFieldEvalNode(self, node):
         pass
@@ -843,6 +1023,14 @@ class AbstractKernelGenerator(ABC, ast.NodeVisitor):
 
 
 class ArrayKernelGenerator(AbstractKernelGenerator):
+    """Kernel generator for particles stored as structure-of-arrays.
+
+    The particle variables used by the kernel are copied into local variables
+    (``__particle_<name>``) on entry, so that they can be kept in registers for
+    the whole kernel, and only the ones that are written are stored back to the
+    particle arrays on exit. All exits therefore go through the `kernel_exit` label."""
+
+    checkstatus = "CHECKSTATUS_KERNEL(err)"
 
     def __init__(self, fieldset=None, ptype=JITParticle):
         super(ArrayKernelGenerator, self).__init__(fieldset, ptype)
@@ -850,7 +1038,7 @@ class ArrayKernelGenerator(AbstractKernelGenerator):
     @staticmethod
     def _check_FieldSamplingArguments(ccode):
         if ccode == 'particles':
-            args = ('time', 'particles->depth[pnum]', 'particles->lat[pnum]', 'particles->lon[pnum]')
+            args = ('time', '__particle_depth', '__particle_lat', '__particle_lon')
         elif ccode[-1] == 'particles':
             args = ccode[:-1]
         else:
@@ -884,9 +1072,24 @@ class ArrayKernelGenerator(AbstractKernelGenerator):
 
         # Create function body as C-code object
         body = [stmt.ccode for stmt in node.body if not (hasattr(stmt, 'value') and type(stmt.value) is ast.Str)]
-        body += [c.Statement("return SUCCESS")]
+        body_str = "\n".join([str(b) for b in body])
+        loads, stores = [], []
+        for v in self.ptype.variables:
+            if v.name in ['xi', 'yi', 'zi', 'ti'] or not re.search(r"\b__particle_%s\b" % v.name, body_str):
+                continue
+            loads += [c.Initializer(c.POD(v.dtype, "__particle_%s" % v.name), "particles->%s[pnum]" % v.name)]
+            if re.search(r"&\s*__particle_%s\b|\b__particle_%s\s*[-+*/%%]?=(?!=)" % (v.name, v.name), body_str):
+                stores += [c.Assign("particles->%s[pnum]" % v.name, "__particle_%s" % v.name)]
+        body = loads + body + [c.Assign("err", "SUCCESS")]
+        if "kernel_exit" in body_str or "CHECKSTATUS_KERNEL" in body_str:
+            body += [c.Line("kernel_exit:")]
+        body += stores + [c.Statement("return err")]
         node.ccode = c.FunctionBody(c.FunctionDeclaration(decl, args), c.Block(body))
 
+    def visit_Return(self, node):
+        self.visit(node.value)
+        node.ccode = c.Block([c.Assign("err", node.value.ccode), c.Statement("goto kernel_exit")])
+
     def visit_FieldEvalNode(self, node):
         self.visit(node.field)
         self.visit(node.args)
@@ -899,7 +1102,33 @@ class ArrayKernelGenerator(AbstractKernelGenerator):
             conv_stat = c.Statement("%s *= %s" % (node.var, ccode_conv))
             stmts += [conv_stat]
 
-        node.ccode = c.Block(stmts + [c.Statement("CHECKSTATUS(err)")])
+        node.ccode = c.Block(stmts + [c.Statement(self.checkstatus)])
+
+    def visit_FieldSetSampleNode(self, node):
+        for fld in node.fields:
+            self.field_args[fld.ccode_name] = fld
+        self.visit(node.args)
+        args = self._check_FieldSamplingArguments(node.args.ccode)
+        stmts = []
+        for group in self._group_sampled_fields(node.fields, node.var):
+            if len(group) == 1:
+                ccode_eval = group[0][0].ccode_eval_array(group[0][1], *args)
+            else:
+                ccode_eval = Field.ccode_eval_multi_array([fld for fld, _ in group], [var for _, var in group], *args)
+            stmts += [c.Assign("err", ccode_eval)]
+            stmts += [c.Statement("%s *= %s" % (var, fld.ccode_convert(*args))) for fld, var in group]
+            stmts += [c.Statement(self.checkstatus)]
+        node.ccode = c.Block(stmts)
+
+    def visit_AdvectionAnalyticalNode(self, node):
+        field = node.field.obj
+        for fld in [field.U, field.V, field.W]:
+            if fld is not None:
+                self.field_args[fld.ccode_name] = fld
+        for a in node.args:
+            self.visit(a)
+        ccode_advect = field.ccode_advect_analytical_array(node.args[1].ccode)
+        node.ccode = c.Block([c.Assign("err", ccode_advect), c.Statement(self.checkstatus)])
 
     def visit_VectorFieldEvalNode(self, node):
         self.visit(node.field)
@@ -919,7 +1148,7 @@ class ArrayKernelGenerator(AbstractKernelGenerator):
             statements.append(c.Statement("%s *= %s" % (node.var3, ccode_conv3)))
         conv_stat = c.Block(statements)
         node.ccode = c.Block([c.Assign("err", ccode_eval),
-                              conv_stat, c.Statement("CHECKSTATUS(err)")])
+                              conv_stat, c.Statement(self.checkstatus)])
 
     def visit_SummedFieldEvalNode(self, node):
         self.visit(node.fields)
@@ -930,7 +1159,7 @@ class ArrayKernelGenerator(AbstractKernelGenerator):
             ccode_eval = fld.ccode_eval_array(var, *args)
             ccode_conv = fld.ccode_convert(*args)
             conv_stat = c.Statement("%s *= %s" % (var, ccode_conv))
-            cstat += [c.Assign("err", ccode_eval), conv_stat, c.Statement("CHECKSTATUS(err)")]
+            cstat += [c.Assign("err", ccode_eval), conv_stat, c.Statement(self.checkstatus)]
         node.ccode = c.Block(cstat)
 
     def visit_SummedVectorFieldEvalNode(self, node):
@@ -952,7 +1181,7 @@ class ArrayKernelGenerator(AbstractKernelGenerator):
                 ccode_conv3 = fld.W.ccode_convert(*args)
                 statements.append(c.Statement("%s *= %s" % (var3, ccode_conv3)))
             cstat += [c.Assign("err", ccode_eval), c.Block(statements)]
-        cstat += [c.Statement("CHECKSTATUS(err)")]
+        cstat += [c.Statement(self.checkstatus)]
         node.ccode = c.Block(cstat)
 
     def visit_NestedFieldEvalNode(self, node):
@@ -966,8 +1195,8 @@ class ArrayKernelGenerator(AbstractKernelGenerator):
             conv_stat = c.Statement("%s *= %s" % (node.var, ccode_conv))
             cstat += [c.Assign("err", ccode_eval),
                       conv_stat,
-                      c.If("err != ERROR_OUT_OF_BOUNDS ", c.Block([c.Statement("CHECKSTATUS(err)"), c.Statement("break")]))]
-        cstat += [c.Statement("CHECKSTATUS(err)"), c.Statement("break")]
+                      c.If("err != ERROR_OUT_OF_BOUNDS ", c.Block([c.Statement(self.checkstatus), c.Statement("break")]))]
+        cstat += [c.Statement(self.checkstatus), c.Statement("break")]
         node.ccode = c.While("1==1", c.Block(cstat))
 
     def visit_NestedVectorFieldEvalNode(self, node):
@@ -990,8 +1219,8 @@ class ArrayKernelGenerator(AbstractKernelGenerator):
                 statements.append(c.Statement("%s *= %s" % (node.var3, ccode_conv3)))
             cstat += [c.Assign("err", ccode_eval),
                       c.Block(statements),
-                      c.If("err != ERROR_OUT_OF_BOUNDS ", c.Block([c.Statement("CHECKSTATUS(err)"), c.Statement("break")]))]
-        cstat += [c.Statement("CHECKSTATUS(err)"), c.Statement("break")]
+                      c.If("err != ERROR_OUT_OF_BOUNDS ", c.Block([c.Statement(self.checkstatus), c.Statement("break")]))]
+        cstat += [c.Statement(self.checkstatus), c.Statement("break")]
         node.ccode = c.While("1==1", c.Block(cstat))
 
 
@@ -1051,7 +1280,33 @@ class ObjectKernelGenerator(AbstractKernelGenerator):
             conv_stat = c.Statement("%s *= %s" % (node.var, ccode_conv))
             stmts += [conv_stat]
 
-        node.ccode = c.Block(stmts + [c.Statement("CHECKSTATUS(err)")])
+        node.ccode = c.Block(stmts + [c.Statement(self.checkstatus)])
+
+    def visit_FieldSetSampleNode(self, node):
+        for fld in node.fields:
+            self.field_args[fld.ccode_name] = fld
+        self.visit(node.args)
+        args = self._check_FieldSamplingArguments(node.args.ccode)
+        stmts = []
+        for group in self._group_sampled_fields(node.fields, node.var):
+            if len(group) == 1:
+                ccode_eval = group[0][0].ccode_eval_object(group[0][1], *args)
+            else:
+                ccode_eval = Field.ccode_eval_multi_object([fld for fld, _ in group], [var for _, var in group], *args)
+            stmts += [c.Assign("err", ccode_eval)]
+            stmts += [c.Statement("%s *= %s" % (var, fld.ccode_convert(*args))) for fld, var in group]
+            stmts += [c.Statement(self.checkstatus)]
+        node.ccode = c.Block(stmts)
+
+    def visit_AdvectionAnalyticalNode(self, node):
+        field = node.field.obj
+        for fld in [field.U, field.V, field.W]:
+            if fld is not None:
+                self.field_args[fld.ccode_name] = fld
+        for a in node.args:
+            self.visit(a)
+        ccode_advect = field.ccode_advect_analytical_object(node.args[1].ccode)
+        node.ccode = c.Block([c.Assign("err", ccode_advect), c.Statement(self.checkstatus)])
 
     def visit_VectorFieldEvalNode(self, node):
         self.visit(node.field)
@@ -1070,7 +1325,7 @@ class ObjectKernelGenerator(AbstractKernelGenerator):
             statements.append(c.Statement("%s *= %s" % (node.var3, ccode_conv3)))
         conv_stat = c.Block(statements)
         node.ccode = c.Block([c.Assign("err", ccode_eval),
-                              conv_stat, c.Statement("CHECKSTATUS(err)")])
+                              conv_stat, c.Statement(self.checkstatus)])
 
     def visit_SummedFieldEvalNode(self, node):
         self.visit(node.fields)
@@ -1081,7 +1336,7 @@ class ObjectKernelGenerator(AbstractKernelGenerator):
             ccode_eval = fld.ccode_eval_object(var, *args)
             ccode_conv = fld.ccode_convert(*args)
             conv_stat = c.Statement("%s *= %s" % (var, ccode_conv))
-            cstat += [c.Assign("err", ccode_eval), conv_stat, c.Statement("CHECKSTATUS(err)")]
+            cstat += [c.Assign("err", ccode_eval), conv_stat, c.Statement(self.checkstatus)]
         node.ccode = c.Block(cstat)
 
     def visit_SummedVectorFieldEvalNode(self, node):
@@ -1102,7 +1357,7 @@ class ObjectKernelGenerator(AbstractKernelGenerator):
                 ccode_conv3 = fld.W.ccode_convert(*args)
                 statements.append(c.Statement("%s *= %s" % (var3, ccode_conv3)))
             cstat += [c.Assign("err", ccode_eval), c.Block(statements)]
-        cstat += [c.Statement("CHECKSTATUS(err)")]
+        cstat += [c.Statement(self.checkstatus)]
         node.ccode = c.Block(cstat)
 
     def visit_NestedFieldEvalNode(self, node):
@@ -1116,8 +1371,8 @@ class ObjectKernelGenerator(AbstractKernelGenerator):
             conv_stat = c.Statement("%s *= %s" % (node.var, ccode_conv))
             cstat += [c.Assign("err", ccode_eval),
                       conv_stat,
-                      c.If("err != ERROR_OUT_OF_BOUNDS ", c.Block([c.Statement("CHECKSTATUS(err)"), c.Statement("break")]))]
-        cstat += [c.Statement("CHECKSTATUS(err)"), c.Statement("break")]
+                      c.If("err != ERROR_OUT_OF_BOUNDS ", c.Block([c.Statement(self.checkstatus), c.Statement("break")]))]
+        cstat += [c.Statement(self.checkstatus), c.Statement("break")]
         node.ccode = c.While("1==1", c.Block(cstat))
 
     def visit_NestedVectorFieldEvalNode(self, node):
@@ -1139,8 +1394,8 @@ class ObjectKernelGenerator(AbstractKernelGenerator):
                 statements.append(c.Statement("%s *= %s" % (node.var3, ccode_conv3)))
             cstat += [c.Assign("err", ccode_eval),
                       c.Block(statements),
-                      c.If("err != ERROR_OUT_OF_BOUNDS ", c.Block([c.Statement("CHECKSTATUS(err)"), c.Statement("break")]))]
-        cstat += [c.Statement("CHECKSTATUS(err)"), c.Statement("break")]
+                      c.If("err != ERROR_OUT_OF_BOUNDS ", c.Block([c.Statement(self.checkstatus), c.Statement("break")]))]
+        cstat += [c.Statement(self.checkstatus), c.Statement("break")]
         node.ccode = c.While("1==1", c.Block(cstat))
 
 
@@ -1152,7 +1407,13 @@ class LoopGenerator(object):
         self.fieldset = fieldset
         self.ptype = ptype
 
-    def generate(self, funcname, field_args, const_args, kernel_ast, c_include):
+    def generate(self, funcname, field_args, const_args, kernel_ast, c_include, analytical=False, batched=None):
+        """Generates the C code of the kernel and the particle loop around it
+
+        :param batched: VectorField (UV or UVW) of the built-in AdvectionRK4 or AdvectionRK4_3D kernel, for which
+               the particles are then advanced in blocks of PARCELS_BATCH_SIZE (see KernelSOA); None for the
+               particle-by-particle loop
+        """
         ccode = []
 
         pname = self.ptype.name + 'p'
@@ -1207,6 +1468,9 @@ class LoopGenerator(object):
             update_next_dt = str(c.FunctionBody(update_next_dt_decl, update_next_dt_body))
             ccode += [update_next_dt]
 
+        if batched is None:
+            ccode += [self.generate_output_functions()]
+
         if c_include:
             ccode += [c_include]
 
@@ -1214,9 +1478,16 @@ class LoopGenerator(object):
         ccode += [str(kernel_ast)]
 
         # Generate outer loop for repeated kernel invocation
+        # The loop resets the state of each particle to EVALUATE if reset_state is set (instead of a pass over
+        # the whole state array in Python), and returns the number of particles that end in another state than
+        # SUCCESS or EVALUATE, so that KernelSOA.execute only scans for deleted and error particles if there are any.
+        # In the particle-by-particle loop, each particle also stops at the noutputs output times
+        # output_t0 + k * outputdt (for k < noutputs) before endtime, where it is recorded into the output buffer
         args = [c.Value("int", "num_particles"),
                 c.Pointer(c.Value(pname, "particles")),
-                c.Value("double", "endtime"), c.Value("double", "dt")]
+                c.Value("double", "endtime"), c.Value("double", "dt"), c.Value("int", "reset_state"),
+                c.Value("int", "noutputs"), c.Value("double", "output_t0"), c.Value("double", "outputdt"),
+                c.Pointer(c.Value("unsigned char", "output_mask")), c.Pointer(c.Pointer(c.Value("void", "output_vars")))]
         for field, _ in field_args.items():
             args += [c.Pointer(c.Value("CField", "%s" % field))]
         for const, _ in const_args.items():
@@ -1226,14 +1497,26 @@ class LoopGenerator(object):
         # ==== statement clusters use to compose 'body' variable and variables 'time_loop' and 'part_loop' ==== ##
         sign_dt = c.Assign("sign_dt", "dt > 0 ? 1 : -1")
         particle_backup = c.Statement("%s particle_backup" % self.ptype.name)
-        sign_end_part = c.Assign("sign_end_part", "(endtime - particles->time[pnum]) > 0 ? 1 : -1")
+        # the end of the current stretch of time steps of the particle: the next output time, or endtime
+        pend = "endtime" if batched is not None else "__pend"
+        init_pend = c.Assign("__pend", "output_end(particles->time[pnum], endtime, sign_dt, noutputs, output_t0, outputdt, &__slot)")
+        # particles that start at an output time are recorded there in the first call of the loop
+        record_start = c.If("reset_state && (__slot = output_slot(particles->time[pnum], sign_dt, noutputs, output_t0, outputdt)) >= 0",
+                            c.Statement("record_output(particles, pnum, num_particles, __slot, output_mask, output_vars)"))
+        record_output = c.If("(res == SUCCESS) && (__slot >= 0) && is_close_dbl(particles->time[pnum], __pend)",
+                             c.Block([c.Statement("record_output(particles, pnum, num_particles, __slot, output_mask, output_vars)"),
+                                      init_pend]))
+        sign_end_part = c.Assign("sign_end_part", "(%s - particles->time[pnum]) > 0 ? 1 : -1" % pend)
         reset_res_state = c.Assign("res", "particles->state[pnum]")
         update_state = c.Assign("particles->state[pnum]", "res")
+        init_state = c.If("reset_state", c.Assign("particles->state[pnum]", "EVALUATE"))
+        count_flagged = c.If("(particles->state[pnum] != SUCCESS) && (particles->state[pnum] != EVALUATE)",
+                             c.Statement("++nflagged"))
         update_pdt = c.If("_next_dt_set == 1",
                           c.Block([c.Assign("_next_dt_set", "0"), c.Assign("particles->dt[pnum]", "_next_dt")]))
 
-        dt_pos = c.If("fabs(endtime - particles->time[pnum])<fabs(particles->dt[pnum])",
-                      c.Block([c.Assign("__dt", "fabs(endtime - particles->time[pnum])"), c.Assign("reset_dt", "1")]),
+        dt_pos = c.If("fabs(%s - particles->time[pnum])<fabs(particles->dt[pnum])" % pend,
+                      c.Block([c.Assign("__dt", "fabs(%s - particles->time[pnum])" % pend), c.Assign("reset_dt", "1")]),
                       c.Block([c.Assign("__dt", "fabs(particles->dt[pnum])"), c.Assign("reset_dt", "0")]))
         reset_dt = c.If("(reset_dt == 1) && is_equal_dbl(__pdt_prekernels, particles->dt[pnum])",
                         c.Block([c.Assign("particles->dt[pnum]", "dt")]))
@@ -1244,53 +1527,230 @@ class LoopGenerator(object):
 
         dt_0_break = c.If("is_zero_dbl(particles->dt[pnum])", c.Statement("break"))
 
-        notstarted_continue = c.If("(( sign_end_part != sign_dt) || is_close_dbl(__dt, 0) ) && !is_zero_dbl(particles->dt[pnum])",
-                                   c.Block([
-                                       c.If("fabs(particles->time[pnum]) >= fabs(endtime)",
-                                            c.Assign("particles->state[pnum]", "SUCCESS")),
-                                       c.Statement("continue")
-                                   ]))
+        def notstarted_continue(before_continue=()):
+            return c.If("(( sign_end_part != sign_dt) || is_close_dbl(__dt, 0) ) && !is_zero_dbl(particles->dt[pnum])",
+                        c.Block([
+                            c.If("fabs(particles->time[pnum]) >= fabs(endtime)",
+                                 c.Assign("particles->state[pnum]", "SUCCESS"))]
+                            + list(before_continue)
+                            + [c.Statement("continue")]))
 
         # ==== main computation body ==== #
-        body = [c.Statement("set_particle_backup(&particle_backup, particles, pnum)")]
+        body = [c.Statement("search_memo_reset()")]
+        body += [c.Statement("set_particle_backup(&particle_backup, particles, pnum)")]
         body += [pdt_eq_dt_pos]
         body += [partdt]
         body += [c.Value("StatusCode", "state_prev"), c.Assign("state_prev", "particles->state[pnum]")]
         body += [c.Assign("res", "%s(particles, pnum, %s)" % (funcname, fargs_str))]
         body += [c.If("(res==SUCCESS) && (particles->state[pnum] != state_prev)", c.Assign("res", "particles->state[pnum]"))]
-        body += [check_pdt]
-        body += [c.If("res == SUCCESS || res == DELETE", c.Block([c.Statement("particles->time[pnum] += particles->dt[pnum]"),
-                                                                  reset_dt,
-                                                                  update_pdt,
-                                                                  dt_pos,
-                                                                  sign_end_part,
-                                                                  c.If("(res != DELETE) && !is_close_dbl(__dt, 0) && (sign_dt == sign_end_part)",
-                                                                       c.Assign("res", "EVALUATE")),
-                                                                  c.If("sign_dt != sign_end_part", c.Assign("__dt", "0")),
-                                                                  update_state,
-                                                                  dt_0_break
-                                                                  ]),
-                      c.Block([c.Statement("get_particle_backup(&particle_backup, particles, pnum)"),
-                               dt_pos,
-                               sign_end_part,
-                               c.If("sign_dt != sign_end_part", c.Assign("__dt", "0")),
-                               update_state,
-                               c.Statement("break")])
+        if analytical:
+            # dt is set by the analytical advection itself, and reset after each step
+            update_pdt = c.Block([update_pdt, c.Assign("particles->dt[pnum]", "INFINITY")])
+        else:
+            body += [check_pdt]
+        success_block = [c.Statement("particles->time[pnum] += particles->dt[pnum]"),
+                         reset_dt,
+                         update_pdt]
+        if batched is None:
+            success_block += [record_output]
+        success_block += [dt_pos,
+                         sign_end_part,
+                         c.If("(res != DELETE) && !is_close_dbl(__dt, 0) && (sign_dt == sign_end_part)",
+                              c.Assign("res", "EVALUATE")),
+                         c.If("sign_dt != sign_end_part", c.Assign("__dt", "0")),
+                         update_state]
+        failure_block = [dt_pos,
+                         sign_end_part,
+                         c.If("sign_dt != sign_end_part", c.Assign("__dt", "0")),
+                         update_state]
+        body += [c.If("res == SUCCESS || res == DELETE", c.Block(success_block + [dt_0_break]),
+                      c.Block([c.Statement("get_particle_backup(&particle_backup, particles, pnum)")]
+                              + failure_block + [c.Statement("break")])
                       )]
 
-        time_loop = c.While("(particles->state[pnum] == EVALUATE || particles->state[pnum] == REPEAT) || is_zero_dbl(particles->dt[pnum])", c.Block(body))
-        part_loop = c.For("pnum = 0", "pnum < num_particles", "++pnum",
-                          c.Block([sign_end_part, reset_res_state, dt_pos, notstarted_continue, time_loop]))
-        fbody = c.Block([c.Value("int", "pnum, sign_dt, sign_end_part"),
-                         c.Value("StatusCode", "res"),
-                         c.Value("double", "reset_dt"),
-                         c.Value("double", "__pdt_prekernels"),
-                         c.Value("double", "__dt"),  # 1e-8 = built-in tolerance for np.isclose()
-                         sign_dt, particle_backup, part_loop])
-        fdecl = c.FunctionDeclaration(c.Value("void", "particle_loop"), args)
+        evaluate_cond = "(particles->state[pnum] == EVALUATE || particles->state[pnum] == REPEAT) || is_zero_dbl(particles->dt[pnum])"
+        if batched is not None:
+            ccode += [self.generate_batched_kernel(funcname, field_args, batched)]
+            # the particles of a block are advanced one step at a time together, for which the per-particle
+            # __dt and reset_dt are kept in arrays between the steps
+            load_batch = [c.Assign("pnum", "pblock + b"),
+                          c.Assign("__dt", "__dt_batch[b]"),
+                          c.Assign("reset_dt", "reset_dt_batch[b]")]
+            store_batch = [c.Assign("__dt_batch[b]", "__dt"),
+                           c.Assign("reset_dt_batch[b]", "reset_dt")]
+            init_loop = c.For("b = 0", "b < nb", "++b",
+                              c.Block([c.Assign("pnum", "pblock + b"),
+                                       c.Assign("active[b]", "0"),
+                                       init_state, sign_end_part, reset_res_state, dt_pos, notstarted_continue(),
+                                       c.Assign("active[b]", evaluate_cond)] + store_batch))
+            pre_loop = c.For("b = 0", "b < nb", "++b",
+                             c.Block([c.If("!active[b]", c.Statement("continue"))] + load_batch
+                                     + [c.Statement("set_particle_backup(&particle_backup[b], particles, pnum)"),
+                                        pdt_eq_dt_pos, partdt,
+                                        c.Assign("state_prev[b]", "particles->state[pnum]")]))
+            post_loop = c.For("b = 0", "b < nb", "++b",
+                              c.Block([c.If("!active[b]", c.Statement("continue"))] + load_batch
+                                      + [pdt_eq_dt_pos,
+                                         c.Assign("res", "res_batch[b]"),
+                                         c.If("(res==SUCCESS) && (particles->state[pnum] != state_prev[b])",
+                                              c.Assign("res", "particles->state[pnum]")),
+                                         check_pdt,
+                                         c.If("res == SUCCESS || res == DELETE",
+                                              c.Block(success_block + [c.Assign("active[b]", "!is_zero_dbl(particles->dt[pnum]) && (particles->state[pnum] == EVALUATE || particles->state[pnum] == REPEAT)")]),
+                                              c.Block([c.Statement("get_particle_backup(&particle_backup[b], particles, pnum)")]
+                                                      + failure_block + [c.Assign("active[b]", "0")]))]
+                                      + store_batch))
+            batch_fargs_str = ", ".join(["particles", "pblock", "nb", "active", "res_batch"] + list(field_args.keys()))
+            step_loop = c.While("1", c.Block([c.Assign("nactive", "0"),
+                                              c.For("b = 0", "b < nb", "++b", c.Statement("nactive += active[b]")),
+                                              c.If("nactive == 0", c.Statement("break")),
+                                              c.Statement("search_memo_reset()"),
+                                              pre_loop,
+                                              c.Statement("%s_batch(%s)" % (funcname, batch_fargs_str)),
+                                              post_loop]))
+            count_loop = c.For("b = 0", "b < nb", "++b", c.Block([c.Assign("pnum", "pblock + b"), count_flagged]))
+            block_loop = c.For("pblock = 0", "pblock < num_particles", "pblock += PARCELS_BATCH_SIZE",
+                               c.Block([c.Assign("nb", "min(PARCELS_BATCH_SIZE, num_particles - pblock)"),
+                                        init_loop, step_loop, count_loop]))
+            fbody = c.Block([c.Value("int", "pnum, pblock, b, nb, nactive, sign_dt, sign_end_part"),
+                             c.Assign("int nflagged", "0"),
+                             c.Value("int", "active[PARCELS_BATCH_SIZE]"),
+                             c.Value("StatusCode", "res, state_prev[PARCELS_BATCH_SIZE], res_batch[PARCELS_BATCH_SIZE]"),
+                             c.Value("double", "reset_dt, reset_dt_batch[PARCELS_BATCH_SIZE]"),
+                             c.Value("double", "__pdt_prekernels"),
+                             c.Value("double", "__dt, __dt_batch[PARCELS_BATCH_SIZE]"),
+                             sign_dt,
+                             c.Statement("%s particle_backup[PARCELS_BATCH_SIZE]" % self.ptype.name),
+                             block_loop,
+                             c.Statement("return nflagged")])
+        else:
+            time_loop = c.While(evaluate_cond, c.Block(body))
+            part_loop = c.For("pnum = 0", "pnum < num_particles", "++pnum",
+                              c.Block([init_state, record_start, init_pend, sign_end_part, reset_res_state, dt_pos,
+                                       notstarted_continue([count_flagged]), time_loop, count_flagged]))
+            fbody = c.Block([c.Value("int", "pnum, sign_dt, sign_end_part, __slot"),
+                             c.Assign("int nflagged", "0"),
+                             c.Value("StatusCode", "res"),
+                             c.Value("double", "reset_dt, __pend"),
+                             c.Value("double", "__pdt_prekernels"),
+                             c.Value("double", "__dt"),  # 1e-8 = built-in tolerance for np.isclose()
+                             sign_dt, particle_backup, part_loop,
+                             c.Statement("return nflagged")])
+        fdecl = c.FunctionDeclaration(c.Value("int", "particle_loop"), args)
         ccode += [str(c.FunctionBody(fdecl, fbody))]
         return "\n\n".join(ccode)
 
+    def generate_output_functions(self):
+        """Generates output_end, which returns the next output time after the time of a particle (or endtime if
+        there is none before endtime) together with its slot in the output buffer, output_slot, which returns the
+        slot of the output time at which a particle is (or -1), and record_output, which copies the variables of a
+        particle into a slot of the buffers that are not NULL"""
+        pname = self.ptype.name + 'p'
+        args = [c.Value("double", "time"), c.Value("double", "endtime"), c.Value("int", "sign_dt"),
+                c.Value("int", "noutputs"), c.Value("double", "output_t0"), c.Value("double", "outputdt"),
+                c.Pointer(c.Value("int", "slot"))]
+        decl = c.FunctionDeclaration(c.Static(c.DeclSpecifier(c.Value("double", "output_end"), spec='inline')), args)
+        body = [c.Value("double", "k"),
+                c.Assign("*slot", "-1"),
+                c.If("noutputs == 0 || isnan(time)", c.Statement("return endtime")),
+                c.Assign("k", "floor((time - output_t0) * sign_dt / outputdt + 1e-6) + 1"),
+                c.If("k < 0", c.Assign("k", "0")),
+                c.If("k >= noutputs", c.Statement("return endtime")),
+                c.Assign("*slot", "(int) k"),
+                c.Statement("return output_t0 + sign_dt * k * outputdt")]
+        ccode = [str(c.FunctionBody(decl, c.Block(body)))]
+
+        args = [c.Value("double", "time"), c.Value("int", "sign_dt"), c.Value("int", "noutputs"),
+                c.Value("double", "output_t0"), c.Value("double", "outputdt")]
+        decl = c.FunctionDeclaration(c.Static(c.DeclSpecifier(c.Value("int", "output_slot"), spec='inline')), args)
+        body = [c.Value("double", "k"),
+                c.If("noutputs == 0 || isnan(time)", c.Statement("return -1")),
+                c.Assign("k", "round((time - output_t0) * sign_dt / outputdt)"),
+                c.If("k < 0 || k >= noutputs || !is_close_dbl(time, output_t0 + sign_dt * k * outputdt)",
+                     c.Statement("return -1")),
+                c.Statement("return (int) k")]
+        ccode += [str(c.FunctionBody(decl, c.Block(body)))]
+
+        args = [c.Pointer(c.Value(pname, "particles")), c.Value("int", "pnum"), c.Value("int", "num_particles"),
+                c.Value("int", "slot"), c.Pointer(c.Value("unsigned char", "output_mask")),
+                c.Pointer(c.Pointer(c.Value("void", "output_vars")))]
+        decl = c.FunctionDeclaration(c.Static(c.DeclSpecifier(c.Value("void", "record_output"), spec='inline')), args)
+        body = [c.Assign("size_t i", "(size_t) slot * num_particles + pnum"),
+                c.Assign("output_mask[i]", "1")]
+        for i, v in enumerate(self.ptype.variables):
+            if v.dtype != np.uint64:
+                body += [c.If("output_vars[%d] != NULL" % i,
+                              c.Assign("((%s*) output_vars[%d])[i]" % (c.dtype_to_ctype(v.dtype), i),
+                                       "particles->%s[pnum]" % v.name))]
+        ccode += [str(c.FunctionBody(decl, c.Block(body)))]
+        return "\n\n".join(ccode)
+
+    def generate_batched_kernel(self, funcname, field_args, vfield):
+        """Generates <funcname>_batch, which does one AdvectionRK4 (or AdvectionRK4_3D) step for the active
+        particles of a block, with the same arithmetic as the kernel itself but with the velocities of each
+        RK stage interpolated for the whole block at once by temporal_interpolation_linear_batch"""
+        pname = self.ptype.name + 'p'
+        fields = [vfield.U, vfield.V] + ([vfield.W] if vfield.vector_type == '3D' else [])
+        vel = ['u', 'v', 'w'][:len(fields)]
+        coefs = ['', '0.5', '0.5', '']  # stage s is evaluated at time + coefs[s] * dt, from the velocities of stage s-1
+
+        args = [c.Pointer(c.Value(pname, "particles")), c.Value("int", "pblock"), c.Value("int", "nb"),
+                c.Pointer(c.Value("int", "active")), c.Pointer(c.Value("StatusCode", "res"))]
+        args += [c.Pointer(c.Value("CField", "%s" % field)) for field in field_args.keys()]
+
+        def step(var, s):
+            vel_s = "%s[%d][b]" % (vel[['lon', 'lat', 'depth'].index(var)], s - 1)
+            dt_term = "(%s * %s)" % (vel_s, coefs[s]) if coefs[s] else vel_s
+            return "(particles->%s[pnum] + (%s * particles->dt[pnum]))" % (var, dt_term)
+
+        stage_body = []
+        for s in range(4):
+            if s == 0:
+                locs = [c.Assign("x[b]", "particles->lon[pnum]"),
+                        c.Assign("y[b]", "particles->lat[pnum]"),
+                        c.Assign("z[b]", "particles->depth[pnum]"),
+                        c.Assign("time[b]", "particles->time[pnum]")]
+            else:
+                time_s = "(%s * particles->dt[pnum])" % coefs[s] if coefs[s] else "particles->dt[pnum]"
+                locs = [c.Assign("x[b]", step('lon', s)),
+                        c.Assign("y[b]", step('lat', s)),
+                        c.Assign("z[b]", step('depth', s) if len(fields) == 3 else "particles->depth[pnum]"),
+                        c.Assign("time[b]", "(particles->time[pnum] + %s)" % time_s)]
+            stage_body += [c.For("b = 0", "b < nb", "++b", c.Block([c.Assign("pnum", "pblock + b")] + locs))]
+            stage_body += [c.Statement("temporal_interpolation_linear_batch(nb, mask, x, y, z, time, fields, %d, "
+                                       "&particles->xi[pblock*ngrid], &particles->yi[pblock*ngrid], "
+                                       "&particles->zi[pblock*ngrid], &particles->ti[pblock*ngrid], ngrid, "
+                                       "fvalues, status, %s)" % (len(fields), fields[0].gridindexingtype.upper()))]
+            convert = []
+            for i, (fld, v) in enumerate(zip(fields, vel)):
+                convert += [c.Statement("values[%d][b] *= %s" % (i, fld.ccode_convert(None, "z[b]", "y[b]", "x[b]"))),
+                            c.Assign("%s[%d][b]" % (v, s), "values[%d][b]" % i)]
+            stage_body += [c.For("b = 0", "b < nb", "++b", c.Block([
+                c.If("!mask[b]", c.Statement("continue")),
+                c.If("status[b] != SUCCESS", c.Block([c.Assign("res[b]", "status[b]"),
+                                                      c.Assign("mask[b]", "0"),
+                                                      c.Statement("continue")]))] + convert))]
+
+        update = []
+        for var, v in zip(['lon', 'lat', 'depth'], vel):
+            update += [c.Statement("particles->%s[pnum] += (((((%s[0][b] + (2 * %s[1][b])) + (2 * %s[2][b])) + %s[3][b]) / 6.0) * particles->dt[pnum])"
+                                   % (var, v, v, v, v))]
+        body = [c.Value("int", "b, pnum"),
+                c.Value("int", "mask[PARCELS_BATCH_SIZE]"),
+                c.Value("StatusCode", "status[PARCELS_BATCH_SIZE]"),
+                c.Value("type_coord", "x[PARCELS_BATCH_SIZE], y[PARCELS_BATCH_SIZE], z[PARCELS_BATCH_SIZE]"),
+                c.Value("double", "time[PARCELS_BATCH_SIZE]"),
+                c.Value("float", "values[%d][PARCELS_BATCH_SIZE]" % len(fields)),
+                c.Value("type_coord", ", ".join(["%s[4][PARCELS_BATCH_SIZE]" % v for v in vel])),
+                c.Assign("CField *fields[]", "{%s}" % ", ".join([f.ccode_name for f in fields])),
+                c.Assign("float *fvalues[]", "{%s}" % ", ".join(["values[%d]" % i for i in range(len(fields))])),
+                c.For("b = 0", "b < nb", "++b", c.Block([c.Assign("mask[b]", "active[b]"), c.Assign("res[b]", "SUCCESS")]))]
+        body += stage_body
+        body += [c.For("b = 0", "b < nb", "++b", c.Block([c.If("!mask[b]", c.Statement("continue")),
+                                                         c.Assign("pnum", "pblock + b")] + update))]
+        fdecl = c.FunctionDeclaration(c.Static(c.DeclSpecifier(c.Value("void", "%s_batch" % funcname), spec='inline')), args)
+        return str(c.FunctionBody(fdecl, c.Block(body)))
+
 
 class ParticleObjectLoopGenerator(object):
     """Code generator class that adds type definitions and the outer
@@ -1300,7 +1760,7 @@ class ParticleObjectLoopGenerator(object):
         self.fieldset = fieldset
         self.ptype = ptype
 
-    def generate(self, funcname, field_args, const_args, kernel_ast, c_include):
+    def generate(self, funcname, field_args, const_args, kernel_ast, c_include, analytical=False):
         ccode = []
 
         # ==== Add include for Parcels and math header ==== #
@@ -1401,13 +1861,18 @@ class ParticleObjectLoopGenerator(object):
                                    ]))
 
         # ==== main computation body ==== #
-        body = [c.Statement("set_particle_backup(&particle_backup, &(particles[p]))")]
+        body = [c.Statement("search_memo_reset()")]
+        body += [c.Statement("set_particle_backup(&particle_backup, &(particles[p]))")]
         body += [pdt_eq_dt_pos]
         body += [partdt]
         body += [c.Value("StatusCode", "state_prev"), c.Assign("state_prev", "particles[p].state")]
         body += [c.Assign("res", "%s(&(particles[p]), %s)" % (funcname, fargs_str))]
         body += [c.If("(res == SUCCESS) && (particles[p].state != state_prev)", c.Assign("res", "particles[p].state"))]
-        body += [check_pdt]
+        if analytical:
+            # dt is set by the analytical advection itself, and reset after each step
+            update_pdt = c.Block([update_pdt, c.Assign("particles[p].dt", "INFINITY")])
+        else:
+            body += [check_pdt]
         body += [c.If("res == SUCCESS || res == DELETE", c.Block([c.Statement("particles[p].time += particles[p].dt"),
                                                                   reset_dt,
                                                                   update_pdt,
@@ -24,7 +24,7 @@ def set_ofam_fieldset(deferred_load=True, use_xarray=False):
                   'time': 'Time'}
     if use_xarray:
         ds = xr.open_mfdataset([filenames['U'], filenames['V']], combine='by_coords')
-        return FieldSet.from_xarray_dataset(ds, variables, dimensions, allow_time_extrapolation=True)
+        return FieldSet.from_xarray_dataset(ds, variables, dimensions, allow_time_extrapolation=True, deferred_load=deferred_load)
     else:
         return FieldSet.from_netcdf(filenames, variables, dimensions, allow_time_extrapolation=True, deferred_load=deferred_load, chunksize=False)
 
@@ -151,7 +151,7 @@ def test_peninsula_fieldset(mode, mesh, tmpdir):
     assert(err_smpl <= 1.e-3).all()
 
 
-@pytest.mark.parametrize('mode', ['scipy'])  # Analytical Advection only implemented in Scipy mode
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
 @pytest.mark.parametrize('mesh', ['flat', 'spherical'])
 def test_peninsula_fieldset_AnalyticalAdvection(mode, mesh, tmpdir):
     """Execute peninsula test using Analytical Advection on C grid"""
@@ -14,7 +14,8 @@ from pathlib import Path
 
 import parcels.tools.interpolation_utils as i_u
 from .fieldfilebuffer import (NetcdfFileBuffer, DeferredNetcdfFileBuffer,
-                              DaskFileBuffer, DeferredDaskFileBuffer)
+                              DaskFileBuffer, DeferredDaskFileBuffer, DeferredXarrayFileBuffer,
+                              ZarrFileBuffer, DeferredZarrFileBuffer)
 from .grid import CGrid
 from .grid import Grid
 from .grid import GridCode
@@ -33,6 +34,16 @@ from parcels.tools.loggers import logger
 __all__ = ['Field', 'VectorField', 'SummedField', 'NestedField']
 
 
+# Ctypes struct corresponding to the type definition in parcels.h
+class CField(Structure):
+    _fields_ = [('xdim', c_int), ('ydim', c_int), ('zdim', c_int),
+                ('tdim', c_int), ('igrid', c_int),
+                ('allow_time_extrapolation', c_int),
+                ('time_periodic', c_int),
+                ('data_chunks', POINTER(POINTER(POINTER(c_float)))),
+                ('grid', POINTER(CGrid))]
+
+
 def _isParticle(key):
     if hasattr(key, '_next_dt'):
         return True
@@ -207,6 +218,7 @@ class Field(object):
         self.data_full_zdim = kwargs.pop('data_full_zdim', None)
         self.data_chunks = []
         self.c_data_chunks = []
+        self._cstruct = None
         self.nchunks = []
         self.chunk_set = False
         self.filebuffers = [None] * 2
@@ -348,7 +360,7 @@ class Field(object):
             else:
                 raise RuntimeError('interp_method is a dictionary but %s is not in it' % variable[0])
 
-        _grid_fb_class = NetcdfFileBuffer
+        _grid_fb_class = ZarrFileBuffer if netcdf_engine == 'zarr' else NetcdfFileBuffer
 
         with _grid_fb_class(lonlat_filename, dimensions, indices, netcdf_engine) as filebuffer:
             lon, lat = filebuffer.lonlat
@@ -404,7 +416,12 @@ class Field(object):
         if grid.time.size <= 2 or deferred_load is False:
             deferred_load = False
 
-        if chunksize not in [False, None]:
+        if netcdf_engine == 'zarr':
+            if deferred_load:
+                _field_fb_class = DeferredZarrFileBuffer
+            else:
+                _field_fb_class = ZarrFileBuffer
+        elif chunksize not in [False, None]:
             if deferred_load:
                 _field_fb_class = DeferredDaskFileBuffer
             else:
@@ -462,7 +479,7 @@ class Field(object):
 
     @classmethod
     def from_xarray(cls, da, name, dimensions, mesh='spherical', allow_time_extrapolation=None,
-                    time_periodic=False, **kwargs):
+                    time_periodic=False, deferred_load=True, **kwargs):
         """Create field from xarray Variable
 
         :param da: Xarray DataArray
@@ -479,9 +496,12 @@ class Field(object):
                Default is False if dimensions includes time, else True
         :param time_periodic: boolean whether to loop periodically over the time component of the FieldSet
                This flag overrides the allow_time_interpolation and sets it to False
+        :param deferred_load: boolean whether to only read the (lazily loaded) data of the time snapshots
+               around the current time during execution, like `from_netcdf` does for files, instead of
+               loading all data at once. Only used for DataArrays with more than two time snapshots
+               and without time_periodic (default True)
         """
 
-        data = da.data
         interp_method = kwargs.pop('interp_method', 'linear')
 
         time = da[dimensions['time']].values if 'time' in dimensions else np.array([0])
@@ -490,11 +510,32 @@ class Field(object):
         lat = da[dimensions['lat']].values
 
         time_origin = TimeConverter(time[0])
-        time = time_origin.reltime(time)
-
-        grid = Grid.create_grid(lon, lat, depth, time, time_origin=time_origin, mesh=mesh)
+        reltime = time_origin.reltime(time)
+
+        grid = Grid.create_grid(lon, lat, depth, reltime, time_origin=time_origin, mesh=mesh)
+        if not deferred_load or grid.time.size <= 2 or time_periodic:
+            return cls(name, da.data, grid=grid, allow_time_extrapolation=allow_time_extrapolation,
+                       interp_method=interp_method, **kwargs)
+
+        # Deferred load: the DataArray is read one time snapshot at a time by a DeferredXarrayFileBuffer,
+        # which takes the place of the files of from_netcdf
+        grid.defer_load = True
+        grid.ti = -1
+        grid.timeslices = np.array([time])
+        data = DeferredArray()
+        data.compute_shape(grid.xdim, grid.ydim, grid.zdim, grid.tdim, len(grid.timeslices))
+        dataset = da.to_dataset(name=name)
+        dataFiles = np.empty(grid.tdim, dtype=object)
+        for ti in range(grid.tdim):
+            dataFiles[ti] = dataset
+        indices = {'lon': range(grid.xdim), 'lat': range(grid.ydim),
+                   'depth': range(grid.zdim) if 'depth' in dimensions else [0]}
+        if allow_time_extrapolation is None:
+            allow_time_extrapolation = False
         return cls(name, data, grid=grid, allow_time_extrapolation=allow_time_extrapolation,
-                   interp_method=interp_method, **kwargs)
+                   interp_method=interp_method, dataFiles=dataFiles, FieldFileBuffer=DeferredXarrayFileBuffer,
+                   dimensions=dimensions.copy(), indices=indices, netcdf_engine='xarray',
+                   data_full_zdim=grid.zdim, **kwargs)
 
     def reshape(self, data, transpose=False):
         # Ensure that field data is the right data type
@@ -612,21 +653,19 @@ class Field(object):
                     raise FieldOutOfBoundSurfaceError(0, 0, z, field=self)
             elif z > grid.depth[-1]:
                 raise FieldOutOfBoundError(0, 0, z, field=self)
-            depth_indices = grid.depth <= z
             if z >= grid.depth[-1]:
                 zi = len(grid.depth) - 2
             else:
-                zi = depth_indices.argmin() - 1 if z >= grid.depth[0] else 0
+                zi = np.searchsorted(grid.depth, z, side='right') - 1 if z >= grid.depth[0] else 0
         else:
             if z > grid.depth[0]:
                 raise FieldOutOfBoundSurfaceError(0, 0, z, field=self)
             elif z < grid.depth[-1]:
                 raise FieldOutOfBoundError(0, 0, z, field=self)
-            depth_indices = grid.depth >= z
             if z <= grid.depth[-1]:
                 zi = len(grid.depth) - 2
             else:
-                zi = depth_indices.argmin() - 1 if z <= grid.depth[0] else 0
+                zi = len(grid.depth) - np.searchsorted(grid.depth[::-1], z, side='left') - 1 if z <= grid.depth[0] else 0
         zeta = (z-grid.depth[zi]) / (grid.depth[zi+1]-grid.depth[zi])
         return (zi, zeta)
 
@@ -681,23 +720,32 @@ class Field(object):
         zeta = (z - depth_vector[zi]) / (depth_vector[zi+1]-depth_vector[zi])
         return (zi, zeta)
 
-    def reconnect_bnd_indices(self, xi, yi, xdim, ydim, sphere_mesh):
-        if xi < 0:
-            if sphere_mesh:
-                xi = xdim-2
-            else:
-                xi = 0
-        if xi > xdim-2:
-            if sphere_mesh:
-                xi = 0
-            else:
-                xi = xdim-2
+    def reconnect_bnd_indices(self, xi, yi, xdim, ydim, sphere_mesh, zonal_wrap=False):
+        if zonal_wrap:
+            # with a lazy zonal halo, cell -1 spans the last and the first columns
+            if xi < -1:
+                xi += xdim
+            if xi > xdim-2:
+                xi -= xdim
+        else:
+            if xi < 0:
+                if sphere_mesh:
+                    xi = xdim-2
+                else:
+                    xi = 0
+            if xi > xdim-2:
+                if sphere_mesh:
+                    xi = 0
+                else:
+                    xi = xdim-2
         if yi < 0:
             yi = 0
         if yi > ydim-2:
             yi = ydim-2
             if sphere_mesh:
                 xi = xdim - xi
+                if zonal_wrap and xi > xdim-2:
+                    xi -= xdim
         return xi, yi
 
     def search_indices_rectilinear(self, x, y, z, ti=-1, time=-1, particle=None, search2D=False):
@@ -710,12 +758,17 @@ class Field(object):
             raise FieldOutOfBoundError(x, y, z, field=self)
 
         if grid.xdim > 1:
-            if grid.mesh != 'spherical':
-                lon_index = grid.lon < x
-                if lon_index.all():
-                    xi = len(grid.lon) - 2
-                else:
-                    xi = lon_index.argmin() - 1 if lon_index.any() else 0
+            if grid.zonal_wrap:
+                # lazy zonal halo: the cell east of the last column is returned as xi = -1,
+                # so that numpy's negative indexing wraps xi+1 around to the first column
+                xloc = grid.lon[0] + np.mod(x - grid.lon[0], grid.zonal_period)
+                xi = np.searchsorted(grid.lon, xloc, side='right') - 1
+                lon_east = grid.lon[xi+1] if xi < grid.xdim-1 else grid.lon[0] + grid.zonal_period
+                xsi = (xloc - grid.lon[xi]) / (lon_east - grid.lon[xi])
+                if xi == grid.xdim-1:
+                    xi = -1
+            elif grid.mesh != 'spherical':
+                xi = grid.axis_index('lon', x)
                 xsi = (x-grid.lon[xi]) / (grid.lon[xi+1]-grid.lon[xi])
                 if xsi < 0:
                     xi -= 1
@@ -723,6 +776,16 @@ class Field(object):
                 elif xsi > 1:
                     xi += 1
                     xsi = (x-grid.lon[xi]) / (grid.lon[xi+1]-grid.lon[xi])
+            elif grid.axis_increasing('lon'):
+                xloc = x + 360 if x < grid.lon[0] else x
+                xi = grid.axis_index('lon', xloc)
+                xsi = (xloc-grid.lon[xi]) / (grid.lon[xi+1]-grid.lon[xi])
+                if xsi < 0:
+                    xi -= 1
+                    xsi = (xloc-grid.lon[xi]) / (grid.lon[xi+1]-grid.lon[xi])
+                elif xsi > 1:
+                    xi += 1
+                    xsi = (xloc-grid.lon[xi]) / (grid.lon[xi+1]-grid.lon[xi])
             else:
                 lon_fixed = grid.lon.copy()
                 indices = lon_fixed >= lon_fixed[0]
@@ -747,11 +810,7 @@ class Field(object):
             xi, xsi = -1, 0
 
         if grid.ydim > 1:
-            lat_index = grid.lat < y
-            if lat_index.all():
-                yi = len(grid.lat) - 2
-            else:
-                yi = lat_index.argmin() - 1 if lat_index.any() else 0
+            yi = grid.axis_index('lat', y)
 
             eta = (y-grid.lat[yi]) / (grid.lat[yi+1]-grid.lat[yi])
             if eta < 0:
@@ -789,11 +848,9 @@ class Field(object):
 
     def search_indices_curvilinear(self, x, y, z, ti=-1, time=-1, particle=None, search2D=False):
         if particle:
-            xi = particle.xi[self.igrid]
-            yi = particle.yi[self.igrid]
+            (xi, yi) = self.grid.search_start(x, y, particle.xi[self.igrid], particle.yi[self.igrid])
         else:
-            xi = int(self.grid.xdim / 2) - 1
-            yi = int(self.grid.ydim / 2) - 1
+            (xi, yi) = self.grid.search_start(x, y)
         xsi = eta = -1
         grid = self.grid
         invA = np.array([[1, 0, 0, 0],
@@ -837,9 +894,9 @@ class Field(object):
                 xsi = ((y-py[0])/(py[1]-py[0]) + (y-py[3])/(py[2]-py[3])) * .5
             else:
                 xsi = (x-a[0]-a[2]*eta) / (a[1]+a[3]*eta)
-            if xsi < 0 and eta < 0 and xi == 0 and yi == 0:
+            if xsi < 0 and eta < 0 and xi == 0 and yi == 0 and not grid.zonal_wrap:
                 raise FieldOutOfBoundError(x, y, 0, field=self)
-            if xsi > 1 and eta > 1 and xi == grid.xdim-1 and yi == grid.ydim-1:
+            if xsi > 1 and eta > 1 and xi == grid.xdim-1 and yi == grid.ydim-1 and not grid.zonal_wrap:
                 raise FieldOutOfBoundError(x, y, 0, field=self)
             if xsi < -tol:
                 xi -= 1
@@ -849,7 +906,7 @@ class Field(object):
                 yi -= 1
             elif eta > 1+tol:
                 yi += 1
-            (xi, yi) = self.reconnect_bnd_indices(xi, yi, grid.xdim, grid.ydim, grid.mesh)
+            (xi, yi) = self.reconnect_bnd_indices(xi, yi, grid.xdim, grid.ydim, grid.mesh, grid.zonal_wrap)
             it += 1
             if it > maxIterSearch:
                 print('Correct cell not found after %d iterations' % maxIterSearch)
@@ -882,10 +939,24 @@ class Field(object):
         return (xsi, eta, zeta, xi, yi, zi)
 
     def search_indices(self, x, y, z, ti=-1, time=-1, particle=None, search2D=False):
+        # the search results are memoised on the Grid, so that Fields sharing the Grid and
+        # successive samplings at the same location reuse them. Only the vertical search
+        # on s-grids depends on the time and on the interpolation method
+        key = (x, y, z, search2D, self.gridindexingtype)
+        if self.grid.gtype in [GridCode.RectilinearSGrid, GridCode.CurvilinearSGrid]:
+            key += (ti, time, self.interp_method in ['bgrid_velocity', 'bgrid_w_velocity', 'bgrid_tracer'])
+        memo = self.grid.search_memo
+        res = memo.get(key)
+        if res is not None:
+            if particle:
+                (particle.xi[self.igrid], particle.yi[self.igrid], particle.zi[self.igrid]) = res[3:]
+            return res
         if self.grid.gtype in [GridCode.RectilinearSGrid, GridCode.RectilinearZGrid]:
-            return self.search_indices_rectilinear(x, y, z, ti, time, particle=particle, search2D=search2D)
+            res = self.search_indices_rectilinear(x, y, z, ti, time, particle=particle, search2D=search2D)
         else:
-            return self.search_indices_curvilinear(x, y, z, ti, time, particle=particle, search2D=search2D)
+            res = self.search_indices_curvilinear(x, y, z, ti, time, particle=particle, search2D=search2D)
+        memo[key] = res
+        return res
 
     def interpolator2D(self, ti, z, y, x, particle=None):
         (xsi, eta, _, xi, yi, _) = self.search_indices(x, y, z, particle=particle)
@@ -900,7 +971,7 @@ class Field(object):
                 (1-xsi)*eta * self.data[ti, yi+1, xi]
             return val
         elif self.interp_method == 'linear_invdist_land_tracer':
-            land = np.isclose(self.data[ti, yi:yi+2, xi:xi+2], 0.)
+            land = np.isclose(self.data[ti, yi:yi+2, [xi, xi+1]], 0.)
             nb_land = np.sum(land)
             if nb_land == 4:
                 return 0
@@ -949,7 +1020,7 @@ class Field(object):
                 f1 = self.data[ti, zi+1, yi, xi]
             return (1-zeta) * f0 + zeta * f1
         elif self.interp_method == 'linear_invdist_land_tracer':
-            land = np.isclose(self.data[ti, zi:zi+2, yi:yi+2, xi:xi+2], 0.)
+            land = np.isclose(self.data[ti, zi:zi+2, yi:yi+2][:, :, [xi, xi+1]], 0.)
             nb_land = np.sum(land)
             if nb_land == 8:
                 return 0
@@ -1091,7 +1162,11 @@ class Field(object):
         We interpolate linearly in time and apply implicit unit
         conversion to the result. Note that we defer to
         scipy.interpolate to perform spatial interpolation.
+        If a snapshot time is set on the grid (see FieldSet.set_time_snapshot),
+        the field is sampled at that time instead.
         """
+        if self.grid.snapshot_time is not None:
+            time = self.grid.snapshot_time
         (ti, periods) = self.time_index(time)
         time -= periods*(self.grid.time_full[-1]-self.grid.time_full[0])
         if ti < self.grid.tdim-1 and time > self.grid.time[ti]:
@@ -1126,6 +1201,22 @@ class Field(object):
     def ccode_convert(self, _, z, y, x):
         return self.units.ccode_to_target(x, y, z)
 
+    @staticmethod
+    def ccode_eval_multi_array(fields, variables, t, z, y, x):
+        # Fields need to share the Grid, time settings and gridindexingtype (see FieldSet.sample)
+        ccode_str = "temporal_interpolation_multi(%s, %s, %s, %s, (CField*[]){%s}, %d, &particles->xi[pnum*ngrid], &particles->yi[pnum*ngrid], &particles->zi[pnum*ngrid], &particles->ti[pnum*ngrid], (float*[]){%s}, (int[]){%s}, %s)" \
+                    % (x, y, z, t, ", ".join([f.ccode_name for f in fields]), len(fields), ", ".join(["&%s" % v for v in variables]),
+                       ", ".join([f.interp_method.upper() for f in fields]), fields[0].gridindexingtype.upper())
+        return ccode_str
+
+    @staticmethod
+    def ccode_eval_multi_object(fields, variables, t, z, y, x):
+        # Fields need to share the Grid, time settings and gridindexingtype (see FieldSet.sample)
+        ccode_str = "temporal_interpolation_multi_pstruct(%s, %s, %s, %s, (CField*[]){%s}, %d, particle->cxi, particle->cyi, particle->czi, particle->cti, (float*[]){%s}, (int[]){%s}, %s)" \
+                    % (x, y, z, t, ", ".join([f.ccode_name for f in fields]), len(fields), ", ".join(["&%s" % v for v in variables]),
+                       ", ".join([f.interp_method.upper() for f in fields]), fields[0].gridindexingtype.upper())
+        return ccode_str
+
     def get_block_id(self, block):
         return np.ravel_multi_index(block, self.nchunks)
 
@@ -1158,22 +1249,33 @@ class Field(object):
         self.grid.chunk_info = sum(self.grid.chunk_info, [])
         self.chunk_set = True
 
+    def compute_blocks(self, blocks):
+        """Loads a list of dask blocks of the field data into numpy arrays.
+        For zarr stores, the blocks are read and decompressed in parallel, on the dask
+        thread pool (whose size can be set with dask.config.set(num_workers=...))"""
+        if self.netcdf_engine == 'zarr' and len(blocks) > 1:
+            return [np.asarray(b) for b in da.compute(*blocks, scheduler='threads')]
+        return [np.array(b) for b in blocks]
+
     def chunk_data(self):
         if not self.chunk_set:
             self.chunk_setup()
         g = self.grid
         if isinstance(self.data, da.core.Array):
+            requested = []
             for block_id in range(len(self.grid.load_chunk)):
                 if g.load_chunk[block_id] == g.chunk_loading_requested \
                         or g.load_chunk[block_id] in g.chunk_loaded and self.data_chunks[block_id] is None:
-                    block = self.get_block(block_id)
-                    self.data_chunks[block_id] = np.array(self.data.blocks[(slice(self.grid.tdim),) + block])
+                    requested.append(block_id)
                 elif g.load_chunk[block_id] == g.chunk_not_loaded:
                     if isinstance(self.data_chunks, list):
                         self.data_chunks[block_id] = None
                     else:
                         self.data_chunks[block_id, :] = None
                     self.c_data_chunks[block_id] = None
+            blocks = [self.data.blocks[(slice(self.grid.tdim),) + self.get_block(block_id)] for block_id in requested]
+            for block_id, block_data in zip(requested, self.compute_blocks(blocks)):
+                self.data_chunks[block_id] = block_data
         else:
             if isinstance(self.data_chunks, list):
                 self.data_chunks[0] = None
@@ -1183,37 +1285,74 @@ class Field(object):
             self.grid.load_chunk[0] = g.chunk_loaded_touched
             self.data_chunks[0] = np.array(self.data)
 
+    def snapshot_chunk(self, block_id):
+        """Returns the loaded chunk block_id of the data, interpolated in time to grid.snapshot_time, as
+        a single time level. The result is kept until the snapshot time or the loaded chunk changes"""
+        chunk = self.data_chunks[block_id]
+        key = (self.grid.snapshot_time, chunk.ctypes.data)
+        if self._snapshot_chunks[block_id] is None or self._snapshot_chunks[block_id][0] != key:
+            (ti, periods) = self.time_index(self.grid.snapshot_time)
+            time = self.grid.snapshot_time - periods*(self.grid.time_full[-1]-self.grid.time_full[0])
+            if ti < self.grid.tdim-1 and time > self.grid.time[ti]:
+                t0 = self.grid.time[ti]
+                t1 = self.grid.time[ti + 1]
+                data = chunk[ti:ti+1] + (chunk[ti+1:ti+2] - chunk[ti:ti+1]) * np.float32((time - t0) / (t1 - t0))
+            else:
+                data = chunk[ti:ti+1].copy()
+            self._snapshot_chunks[block_id] = (key, data)
+        return self._snapshot_chunks[block_id][1]
+
     @property
     def ctypes_struct(self):
         """Returns a ctypes struct object containing all relevant
-        pointers and sizes for this field."""
-
-        # Ctypes struct corresponding to the type definition in parcels.h
-        class CField(Structure):
-            _fields_ = [('xdim', c_int), ('ydim', c_int), ('zdim', c_int),
-                        ('tdim', c_int), ('igrid', c_int),
-                        ('allow_time_extrapolation', c_int),
-                        ('time_periodic', c_int),
-                        ('data_chunks', POINTER(POINTER(POINTER(c_float)))),
-                        ('grid', POINTER(CGrid))]
-
-        # Create and populate the c-struct object
-        allow_time_extrapolation = 1 if self.allow_time_extrapolation else 0
-        time_periodic = 1 if self.time_periodic else 0
-        for i in range(len(self.grid.load_chunk)):
+        pointers and sizes for this field.
+
+        The struct and its array of chunk pointers are kept between kernel calls;
+        only the pointers of chunks whose buffer has changed are updated"""
+
+        # Create the c-struct object (only when the number of chunks changes)
+        nchunks = len(self.grid.load_chunk)
+        if self._cstruct is None or len(self._cstruct_chunks) != nchunks:
+            self._cstruct_chunks = (POINTER(POINTER(c_float)) * nchunks)()
+            self._cstruct_addresses = [None] * nchunks
+            self._cstruct = CField(data_chunks=self._cstruct_chunks)
+            self._cstruct_grid = None
+            self._snapshot_chunks = [None] * nchunks
+        cstruct = self._cstruct
+        # Fields on a grid with a snapshot_time are sampled from a time-interpolated copy of their chunks
+        snapshot = self.grid.snapshot_time is not None
+
+        # Populate the c-struct object
+        cstruct.xdim, cstruct.ydim, cstruct.zdim = self.grid.xdim, self.grid.ydim, self.grid.zdim
+        cstruct.tdim = 1 if snapshot else self.grid.tdim
+        cstruct.igrid = self.igrid
+        cstruct.allow_time_extrapolation = 1 if self.allow_time_extrapolation or snapshot else 0
+        cstruct.time_periodic = 1 if self.time_periodic and not snapshot else 0
+        for i in range(nchunks):
             if self.grid.load_chunk[i] == self.grid.chunk_loading_requested:
                 raise ValueError('data_chunks should have been loaded by now if requested. grid.load_chunk[bid] cannot be 1')
             if self.grid.load_chunk[i] in self.grid.chunk_loaded:
                 if not self.data_chunks[i].flags.c_contiguous:
                     self.data_chunks[i] = self.data_chunks[i].copy()
-                self.c_data_chunks[i] = self.data_chunks[i].ctypes.data_as(POINTER(POINTER(c_float)))
+                data_chunk = self.snapshot_chunk(i) if snapshot else self.data_chunks[i]
+                address = data_chunk.ctypes.data
+                if self.c_data_chunks[i] is None or address != self._cstruct_addresses[i]:
+                    self.c_data_chunks[i] = data_chunk.ctypes.data_as(POINTER(POINTER(c_float)))
+                    self._cstruct_chunks[i] = self.c_data_chunks[i]
+                    self._cstruct_addresses[i] = address
             else:
                 self.c_data_chunks[i] = None
-
-        cstruct = CField(self.grid.xdim, self.grid.ydim, self.grid.zdim,
-                         self.grid.tdim, self.igrid, allow_time_extrapolation, time_periodic,
-                         (POINTER(POINTER(c_float)) * len(self.c_data_chunks))(*self.c_data_chunks),
-                         pointer(self.grid.ctypes_struct))
+                self._snapshot_chunks[i] = None
+                if self._cstruct_addresses[i] is not None:
+                    self._cstruct_chunks[i] = None
+                    self._cstruct_addresses[i] = None
+        if not snapshot and any(c is not None for c in self._snapshot_chunks):
+            self._snapshot_chunks = [None] * nchunks
+
+        grid_cstruct = self.grid.snapshot_ctypes_struct if snapshot else self.grid.ctypes_struct
+        if grid_cstruct is not self._cstruct_grid:
+            cstruct.grid = pointer(grid_cstruct)
+            self._cstruct_grid = grid_cstruct
         return cstruct
 
     def show(self, animation=False, show_time=None, domain=None, depth_level=0, projection=None, land=True,
@@ -1319,15 +1458,37 @@ class Field(object):
                                                       vname_depth: self.grid.depth}, attrs=attrs)
         dset.to_netcdf(filepath, unlimited_dims='time_counter')
 
+    _rescale_slab_size = 2**16
+
     def rescale_and_set_minmax(self, data):
-        data[np.isnan(data)] = 0
-        if self._scaling_factor:
-            data *= self._scaling_factor
-        if self.vmin is not None:
-            data[data < self.vmin] = 0
-        if self.vmax is not None:
-            data[data > self.vmax] = 0
-        return data
+        """Sets NaN values to zero, applies the scaling factor and sets values outside [vmin, vmax] to zero.
+
+        Numpy data are processed in place, in one pass over cache-sized slabs of the array.
+        Dask data are processed lazily per chunk, so only for the chunks that are actually loaded"""
+        if isinstance(data, da.core.Array):
+            return data.map_blocks(self._rescale_and_set_minmax_block, dtype=data.dtype)
+        if not (data.flags.c_contiguous and data.flags.writeable):
+            data = np.array(data, order='C')
+        return self._rescale_and_set_minmax_block(data, out=data)
+
+    def _rescale_and_set_minmax_block(self, data, out=None):
+        in_place = out is data
+        if out is None:
+            out = np.empty(data.shape, dtype=data.dtype)
+        flat_data, flat_out = data.reshape(-1), out.reshape(-1)
+        for start in range(0, flat_data.size, self._rescale_slab_size):
+            slab = flat_out[start:start+self._rescale_slab_size]
+            if self._scaling_factor:
+                np.multiply(flat_data[start:start+self._rescale_slab_size], self._scaling_factor, out=slab)
+            elif not in_place:
+                slab[:] = flat_data[start:start+self._rescale_slab_size]
+            invalid = np.isnan(slab)
+            if self.vmin is not None:
+                invalid |= slab < self.vmin
+            if self.vmax is not None:
+                invalid |= slab > self.vmax
+            slab[invalid] = 0
+        return out
 
     def data_concatenate(self, data, data_to_concat, tindex):
         if data[tindex] is not None:
@@ -1460,6 +1621,8 @@ class VectorField(object):
         if grid.gtype in [GridCode.RectilinearSGrid, GridCode.RectilinearZGrid]:
             px = np.array([grid.lon[xi], grid.lon[xi+1], grid.lon[xi+1], grid.lon[xi]])
             py = np.array([grid.lat[yi], grid.lat[yi], grid.lat[yi+1], grid.lat[yi+1]])
+            if xi == -1 and grid.zonal_wrap:
+                px[1:3] += grid.zonal_period
         else:
             px = np.array([grid.lon[yi, xi], grid.lon[yi, xi+1], grid.lon[yi+1, xi+1], grid.lon[yi+1, xi]])
             py = np.array([grid.lat[yi, xi], grid.lat[yi, xi+1], grid.lat[yi+1, xi+1], grid.lat[yi+1, xi]])
@@ -1524,6 +1687,8 @@ class VectorField(object):
         if grid.gtype in [GridCode.RectilinearSGrid, GridCode.RectilinearZGrid]:
             px = np.array([grid.lon[xi], grid.lon[xi+1], grid.lon[xi+1], grid.lon[xi]])
             py = np.array([grid.lat[yi], grid.lat[yi], grid.lat[yi+1], grid.lat[yi+1]])
+            if xi == -1 and grid.zonal_wrap:
+                px[1:3] += grid.zonal_period
         else:
             px = np.array([grid.lon[yi, xi], grid.lon[yi, xi+1], grid.lon[yi+1, xi+1], grid.lon[yi+1, xi]])
             py = np.array([grid.lat[yi, xi], grid.lat[yi, xi+1], grid.lat[yi+1, xi+1], grid.lat[yi+1, xi]])
@@ -1744,6 +1909,8 @@ class VectorField(object):
                       'partialslip': {'2D': self.spatial_slip_interpolation, '3D': self.spatial_slip_interpolation},
                       'freeslip': {'2D': self.spatial_slip_interpolation, '3D': self.spatial_slip_interpolation}}
             grid = self.U.grid
+            if grid.snapshot_time is not None:
+                time = grid.snapshot_time
             (ti, periods) = self.U.time_index(time)
             time -= periods*(grid.time_full[-1]-grid.time_full[0])
             if ti < grid.tdim-1 and time > grid.time[ti]:
@@ -1809,6 +1976,22 @@ class VectorField(object):
                         % (varU, varV, U.interp_method.upper(), U.gridindexingtype.upper())
         return ccode_str
 
+    def ccode_advect_analytical_array(self, t):
+        W = self.W.ccode_name if self.vector_type == '3D' else 'NULL'
+        ccode_str = "advection_analytical(&__particle_lon, &__particle_lat, &__particle_depth, &__particle_dt, %s, %s, %s, %s, " \
+                    % (t, self.U.ccode_name, self.V.ccode_name, W) + \
+                    "&particles->xi[pnum*ngrid], &particles->yi[pnum*ngrid], &particles->zi[pnum*ngrid], &particles->ti[pnum*ngrid], %d, %s)" \
+                    % (len(self.U.grid.time_full) > 1, self.U.gridindexingtype.upper())
+        return ccode_str
+
+    def ccode_advect_analytical_object(self, t):
+        W = self.W.ccode_name if self.vector_type == '3D' else 'NULL'
+        ccode_str = "advection_analytical_pstruct(&particle->lon, &particle->lat, &particle->depth, &particle->dt, %s, %s, %s, %s, " \
+                    % (t, self.U.ccode_name, self.V.ccode_name, W) + \
+                    "particle->cxi, particle->cyi, particle->czi, particle->cti, %d, %s)" \
+                    % (len(self.U.grid.time_full) > 1, self.U.gridindexingtype.upper())
+        return ccode_str
+
 
 class DeferredArray():
     """Class used for throwing error when Field.data is not read in deferred loading mode"""
@@ -7,6 +7,7 @@ from netCDF4 import Dataset as ncDataset
 
 import datetime
 import math
+import os
 import psutil
 
 from parcels.tools.converters import convert_xarray_time_units
@@ -188,6 +189,28 @@ class DeferredNetcdfFileBuffer(NetcdfFileBuffer):
         super(DeferredNetcdfFileBuffer, self).__init__(*args, **kwargs)
 
 
+class XarrayFileBuffer(NetcdfFileBuffer):
+    """ Class that reads the data of an already opened xarray Dataset with one data variable
+    (e.g. in memory, or lazily from zarr or intake sources) in the same way as a NetCDF file.
+    The 'filename' is the Dataset itself, which is not closed by the buffer. """
+    def __init__(self, *args, **kwargs):
+        kwargs['netcdf_engine'] = 'xarray'
+        super(XarrayFileBuffer, self).__init__(*args, **kwargs)
+
+    def __enter__(self):
+        self.dataset = self.filename
+        self.name = list(self.dataset.data_vars)[0]
+        return self
+
+    def close(self):
+        self.dataset = None
+
+
+class DeferredXarrayFileBuffer(XarrayFileBuffer):
+    def __init__(self, *args, **kwargs):
+        super(DeferredXarrayFileBuffer, self).__init__(*args, **kwargs)
+
+
 class DaskFileBuffer(NetcdfFileBuffer):
     _static_name_maps = {'time': ['time', 'time_count', 'time_counter', 'timer_count', 't'],
                          'depth': ['depth', 'depthu', 'depthv', 'depthw', 'depths', 'deptht', 'depthx', 'depthy',
@@ -716,3 +739,99 @@ class DaskFileBuffer(NetcdfFileBuffer):
 class DeferredDaskFileBuffer(DaskFileBuffer):
     def __init__(self, *args, **kwargs):
         super(DeferredDaskFileBuffer, self).__init__(*args, **kwargs)
+
+
+class ZarrFileBuffer(DaskFileBuffer):
+    """ Class that reads field data from a zarr store, which (unlike a NetCDF file) typically holds all
+    time snapshots of a variable. Each store is opened only once, and shared by all buffers reading from it.
+    The requested chunksize is aligned to the native chunks of the store, so that every Parcels chunk
+    consists of whole zarr chunks; with chunksize='auto', the native chunks are used as they are. """
+    _stores = {}
+
+    def __init__(self, *args, **kwargs):
+        kwargs['netcdf_engine'] = 'zarr'
+        super(ZarrFileBuffer, self).__init__(*args, **kwargs)
+
+    @classmethod
+    def open_store(cls, store):
+        """Returns the (lazily loaded, natively chunked) Dataset of a zarr store, opening it only the first time"""
+        key = str(store)
+        mtime = os.stat(key).st_mtime_ns if os.path.exists(key) else None
+        if key not in cls._stores or cls._stores[key][0] != mtime:
+            cls._stores[key] = (mtime, xr.open_zarr(key, chunks={}))
+        return cls._stores[key][1]
+
+    def __enter__(self):
+        if self.chunksize not in [False, None, 'auto'] and type(self.chunksize) is not dict:
+            raise AttributeError("'chunksize' is of wrong type. Parameter is expected to be a dict per data dimension, or be False, None or 'auto'.")
+        self.dataset = self.open_store(self.filename)
+        if self.chunksize == 'auto':
+            self.chunksize = self._native_chunksize()
+        if isinstance(self.chunksize, dict):
+            chunk_dict = self._get_native_chunk_dictionary()
+            if len(chunk_dict) > 0:
+                self.dataset = self.dataset.chunk(chunk_dict)
+            self.chunksize = chunk_dict
+        for inds in self.indices.values():
+            if type(inds) not in [list, range]:
+                raise RuntimeError('Indices for field subsetting need to be a list')
+        return self
+
+    def close(self):
+        """The store itself stays open, as it is shared with the other buffers"""
+        self.dataset = None
+        self.chunking_finalized = False
+        self.chunk_mapping = None
+
+    def _native_chunks(self):
+        """
+        [private function - not to be called from outside the class]
+        Returns the native zarr chunk size of each dimension in the store, and the data variable with most dimensions.
+        """
+        native = {}
+        data_var = None
+        for var in self.dataset.data_vars.values():
+            chunks = var.encoding.get('chunks', None) or var.shape
+            for dim, size in zip(var.dims, chunks):
+                native.setdefault(dim, size)
+            if data_var is None or var.ndim > data_var.ndim:
+                data_var = var
+        return native, data_var
+
+    def _native_chunksize(self):
+        """
+        [private function - not to be called from outside the class]
+        Returns the native chunks of the store as a chunksize dictionary, mapping the trailing dimensions
+        of the data to the (time, depth, lat, lon) dimensions of Parcels.
+        """
+        native, data_var = self._native_chunks()
+        if data_var is None:
+            return {}
+        pcls_dims = [d for d in ['time', 'depth'] if d in self.dimensions] + ['lat', 'lon']
+        pcls_dims = pcls_dims[-data_var.ndim:]
+        return {p: (d, native[d]) for p, d in zip(pcls_dims, data_var.dims[-len(pcls_dims):])}
+
+    def _get_native_chunk_dictionary(self):
+        """
+        [private function - not to be called from outside the class]
+        Maps the requested dictionary-style chunksize on the store dimensions, rounding each chunk size
+        up to a multiple of the native zarr chunks.
+        """
+        chunk_dict, chunk_map = self._get_initial_chunk_dictionary_by_dict_()
+        native, _ = self._native_chunks()
+        for (dim, size), index in zip(list(chunk_dict.items()), list(chunk_map.keys())):
+            nsize = native.get(dim, 1)
+            chunk_dict[dim] = min(self.dataset.sizes[dim], int(math.ceil(size / nsize)) * nsize)
+            chunk_map[index] = chunk_dict[dim]
+        self.chunk_mapping = chunk_map
+        return chunk_dict
+
+    def data_access(self):
+        if self.chunksize in [False, None]:
+            return NetcdfFileBuffer.data_access(self)
+        return super(ZarrFileBuffer, self).data_access()
+
+
+class DeferredZarrFileBuffer(ZarrFileBuffer):
+    def __init__(self, *args, **kwargs):
+        super(DeferredZarrFileBuffer, self).__init__(*args, **kwargs)
@@ -1,5 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from glob import glob
+import os
 from os import path
 
 import dask.array as da
@@ -47,6 +49,7 @@ class FieldSet(object):
                 self.add_field(field, name)
 
         self.compute_on_defer = None
+        self.io_workers = None
 
     @staticmethod
     def checkvaliddimensionsdict(dims):
@@ -893,9 +896,39 @@ class FieldSet(object):
                                time_periodic=time_periodic, deferred_load=deferred_load,
                                chunksize=chunksize, **kwargs)
 
+    @classmethod
+    def from_zarr(cls, stores, variables, dimensions, indices=None, deferred_load=True, chunksize='auto', **kwargs):
+        """Initialises FieldSet object from zarr stores, which typically hold all time snapshots
+        of a variable in one (chunked) store.
+
+        Each store is opened only once. During execution, only the chunks that are needed by the particles
+        are read, for the time snapshots around the current time; these chunks are read and decompressed
+        in parallel on the dask thread pool.
+
+        :param stores: Path of the zarr store, or dictionary mapping variables to zarr store(s).
+               See also the filenames argument of :meth:`from_netcdf`
+        :param variables: Dictionary mapping variables to variable names in the zarr store(s).
+               Note that the built-in Advection kernels assume that U and V are in m/s
+        :param dimensions: Dictionary mapping data dimensions (lon,
+               lat, depth, time, data) to dimensions in the zarr store(s).
+        :param indices: Optional dictionary of indices for each dimension
+               to read from the store(s), to allow for reading of subset of data.
+        :param deferred_load: boolean whether to only pre-load data (in deferred mode) or
+               fully load them (default: True)
+        :param chunksize: size of the chunks in dask loading. Default is 'auto', which uses the native chunks
+               of the store. A chunksize dictionary (see :meth:`from_netcdf`) is rounded up to multiples of
+               the native chunks, so that no zarr chunk is read more than once for a Parcels chunk
+
+        All other arguments are passed on to :meth:`from_netcdf`
+        """
+        if 'creation_log' not in kwargs.keys():
+            kwargs['creation_log'] = 'from_zarr'
+        return cls.from_netcdf(stores, variables, dimensions, indices=indices, deferred_load=deferred_load,
+                               chunksize=chunksize, netcdf_engine='zarr', **kwargs)
+
     @classmethod
     def from_xarray_dataset(cls, ds, variables, dimensions, mesh='spherical', allow_time_extrapolation=None,
-                            time_periodic=False, **kwargs):
+                            time_periodic=False, deferred_load=True, **kwargs):
         """Initialises FieldSet data from xarray Datasets.
 
         :param ds: xarray Dataset.
@@ -919,6 +952,8 @@ class FieldSet(object):
                Default is False if dimensions includes time, else True
         :param time_periodic: To loop periodically over the time component of the Field. It is set to either False or the length of the period (either float in seconds or datetime.timedelta object). (Default: False)
                This flag overrides the allow_time_interpolation and sets it to False
+        :param deferred_load: boolean whether to only load the (lazy, e.g. dask-backed) data of the
+               time snapshots that are needed during execution, rather than all data at once (default True)
         """
 
         fields = {}
@@ -934,7 +969,7 @@ class FieldSet(object):
             cls.checkvaliddimensionsdict(dims)
 
             fields[var] = Field.from_xarray(ds[name], var, dims, mesh=mesh, allow_time_extrapolation=allow_time_extrapolation,
-                                            time_periodic=time_periodic, **kwargs)
+                                            time_periodic=time_periodic, deferred_load=deferred_load, **kwargs)
         u = fields.pop('U', None)
         v = fields.pop('V', None)
         return cls(u, v, fields=fields)
@@ -955,6 +990,20 @@ class FieldSet(object):
                         fields.append(v2)
         return fields
 
+    def sample(self, fieldnames, *args):
+        """Sample multiple :class:`parcels.field.Field` objects at the same location, e.g.
+        `particle.T, particle.S = fieldset.sample(['T', 'S'], particle)` in a Kernel. The location is
+        either a particle or the (time, depth, lat, lon) arguments of a regular Field sampling.
+        In JIT mode, the Fields that share a Grid are interpolated after a single index search.
+
+        :param fieldnames: List of the names of the Fields to sample
+        :return: Tuple of the sampled values, in the same order as fieldnames
+        """
+        if len(args) == 1 and hasattr(args[0], '_next_dt'):
+            particle = args[0]
+            args = (particle.time, particle.depth, particle.lat, particle.lon, particle)
+        return tuple(getattr(self, name).eval(*args) for name in fieldnames)
+
     def add_constant(self, name, value):
         """Add a constant to the FieldSet. Note that all constants are
         stored as 32-bit floats. While constants can be updated during
@@ -970,7 +1019,7 @@ class FieldSet(object):
         """
         setattr(self, name, value)
 
-    def add_periodic_halo(self, zonal=False, meridional=False, halosize=5):
+    def add_periodic_halo(self, zonal=False, meridional=False, halosize=5, lazy=False):
         """Add a 'halo' to all :class:`parcels.field.Field` objects in a FieldSet,
         through extending the Field (and lon/lat) by copying a small portion
         of the field on one side of the domain to the other.
@@ -978,13 +1027,16 @@ class FieldSet(object):
         :param zonal: Create a halo in zonal direction (boolean)
         :param meridional: Create a halo in meridional direction (boolean)
         :param halosize: size of the halo (in grid points). Default is 5 grid points
+        :param lazy: Boolean whether the zonal halo is handled by wrapping the grid indices around
+               during interpolation, rather than by copying data. This avoids both the extra memory
+               and the concatenation of every time slice loaded for deferred Fields. Default is False
         """
 
         for grid in self.gridset.grids:
-            grid.add_periodic_halo(zonal, meridional, halosize)
+            grid.add_periodic_halo(zonal, meridional, halosize, lazy=lazy)
         for attr, value in iter(self.__dict__.items()):
             if isinstance(value, Field):
-                value.add_periodic_halo(zonal, meridional, halosize)
+                value.add_periodic_halo(zonal and not lazy, meridional, halosize)
 
     def write(self, filename):
         """Write FieldSet to NetCDF file using NEMO convention
@@ -1030,12 +1082,59 @@ class FieldSet(object):
                 gnew.advanced = True
             f.advancetime(fnew, advance == 1)
 
+    def _read_time_chunk(self, f, signdt):
+        """Reads the new time step(s) of a deferred-load Field from its files, for computeTimeChunk.
+        Only the Field itself is changed, so that this can be done for multiple Fields concurrently"""
+        g = f.grid
+        if g.update_status == 'first_updated':
+            if f.data is not None and not isinstance(f.data, DeferredArray):
+                if not isinstance(f.data, list):
+                    f.data = None
+                else:
+                    for i in range(len(f.data)):
+                        del f.data[i, :]
+            lib = np if f.chunksize in [False, None] else da
+        else:
+            lib = np if isinstance(f.data, np.ndarray) else da
+        if f.gridindexingtype == 'pop' and g.zdim > 1:
+            zd = g.zdim - 1
+        else:
+            zd = g.zdim
+        data = lib.empty((g.tdim, zd, g.ydim-2*g.meridional_halo, g.xdim-2*g.zonal_halo), dtype=np.float32)
+
+        if g.update_status == 'first_updated':
+            f.loaded_time_indices = range(2)
+            for tind in f.loaded_time_indices:
+                for fb in f.filebuffers:
+                    if fb is not None:
+                        fb.close()
+                    fb = None
+                data = f.computeTimeChunk(data, tind)
+        elif signdt >= 0:
+            f.loaded_time_indices = [1]
+            if f.filebuffers[0] is not None:
+                f.filebuffers[0].close()
+                f.filebuffers[0] = None
+            f.filebuffers[0] = f.filebuffers[1]
+            data = f.computeTimeChunk(data, 1)
+        else:
+            f.loaded_time_indices = [0]
+            if f.filebuffers[1] is not None:
+                f.filebuffers[1].close()
+                f.filebuffers[1] = None
+            f.filebuffers[1] = f.filebuffers[0]
+            data = f.computeTimeChunk(data, 0)
+        return f.rescale_and_set_minmax(data)
+
     def computeTimeChunk(self, time, dt):
         """Load a chunk of three data time steps into the FieldSet.
         This is used when FieldSet uses data imported from netcdf,
         with default option deferred_load. The loaded time steps are at or immediatly before time
         and the two time steps immediately following time if dt is positive (and inversely for negative dt)
 
+        The files of the different Fields are read concurrently, on a pool of `fieldset.io_workers` threads
+        (default None, for one thread per Field to load up to the number of CPUs; 1 reads them one by one)
+
         :param time: Time around which the FieldSet chunks are to be loaded. Time is provided as a double, relatively to Fieldset.time_origin
         :param dt: time step of the integration scheme
         """
@@ -1053,33 +1152,20 @@ class FieldSet(object):
                     raise TimeExtrapolationError(time, field=f, msg='In fset.computeTimeChunk')
             nextTime = min(nextTime, nextTime_loc) if signdt >= 0 else max(nextTime, nextTime_loc)
 
-        for f in self.get_fields():
-            if type(f) in [VectorField, NestedField, SummedField] or not f.grid.defer_load or f.dataFiles is None:
-                continue
+        fields = [f for f in self.get_fields() if type(f) not in [VectorField, NestedField, SummedField]
+                  and f.grid.defer_load and f.dataFiles is not None
+                  and f.grid.update_status in ['first_updated', 'updated']]
+        # the files of the fields are read concurrently, and the results are merged in the order of the fields
+        nworkers = min(len(fields), os.cpu_count() or 1) if self.io_workers is None else self.io_workers
+        if nworkers > 1:
+            with ThreadPoolExecutor(max_workers=nworkers) as executor:
+                fields_data = list(executor.map(lambda f: self._read_time_chunk(f, signdt), fields))
+        else:
+            fields_data = [self._read_time_chunk(f, signdt) for f in fields]
+
+        for f, data in zip(fields, fields_data):
             g = f.grid
             if g.update_status == 'first_updated':  # First load of data
-                if f.data is not None and not isinstance(f.data, DeferredArray):
-                    if not isinstance(f.data, list):
-                        f.data = None
-                    else:
-                        for i in range(len(f.data)):
-                            del f.data[i, :]
-
-                lib = np if f.chunksize in [False, None] else da
-                if f.gridindexingtype == 'pop' and g.zdim > 1:
-                    zd = g.zdim - 1
-                else:
-                    zd = g.zdim
-                data = lib.empty((g.tdim, zd, g.ydim-2*g.meridional_halo, g.xdim-2*g.zonal_halo), dtype=np.float32)
-                f.loaded_time_indices = range(2)
-                for tind in f.loaded_time_indices:
-                    for fb in f.filebuffers:
-                        if fb is not None:
-                            fb.close()
-                        fb = None
-                    data = f.computeTimeChunk(data, tind)
-                data = f.rescale_and_set_minmax(data)
-
                 if(isinstance(f.data, DeferredArray)):
                     f.data = DeferredArray()
                 f.data = f.reshape(data)
@@ -1093,26 +1179,6 @@ class FieldSet(object):
 
             elif g.update_status == 'updated':
                 lib = np if isinstance(f.data, np.ndarray) else da
-                if f.gridindexingtype == 'pop' and g.zdim > 1:
-                    zd = g.zdim - 1
-                else:
-                    zd = g.zdim
-                data = lib.empty((g.tdim, zd, g.ydim-2*g.meridional_halo, g.xdim-2*g.zonal_halo), dtype=np.float32)
-                if signdt >= 0:
-                    f.loaded_time_indices = [1]
-                    if f.filebuffers[0] is not None:
-                        f.filebuffers[0].close()
-                        f.filebuffers[0] = None
-                    f.filebuffers[0] = f.filebuffers[1]
-                    data = f.computeTimeChunk(data, 1)
-                else:
-                    f.loaded_time_indices = [0]
-                    if f.filebuffers[1] is not None:
-                        f.filebuffers[1].close()
-                        f.filebuffers[1] = None
-                    f.filebuffers[1] = f.filebuffers[0]
-                    data = f.computeTimeChunk(data, 0)
-                data = f.rescale_and_set_minmax(data)
                 if signdt >= 0:
                     data = f.reshape(data)[1, :]
                     if lib is da:
@@ -1142,26 +1208,19 @@ class FieldSet(object):
                 g.load_chunk = np.where(g.load_chunk == g.chunk_deprecated,
                                         g.chunk_not_loaded, g.load_chunk)
                 if isinstance(f.data, da.core.Array) and len(g.load_chunk) > 0:
-                    if signdt >= 0:
-                        for block_id in range(len(g.load_chunk)):
-                            if g.load_chunk[block_id] == g.chunk_loaded_touched:
-                                if f.data_chunks[block_id] is None:
-                                    # file chunks were never loaded.
-                                    # happens when field not called by kernel, but shares a grid with another field called by kernel
-                                    break
-                                block = f.get_block(block_id)
-                                f.data_chunks[block_id][0] = None
-                                f.data_chunks[block_id][1] = np.array(f.data.blocks[(slice(2),)+block][1])
-                    else:
-                        for block_id in range(len(g.load_chunk)):
-                            if g.load_chunk[block_id] == g.chunk_loaded_touched:
-                                if f.data_chunks[block_id] is None:
-                                    # file chunks were never loaded.
-                                    # happens when field not called by kernel, but shares a grid with another field called by kernel
-                                    break
-                                block = f.get_block(block_id)
-                                f.data_chunks[block_id][1] = None
-                                f.data_chunks[block_id][0] = np.array(f.data.blocks[(slice(2),)+block][0])
+                    tnew = 1 if signdt >= 0 else 0
+                    touched = []
+                    for block_id in range(len(g.load_chunk)):
+                        if g.load_chunk[block_id] == g.chunk_loaded_touched:
+                            if f.data_chunks[block_id] is None:
+                                # file chunks were never loaded.
+                                # happens when field not called by kernel, but shares a grid with another field called by kernel
+                                break
+                            f.data_chunks[block_id][1-tnew] = None
+                            touched.append(block_id)
+                    blocks = [f.data.blocks[(slice(2),)+f.get_block(block_id)][tnew] for block_id in touched]
+                    for block_id, block_data in zip(touched, f.compute_blocks(blocks)):
+                        f.data_chunks[block_id][tnew] = block_data
         # do user-defined computations on fieldset data
         if self.compute_on_defer:
             self.compute_on_defer(self)
@@ -1182,3 +1241,14 @@ class FieldSet(object):
                 return nextTime
             else:
                 return time + nSteps * dt
+
+    def set_time_snapshot(self, time):
+        """Sets the time at which the Fields with more than one time snapshot are sampled.
+        These Fields are then sampled from a copy of their loaded chunks that is interpolated in time to
+        this time, instead of interpolating in time at every sample. Grids with a time-varying depth are
+        excluded. This is used by ParticleSet.execute() with snapshot_dt
+
+        :param time: Time to interpolate the Fields to, or None to sample them at the time of each sample again
+        """
+        for g in self.gridset.grids:
+            g.snapshot_time = time if time is not None and g.tdim > 1 and g.z4d != 1 else None
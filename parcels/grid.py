@@ -29,6 +29,23 @@ class CGrid(Structure):
                 ('grid', c_void_p)]
 
 
+class CStructuredGrid(Structure):
+    # z4d is only to have same cstruct as RectilinearSGrid
+    _fields_ = [('xdim', c_int), ('ydim', c_int), ('zdim', c_int),
+                ('tdim', c_int), ('z4d', c_int),
+                ('mesh_spherical', c_int), ('zonal_periodic', c_int),
+                ('zonal_period', c_float),
+                ('chunk_info', POINTER(c_int)),
+                ('load_chunk', POINTER(c_int)),
+                ('tfull_min', c_double), ('tfull_max', c_double), ('periods', POINTER(c_int)),
+                ('lonlat_minmax', POINTER(c_float)),
+                ('seed_nx', c_int), ('seed_ny', c_int), ('seed_index', POINTER(c_int)),
+                ('lon_spacing', c_double), ('lat_spacing', c_double), ('depth_spacing', c_double),
+                ('lon', POINTER(c_float)), ('lat', POINTER(c_float)),
+                ('depth', POINTER(c_float)), ('time', POINTER(c_double))
+                ]
+
+
 class Grid(object):
     """Grid class that defines a (spatial and temporal) grid on which Fields are defined
 
@@ -54,8 +71,18 @@ class Grid(object):
         assert isinstance(self.time_origin, TimeConverter), 'time_origin needs to be a TimeConverter object'
         self.mesh = mesh
         self.cstruct = None
+        self._cstruct_sources = None
+        self._cgrid = None
+        self._csnapshot = None
+        self.snapshot_time = None
         self.cell_edge_sizes = {}
         self.zonal_periodic = False
+        self.zonal_period = 0
+        self._seed_index = None
+        self._seed_lon = None
+        self._axis_spacing = {}
+        self._search_memo = {}
+        self._search_memo_coords = None
         self.zonal_halo = 0
         self.meridional_halo = 0
         self.lat_flipped = False
@@ -90,40 +117,58 @@ class Grid(object):
     @property
     def ctypes_struct(self):
         # This is unnecessary for the moment, but it could be useful when going will fully unstructured grids
-        self.cgrid = cast(pointer(self.child_ctypes_struct), c_void_p)
-        cstruct = CGrid(self.gtype, self.cgrid.value)
-        return cstruct
+        child = self.child_ctypes_struct
+        if self._cgrid is None or self._cgrid[0] is not child:
+            self.cgrid = cast(pointer(child), c_void_p)
+            self._cgrid = (child, CGrid(self.gtype, self.cgrid.value))
+        return self._cgrid[1]
+
+    @property
+    def snapshot_ctypes_struct(self):
+        """Returns a ctypes struct object of this grid with a single time, snapshot_time, for the Fields
+        that are sampled from their time-interpolated snapshot (see FieldSet.set_time_snapshot).
+        It shares all other pointers, including load_chunk, with child_ctypes_struct"""
+        child = self.child_ctypes_struct
+        if self._csnapshot is None or self._csnapshot[0] is not child:
+            snapshot = CStructuredGrid.from_buffer_copy(child)
+            snapshot_time = np.zeros(1, dtype=np.float64)
+            snapshot.tdim = 1
+            snapshot.time = snapshot_time.ctypes.data_as(POINTER(c_double))
+            self._csnapshot = (child, snapshot, snapshot_time, CGrid(self.gtype, cast(pointer(snapshot), c_void_p).value))
+        self._csnapshot[2][0] = self.snapshot_time
+        return self._csnapshot[3]
 
     @property
     def child_ctypes_struct(self):
         """Returns a ctypes struct object containing all relevant
-        pointers and sizes for this grid."""
-
-        class CStructuredGrid(Structure):
-            # z4d is only to have same cstruct as RectilinearSGrid
-            _fields_ = [('xdim', c_int), ('ydim', c_int), ('zdim', c_int),
-                        ('tdim', c_int), ('z4d', c_int),
-                        ('mesh_spherical', c_int), ('zonal_periodic', c_int),
-                        ('chunk_info', POINTER(c_int)),
-                        ('load_chunk', POINTER(c_int)),
-                        ('tfull_min', c_double), ('tfull_max', c_double), ('periods', POINTER(c_int)),
-                        ('lonlat_minmax', POINTER(c_float)),
-                        ('lon', POINTER(c_float)), ('lat', POINTER(c_float)),
-                        ('depth', POINTER(c_float)), ('time', POINTER(c_double))
-                        ]
+        pointers and sizes for this grid. The struct is kept between kernel calls, and only
+        recreated when one of the arrays it points to has been replaced or a dimension has changed"""
+        arrays = (self.load_chunk, self.chunk_info, self.lon, self.lat, self.depth, self.time, self.time_full,
+                  self.lonlat_minmax, self.seed_index)
+        dims = (self.xdim, self.ydim, self.zdim, self.tdim, self.z4d, self.zonal_periodic, self.zonal_period)
+        if self._cstruct_sources is None or self._cstruct_sources[1] != dims \
+                or any(a is not c for a, c in zip(arrays, self._cstruct_sources[0])):
+            self.cstruct = None
+            self._cstruct_sources = (arrays, dims)
 
         # Create and populate the c-struct object
         if not self.cstruct:  # Not to point to the same grid various times if grid in various fields
             if not isinstance(self.periods, c_int):
                 self.periods = c_int()
                 self.periods.value = 0
+            seed_index = self.seed_index
+            seed_ny, seed_nx = (0, 0) if seed_index is None else seed_index.shape[:2]
             self.cstruct = CStructuredGrid(self.xdim, self.ydim, self.zdim,
                                            self.tdim, self.z4d,
                                            int(self.mesh == 'spherical'), int(self.zonal_periodic),
+                                           self.zonal_period,
                                            (c_int * len(self.chunk_info))(*self.chunk_info),
                                            self.load_chunk.ctypes.data_as(POINTER(c_int)),
                                            self.time_full[0], self.time_full[-1], pointer(self.periods),
                                            self.lonlat_minmax.ctypes.data_as(POINTER(c_float)),
+                                           seed_nx, seed_ny,
+                                           None if seed_index is None else seed_index.ctypes.data_as(POINTER(c_int)),
+                                           self.axis_spacing('lon'), self.axis_spacing('lat'), self.axis_spacing('depth'),
                                            self.lon.ctypes.data_as(POINTER(c_float)),
                                            self.lat.ctypes.data_as(POINTER(c_float)),
                                            self.depth.ctypes.data_as(POINTER(c_float)),
@@ -166,6 +211,86 @@ class Grid(object):
         dx = np.where(dx > 180, dx-360, dx)
         self.zonal_periodic = sum(dx) > 359.9
 
+    @property
+    def zonal_wrap(self):
+        """Whether the zonal periodicity of this Grid is handled lazily, by wrapping
+        the indices around instead of through a materialised halo"""
+        return self.zonal_period > 0
+
+    @property
+    def seed_index(self):
+        """Coarse lookup table used to seed the index search. Only defined on CurvilinearGrids"""
+        return None
+
+    @property
+    def search_memo(self):
+        """Memo of the most recent index search results on this Grid (in Scipy mode), keyed on the
+        searched location. It is emptied when it grows large, and when the coordinates of the Grid change"""
+        coords = (self.lon, self.lat, self.depth)
+        if len(self._search_memo) > 16 or self._search_memo_coords is None or \
+                any(c is not m for c, m in zip(coords, self._search_memo_coords)):
+            self._search_memo = {}
+            self._search_memo_coords = coords
+        return self._search_memo
+
+    def axis_spacing(self, axis):
+        """Returns the constant spacing of the lon, lat or depth vector of a RectilinearGrid
+        (or of the depth vector of a z-grid), so that the index search can compute the index directly.
+        Returns 0 if the axis is not a vector or if its spacing is not uniform
+
+        :param axis: name of the axis ('lon', 'lat' or 'depth')
+        """
+        return self._axis_properties(axis)[0]
+
+    def _axis_properties(self, axis):
+        vals = getattr(self, axis)
+        cached = self._axis_spacing.get(axis)
+        if cached is None or cached[0] is not vals:
+            spacing = 0.
+            increasing = False
+            if len(vals.shape) == 1 and vals.size > 1:
+                dx = np.diff(vals.astype(np.float64))
+                increasing = bool(np.all(dx > 0))
+                if np.all(np.isfinite(dx)) and np.allclose(dx, dx[0], rtol=1e-5, atol=0) and dx[0] != 0:
+                    spacing = float(dx[0])
+            cached = (vals, (spacing, increasing))
+            self._axis_spacing[axis] = cached
+        return cached[1]
+
+    def axis_increasing(self, axis):
+        """Returns whether the lon, lat or depth vector is strictly increasing
+
+        :param axis: name of the axis ('lon', 'lat' or 'depth')
+        """
+        return self._axis_properties(axis)[1]
+
+    def axis_index(self, axis, x):
+        """Returns the index i of the lon or lat vector such that vals[i] < x <= vals[i+1],
+        clipped to [0, size-2]. The index is computed directly on uniform axes and through
+        a binary search on other increasing axes
+
+        :param axis: name of the axis ('lon' or 'lat')
+        :param x: coordinate to locate
+        """
+        vals = getattr(self, axis)
+        n = vals.size
+        spacing, increasing = self._axis_properties(axis)
+        if spacing > 0:
+            i = np.floor((x - vals[0]) / spacing)
+            i = int(min(i, n-2)) if i >= 0 else 0
+            # correct for rounding errors in the direct index
+            while i > 0 and vals[i] >= x:
+                i -= 1
+            while i < n-2 and vals[i+1] < x:
+                i += 1
+            return i
+        elif increasing:
+            return int(min(max(np.searchsorted(vals, x, side='left') - 1, 0), n-2))
+        index = vals < x
+        if index.all():
+            return n - 2
+        return index.argmin() - 1 if index.any() else 0
+
     def add_Sdepth_periodic_halo(self, zonal, meridional, halosize):
         if zonal:
             if len(self.depth.shape) == 3:
@@ -188,6 +313,7 @@ class Grid(object):
 
     def computeTimeChunk(self, f, time, signdt):
         nextTime_loc = np.infty if signdt >= 0 else -np.infty
+        self._search_memo = {}  # the (s-grid) depth may be updated in place
         periods = self.periods.value if isinstance(self.periods, c_int) else self.periods
         prev_time_indices = self.time
         if self.update_status == 'not_updated':
@@ -278,14 +404,23 @@ class RectilinearGrid(Grid):
             logger.warning_once("Flipping lat data from North-South to South-North. "
                                 "Note that this may lead to wrong sign for meridional velocity, so tread very carefully")
 
-    def add_periodic_halo(self, zonal, meridional, halosize=5):
+    def add_periodic_halo(self, zonal, meridional, halosize=5, lazy=False):
         """Add a 'halo' to the Grid, through extending the Grid (and lon/lat)
         similarly to the halo created for the Fields
 
         :param zonal: Create a halo in zonal direction (boolean)
         :param meridional: Create a halo in meridional direction (boolean)
         :param halosize: size of the halo (in grid points). Default is 5 grid points
+        :param lazy: Boolean whether the zonal halo is handled by wrapping the indices around
+               during the index search, instead of concatenating halosize columns to lon
+               (and to the data of the Fields). Default is False
         """
+        if zonal and lazy:
+            if not np.all(np.diff(self.lon) > 0):
+                raise ValueError("A lazy zonal halo requires a monotonically increasing longitude vector")
+            self.zonal_period = float(self.lon[-1] - 2 * self.lon[0] + self.lon[1])
+            self.zonal_periodic = True
+            zonal = False
         if zonal:
             lonshift = (self.lon[-1] - 2 * self.lon[0] + self.lon[1])
             if not np.allclose(self.lon[1]-self.lon[0], self.lon[-1]-self.lon[-2]):
@@ -399,14 +534,93 @@ class CurvilinearGrid(Grid):
         self.ydim = self.lon.shape[0]
         self.tdim = self.time.size
 
-    def add_periodic_halo(self, zonal, meridional, halosize=5):
+    @property
+    def seed_index(self):
+        """Coarse lookup table of shape (ny, nx, 2) that gives, for each lon/lat bucket
+        spanning lonlat_minmax, the (yi, xi) indices of a cell lying in (or close to) that bucket.
+        It is used to seed the curvilinear index search of particles that do not have a good
+        first guess yet (e.g. freshly released particles), so that the iterative search
+        only has to walk a few cells. The table is built on first use, and rebuilt when lon changes
+        """
+        if self._seed_index is None or self._seed_lon is not self.lon:
+            self._seed_index = self._build_seed_index()
+            self._seed_lon = self.lon
+        return self._seed_index
+
+    def _build_seed_index(self, cells_per_bucket=4, max_buckets=512):
+        ny = int(min(max((self.ydim - 1) // cells_per_bucket, 1), max_buckets))
+        nx = int(min(max((self.xdim - 1) // cells_per_bucket, 1), max_buckets))
+        yi, xi = np.mgrid[0:self.ydim-1, 0:self.xdim-1]
+        lon = self.lon[:-1, :-1]
+        lat = self.lat[:-1, :-1]
+        valid = np.isfinite(lon) & np.isfinite(lat)
+        bx, by = self._seed_bucket(lon[valid], lat[valid], nx, ny)
+        seed = -np.ones((ny, nx, 2), dtype=np.int32)
+        seed[by, bx, 0] = yi[valid]
+        seed[by, bx, 1] = xi[valid]
+        # fill the empty buckets with the cell of a neighbouring bucket
+        empty = seed[:, :, 0] < 0
+        while empty.any() and not empty.all():
+            for shift, axis in [(1, 0), (-1, 0), (1, 1), (-1, 1)]:
+                neighbour = np.roll(seed, shift, axis=axis)
+                fill = empty & (neighbour[:, :, 0] >= 0)
+                seed[fill] = neighbour[fill]
+                empty = seed[:, :, 0] < 0
+        seed[empty] = 0
+        return seed
+
+    def _seed_bucket(self, x, y, nx, ny):
+        xmin, xmax, ymin, ymax = self.lonlat_minmax
+        if self.mesh == 'spherical':
+            x = np.where(x < xmin, x + 360, x)
+            x = np.where(x > xmax, x - 360, x)
+        bx = np.floor((x - xmin) / max(xmax - xmin, 1e-12) * nx)
+        by = np.floor((y - ymin) / max(ymax - ymin, 1e-12) * ny)
+        return np.clip(bx, 0, nx-1).astype(np.int32), np.clip(by, 0, ny-1).astype(np.int32)
+
+    def search_start(self, x, y, xi=None, yi=None):
+        """Returns the (xi, yi) cell from which to start the index search for location (x, y).
+        This is the (xi, yi) first guess if valid and closer to (x, y) than the cell given by the seed_index
+
+        :param x: longitude of the location
+        :param y: latitude of the location
+        :param xi: first guess of the zonal index (e.g. from the previous search of a particle)
+        :param yi: first guess of the meridional index (e.g. from the previous search of a particle)
+        """
+        seed = self.seed_index
+        bx, by = self._seed_bucket(np.array(x), np.array(y), seed.shape[1], seed.shape[0])
+        seed_yi, seed_xi = seed[by, bx]
+        xi_min = -1 if self.zonal_wrap else 0
+        if xi is None or yi is None or not (xi_min <= xi <= self.xdim-2 and 0 <= yi <= self.ydim-2):
+            return int(seed_xi), int(seed_yi)
+
+        def dist2(j, i):
+            dx = abs(x - self.lon[j, i])
+            if self.mesh == 'spherical':
+                dx = dx % 360
+                dx = 360 - dx if dx > 180 else dx
+            return dx**2 + (y - self.lat[j, i])**2
+        if dist2(seed_yi, seed_xi) < dist2(yi, xi):
+            return int(seed_xi), int(seed_yi)
+        return xi, yi
+
+    def add_periodic_halo(self, zonal, meridional, halosize=5, lazy=False):
         """Add a 'halo' to the Grid, through extending the Grid (and lon/lat)
         similarly to the halo created for the Fields
 
         :param zonal: Create a halo in zonal direction (boolean)
         :param meridional: Create a halo in meridional direction (boolean)
         :param halosize: size of the halo (in grid points). Default is 5 grid points
+        :param lazy: Boolean whether the zonal halo is handled by wrapping the indices around
+               during the index search, instead of concatenating halosize columns to lon/lat
+               (and to the data of the Fields). Only available for spherical meshes. Default is False
         """
+        if zonal and lazy:
+            if self.mesh != 'spherical':
+                raise NotImplementedError("A lazy zonal halo on a CurvilinearGrid is only implemented for spherical meshes")
+            self.zonal_period = 360.
+            self.zonal_periodic = True
+            zonal = False
         if zonal:
             lonshift = self.lon[:, -1] - 2 * self.lon[:, 0] + self.lon[:, 1]
             if not np.allclose(self.lon[:, 1]-self.lon[:, 0], self.lon[:, -1]-self.lon[:, -2]):
@@ -9,6 +9,7 @@ extern "C" {
 #include <math.h>
 
 #define CHECKSTATUS(res) do {if (res != SUCCESS) return res;} while (0)
+#define CHECKSTATUS_KERNEL(res) do {if (res != SUCCESS) {err = res; goto kernel_exit;}} while (0)
 #define rtol 1.e-5
 #define atol 1.e-8
 
@@ -38,11 +39,15 @@ typedef struct
 {
   int xdim, ydim, zdim, tdim, z4d;
   int sphere_mesh, zonal_periodic;
+  float zonal_period;
   int *chunk_info;
   int *load_chunk;
   double tfull_min, tfull_max;
   int* periods;
   float *lonlat_minmax;
+  int seed_nx, seed_ny;
+  int *seed_index;
+  double lon_spacing, lat_spacing, depth_spacing;
   float *lon, *lat, *depth;
   double *time;
 } CStructuredGrid;
@@ -89,14 +94,52 @@ static inline bool is_equal_flt(float a, float b) {
 }
 
 static inline bool is_zero_dbl(double a) {
-    return (fabs(a) <= DBL_EPSILON * fabs(a));
+    return !isinf(a) && (fabs(a) <= DBL_EPSILON * fabs(a));
 }
 
 static inline bool is_zero_flt(float a) {
-    return (fabs(a) <= FLT_EPSILON * fabs(a));
+    return !isinf(a) && (fabs(a) <= FLT_EPSILON * fabs(a));
 }
 
-static inline StatusCode search_indices_vertical_z(type_coord z, int zdim, float *zvals, int *zi, double *zeta, int gridindexingtype)
+/* Index of the eastern neighbour of column xi. On grids with a lazy zonal halo
+ * (zonal_period > 0) the last column connects back to the first one */
+static inline int zonal_neighbour(int xi, int xdim)
+{
+  return (xi < xdim-1) ? xi+1 : 0;
+}
+
+/* First guess of the index i such that x lies between vals[i] and vals[i+1] on a monotonic axis of size n.
+ * Uniform axes (spacing != 0) are indexed directly. On other axes, the previous index is kept if x
+ * lies within a few cells of it, and a binary search is done otherwise.
+ * The guess is then refined by the local linear walk of the caller */
+static inline void search_axis_first_guess(double x, int n, float *vals, double spacing, int *i)
+{
+  if (spacing != 0){
+    double di = floor((x - vals[0]) / spacing);
+    *i = (di > n-2) ? n-2 : ((di >= 0) ? (int) di : 0);
+    return;
+  }
+  int incr = vals[n-1] > vals[0];
+  int lo, hi;
+  if ((*i >= 0) && (*i <= n-1)){
+    lo = (*i > 4) ? *i-4 : 0;
+    hi = (*i < n-5) ? *i+4 : n-1;
+    if (incr ? ((x >= vals[lo]) && (x <= vals[hi])) : ((x <= vals[lo]) && (x >= vals[hi])))
+      return;
+  }
+  lo = 0;
+  hi = n-1;
+  while (hi - lo > 1){
+    int mid = (lo + hi) / 2;
+    if (incr ? (x > vals[mid]) : (x < vals[mid]))
+      lo = mid;
+    else
+      hi = mid;
+  }
+  *i = lo;
+}
+
+static inline StatusCode search_indices_vertical_z(type_coord z, int zdim, float *zvals, double zspacing, int *zi, double *zeta, int gridindexingtype)
 {
   if (zvals[zdim-1] > zvals[0]){
     if ((z < zvals[0]) && (gridindexingtype == MOM5) && (z > 2 * zvals[0] - zvals[1])){
@@ -106,12 +149,14 @@ static inline StatusCode search_indices_vertical_z(type_coord z, int zdim, float
     }
     if (z < zvals[0]) {return ERROR_THROUGH_SURFACE;}
     if (z > zvals[zdim-1]) {return ERROR_OUT_OF_BOUNDS;}
+    search_axis_first_guess(z, zdim, zvals, zspacing, zi);
     while (*zi < zdim-1 && z > zvals[*zi+1]) ++(*zi);
     while (*zi > 0 && z < zvals[*zi]) --(*zi);
   }
   else{
     if (z > zvals[0]) {return ERROR_THROUGH_SURFACE;}
     if (z < zvals[zdim-1]) {return ERROR_OUT_OF_BOUNDS;}
+    search_axis_first_guess(z, zdim, zvals, zspacing, zi);
     while (*zi < zdim-1 && z < zvals[*zi+1]) ++(*zi);
     while (*zi > 0 && z > zvals[*zi]) --(*zi);
   }
@@ -131,6 +176,7 @@ static inline StatusCode search_indices_vertical_s(type_coord z, int xdim, int y
   }
   float zcol[zdim];
   int zii;
+  int xi1 = zonal_neighbour(xi, xdim);
   if (z4d == 1){
     float (*zvalstab)[zdim][ydim][xdim] = (float (*)[zdim][ydim][xdim]) zvals;
     int ti1 = ti;
@@ -139,12 +185,12 @@ static inline StatusCode search_indices_vertical_s(type_coord z, int xdim, int y
     double zt0, zt1;
     for (zii=0; zii < zdim; zii++){
       zt0 = (1-xsi)*(1-eta) * zvalstab[ti ][zii][yi  ][xi  ]
-          + (  xsi)*(1-eta) * zvalstab[ti ][zii][yi  ][xi+1]
-          + (  xsi)*(  eta) * zvalstab[ti ][zii][yi+1][xi+1]
+          + (  xsi)*(1-eta) * zvalstab[ti ][zii][yi  ][xi1 ]
+          + (  xsi)*(  eta) * zvalstab[ti ][zii][yi+1][xi1 ]
           + (1-xsi)*(  eta) * zvalstab[ti ][zii][yi+1][xi  ];
       zt1 = (1-xsi)*(1-eta) * zvalstab[ti1][zii][yi  ][xi  ]
-          + (  xsi)*(1-eta) * zvalstab[ti1][zii][yi  ][xi+1]
-          + (  xsi)*(  eta) * zvalstab[ti1][zii][yi+1][xi+1]
+          + (  xsi)*(1-eta) * zvalstab[ti1][zii][yi  ][xi1 ]
+          + (  xsi)*(  eta) * zvalstab[ti1][zii][yi+1][xi1 ]
           + (1-xsi)*(  eta) * zvalstab[ti1][zii][yi+1][xi  ];
       zcol[zii] = zt0 + (zt1 - zt0) * (float)((time - t0) / (t1 - t0));
     }
@@ -154,8 +200,8 @@ static inline StatusCode search_indices_vertical_s(type_coord z, int xdim, int y
     float (*zvalstab)[ydim][xdim] = (float (*)[ydim][xdim]) zvals;
     for (zii=0; zii < zdim; zii++){
       zcol[zii] = (1-xsi)*(1-eta) * zvalstab[zii][yi  ][xi  ]
-                + (  xsi)*(1-eta) * zvalstab[zii][yi  ][xi+1]
-                + (  xsi)*(  eta) * zvalstab[zii][yi+1][xi+1]
+                + (  xsi)*(1-eta) * zvalstab[zii][yi  ][xi1 ]
+                + (  xsi)*(  eta) * zvalstab[zii][yi+1][xi1 ]
                 + (1-xsi)*(  eta) * zvalstab[zii][yi+1][xi  ];
     }
   }
@@ -178,19 +224,26 @@ static inline StatusCode search_indices_vertical_s(type_coord z, int xdim, int y
   return SUCCESS;
 }
 
-static inline void reconnect_bnd_indices(int *xi, int *yi, int xdim, int ydim, int onlyX, int sphere_mesh)
+static inline void reconnect_bnd_indices(int *xi, int *yi, int xdim, int ydim, int onlyX, int sphere_mesh, int zonal_wrap)
 {
-  if (*xi < 0){
-    if (sphere_mesh)
-      (*xi) = xdim-2;
-    else
-      (*xi) = 0;
+  if (zonal_wrap){
+    // lazy zonal halo: cell xdim-1 spans the last and the first columns
+    if (*xi < 0) (*xi) += xdim;
+    if (*xi > xdim-1) (*xi) -= xdim;
   }
-  if (*xi > xdim-2){
-    if (sphere_mesh)
-      (*xi) = 0;
-    else
-      (*xi) = xdim-2;
+  else{
+    if (*xi < 0){
+      if (sphere_mesh)
+        (*xi) = xdim-2;
+      else
+        (*xi) = 0;
+    }
+    if (*xi > xdim-2){
+      if (sphere_mesh)
+        (*xi) = 0;
+      else
+        (*xi) = xdim-2;
+    }
   }
   if (onlyX == 0){
     if (*yi < 0){
@@ -199,7 +252,7 @@ static inline void reconnect_bnd_indices(int *xi, int *yi, int xdim, int ydim, i
     if (*yi > ydim-2){
       (*yi) = ydim-2;
       if (sphere_mesh)
-        (*xi) = xdim - (*xi);
+        (*xi) = (zonal_wrap) ? (xdim - (*xi)) % xdim : xdim - (*xi);
     }
   }
 }
@@ -233,13 +286,31 @@ static inline StatusCode search_indices_rectilinear(type_coord x, type_coord y,
     *xi = 0;
     *xsi = 0;
   }
+  else if (grid->zonal_period > 0){
+    // lazy zonal halo: bring x back into [xvals[0], xvals[0]+zonal_period)
+    double period = grid->zonal_period;
+    double xloc = xvals[0] + fmod(x - xvals[0], period);
+    if (xloc < xvals[0]) xloc += period;
+    search_axis_first_guess(xloc, xdim, xvals, grid->lon_spacing, xi);
+    while (*xi < xdim-1 && xloc > xvals[*xi+1]) ++(*xi);
+    while (*xi > 0 && xloc < xvals[*xi]) --(*xi);
+    double xvalsi1 = (*xi < xdim-1) ? xvals[*xi+1] : xvals[0] + period;
+    *xsi = (xloc - xvals[*xi]) / (xvalsi1 - xvals[*xi]);
+  }
   else if (sphere_mesh == 0){
+    search_axis_first_guess(x, xdim, xvals, grid->lon_spacing, xi);
     while (*xi < xdim-1 && x > xvals[*xi+1]) ++(*xi);
     while (*xi > 0 && x < xvals[*xi]) --(*xi);
     *xsi = (x - xvals[*xi]) / (xvals[*xi+1] - xvals[*xi]);
   }
   else{
-
+    if (xvals[xdim-1] > xvals[0]){
+      // monotonic longitudes: start from the cell of x shifted into [xvals[0], xvals[0]+360)
+      double xloc = xvals[0] + fmod(x - xvals[0], 360);
+      if (xloc < xvals[0]) xloc += 360;
+      search_axis_first_guess(xloc, xdim, xvals, grid->lon_spacing, xi);
+      if (*xi > xdim-2) *xi = xdim-2;
+    }
     float xvalsi = xvals[*xi];
     // TODO: this will fail if longitude is e.g. only [-180, 180] (so length 2)
     if (xvalsi < x - 225) xvalsi += 360;
@@ -255,7 +326,7 @@ static inline StatusCode search_indices_rectilinear(type_coord x, type_coord y,
         ++(*xi);
       else if (xvalsi > x)
         --(*xi);
-      reconnect_bnd_indices(xi, yi, xdim, ydim, 1, 1);
+      reconnect_bnd_indices(xi, yi, xdim, ydim, 1, 1, 0);
       xvalsi = xvals[*xi];
       if (xvalsi < x - 225) xvalsi += 360;
       if (xvalsi > x + 225) xvalsi -= 360;
@@ -276,6 +347,7 @@ static inline StatusCode search_indices_rectilinear(type_coord x, type_coord y,
     *eta = 0;
   }
   else {
+    search_axis_first_guess(y, ydim, yvals, grid->lat_spacing, yi);
     while (*yi < ydim-1 && y > yvals[*yi+1]) ++(*yi);
     while (*yi > 0 && y < yvals[*yi]) --(*yi);
     *eta = (y - yvals[*yi]) / (yvals[*yi+1] - yvals[*yi]);
@@ -285,7 +357,7 @@ static inline StatusCode search_indices_rectilinear(type_coord x, type_coord y,
   if (zdim > 1){
     switch(gcode){
       case RECTILINEAR_Z_GRID:
-        status = search_indices_vertical_z(z, zdim, zvals, zi, zeta, gridindexingtype);
+        status = search_indices_vertical_z(z, zdim, zvals, grid->depth_spacing, zi, zeta, gridindexingtype);
         break;
       case RECTILINEAR_S_GRID:
         status = search_indices_vertical_s(z, xdim, ydim, zdim, zvals,
@@ -315,6 +387,45 @@ static inline StatusCode search_indices_rectilinear(type_coord x, type_coord y,
 }
 
 
+// squared distance between (x, y) and grid node (yi, xi), accounting for the periodicity of the sphere
+static inline double node_distance2(type_coord x, type_coord y, CStructuredGrid *grid, int xi, int yi)
+{
+  double dx = fabs(x - grid->lon[yi*grid->xdim + xi]);
+  double dy = y - grid->lat[yi*grid->xdim + xi];
+  if (grid->sphere_mesh){
+    dx = fmod(dx, 360);
+    if (dx > 180) dx = 360 - dx;
+  }
+  return dx*dx + dy*dy;
+}
+
+/* Replaces the (xi, yi) first guess of the curvilinear search by the cell stored in the coarse
+   seed_index bucket of (x, y) if the first guess is invalid or further away from (x, y) */
+static inline void curvilinear_search_start(type_coord x, type_coord y, CStructuredGrid *grid, int *xi, int *yi)
+{
+  int nx = grid->seed_nx;
+  int ny = grid->seed_ny;
+  float *xy_minmax = grid->lonlat_minmax;
+  double xloc = x;
+  if (grid->sphere_mesh){
+    if (xloc < xy_minmax[0]) xloc += 360;
+    if (xloc > xy_minmax[1]) xloc -= 360;
+  }
+  int bx = (int) floor((xloc - xy_minmax[0]) / fmax(xy_minmax[1] - xy_minmax[0], 1e-12) * nx);
+  int by = (int) floor((y - xy_minmax[2]) / fmax(xy_minmax[3] - xy_minmax[2], 1e-12) * ny);
+  bx = (bx < 0) ? 0 : ((bx > nx-1) ? nx-1 : bx);
+  by = (by < 0) ? 0 : ((by > ny-1) ? ny-1 : by);
+  int seed_yi = grid->seed_index[2*(by*nx + bx)];
+  int seed_xi = grid->seed_index[2*(by*nx + bx) + 1];
+
+  int xi_max = (grid->zonal_period > 0) ? grid->xdim-1 : grid->xdim-2;
+  if ((*xi < 0) || (*xi > xi_max) || (*yi < 0) || (*yi > grid->ydim-2) ||
+      (node_distance2(x, y, grid, seed_xi, seed_yi) < node_distance2(x, y, grid, *xi, *yi))){
+    *xi = seed_xi;
+    *yi = seed_yi;
+  }
+}
+
 static inline StatusCode search_indices_curvilinear(type_coord x, type_coord y, type_coord z, CStructuredGrid *grid, GridCode gcode,
                                                    int *xi, int *yi, int *zi, double *xsi, double *eta, double *zeta,
                                                    int ti, double time, double t0, double t1, int interp_method,
@@ -332,6 +443,7 @@ static inline StatusCode search_indices_curvilinear(type_coord x, type_coord y,
   float *xy_minmax = grid->lonlat_minmax;
   int sphere_mesh = grid->sphere_mesh;
   int zonal_periodic = grid->zonal_periodic;
+  int zonal_wrap = grid->zonal_period > 0;
   int z4d = grid->z4d;
 
   // NEMO convention
@@ -347,13 +459,17 @@ static inline StatusCode search_indices_curvilinear(type_coord x, type_coord y,
   if ((y < xy_minmax[2]) || (y > xy_minmax[3]))
     return ERROR_OUT_OF_BOUNDS;
 
+  if (grid->seed_index)
+    curvilinear_search_start(x, y, grid, xi, yi);
+
   double a[4], b[4];
 
   *xsi = *eta = -1;
   int maxIterSearch = 1e6, it = 0;
   double tol = 1e-10;
   while ( (*xsi < -tol) || (*xsi > 1+tol) || (*eta < -tol) || (*eta > 1+tol) ){
-    double xgrid_loc[4] = {xgrid[*yi][*xi], xgrid[*yi][*xi+1], xgrid[*yi+1][*xi+1], xgrid[*yi+1][*xi]};
+    int xi1 = zonal_neighbour(*xi, xdim);
+    double xgrid_loc[4] = {xgrid[*yi][*xi], xgrid[*yi][xi1], xgrid[*yi+1][xi1], xgrid[*yi+1][*xi]};
     if (sphere_mesh){ //we are on the sphere
       int i4;
       if (xgrid_loc[0] < x - 225) xgrid_loc[0] += 360;
@@ -363,7 +479,7 @@ static inline StatusCode search_indices_curvilinear(type_coord x, type_coord y,
         if (xgrid_loc[i4] > xgrid_loc[0] + 180) xgrid_loc[i4] -= 360;
       }
     }
-    double ygrid_loc[4] = {ygrid[*yi][*xi], ygrid[*yi][*xi+1], ygrid[*yi+1][*xi+1], ygrid[*yi+1][*xi]};
+    double ygrid_loc[4] = {ygrid[*yi][*xi], ygrid[*yi][xi1], ygrid[*yi+1][xi1], ygrid[*yi+1][*xi]};
 
     a[0] =  xgrid_loc[0];
     a[1] = -xgrid_loc[0]    + xgrid_loc[1];
@@ -389,9 +505,9 @@ static inline StatusCode search_indices_curvilinear(type_coord x, type_coord y,
                (y-ygrid_loc[3]) / (ygrid_loc[2]-ygrid_loc[3]) ) * .5;
     else
       *xsi = (x-a[0]-a[2]* (*eta)) / (a[1]+a[3]* (*eta));
-    if ( (*xsi < 0) && (*eta < 0) && (*xi == 0) && (*yi == 0) )
+    if ( (*xsi < 0) && (*eta < 0) && (*xi == 0) && (*yi == 0) && !zonal_wrap )
       return ERROR_OUT_OF_BOUNDS;
-    if ( (*xsi > 1) && (*eta > 1) && (*xi == xdim-1) && (*yi == ydim-1) )
+    if ( (*xsi > 1) && (*eta > 1) && (*xi == xdim-1) && (*yi == ydim-1) && !zonal_wrap )
       return ERROR_OUT_OF_BOUNDS;
     if (*xsi < -tol)
       (*xi)--;
@@ -401,7 +517,7 @@ static inline StatusCode search_indices_curvilinear(type_coord x, type_coord y,
       (*yi)--;
     if (*eta > 1+tol)
       (*yi)++;
-    reconnect_bnd_indices(xi, yi, xdim, ydim, 0, sphere_mesh);
+    reconnect_bnd_indices(xi, yi, xdim, ydim, 0, sphere_mesh, zonal_wrap);
     it++;
     if ( it > maxIterSearch){
       printf("Correct cell not found for (%f, %f) after %d iterations\n", x, y, maxIterSearch);
@@ -429,7 +545,7 @@ static inline StatusCode search_indices_curvilinear(type_coord x, type_coord y,
   if (zdim > 1){
     switch(gcode){
       case CURVILINEAR_Z_GRID:
-        status = search_indices_vertical_z(z, zdim, zvals, zi, zeta, gridindexingtype);
+        status = search_indices_vertical_z(z, zdim, zvals, grid->depth_spacing, zi, zeta, gridindexingtype);
         break;
       case CURVILINEAR_S_GRID:
         status = search_indices_vertical_s(z, xdim, ydim, zdim, zvals,
@@ -454,26 +570,72 @@ static inline StatusCode search_indices_curvilinear(type_coord x, type_coord y,
 /* Local linear search to update grid index
  * params ti, sizeT, time. t0, t1 are only used for 4D S grids
  * */
+/* Memo of the most recent successful index searches. It is reset by the particle loop at the start of
+ * each particle's time step, so that the RK stages of a kernel and the Fields sharing a Grid (U and V on an
+ * A-grid, tracers, ...) reuse the search results when they sample at the same location */
+typedef struct
+{
+  CStructuredGrid *grid;
+  type_coord x, y, z;
+  int ti, bgrid, gridindexingtype;
+  double time, t0, t1;
+  int xi, yi, zi;
+  double xsi, eta, zeta;
+} SearchMemoEntry;
+
+#define SEARCH_MEMO_SIZE 4
+static SearchMemoEntry search_memo[SEARCH_MEMO_SIZE];
+static int search_memo_count = 0;
+static int search_memo_next = 0;
+
+static inline void search_memo_reset()
+{
+  search_memo_count = 0;
+  search_memo_next = 0;
+}
+
 static inline StatusCode search_indices(type_coord x, type_coord y, type_coord z, CStructuredGrid *grid,
                                        int *xi, int *yi, int *zi, double *xsi, double *eta, double *zeta,
                                        GridCode gcode, int ti, double time, double t0, double t1, int interp_method,
                                        int gridindexingtype)
 {
+  // only the vertical search on s-grids depends on time and on the interpolation method
+  int sgrid = (gcode == RECTILINEAR_S_GRID) || (gcode == CURVILINEAR_S_GRID);
+  int bgrid = (interp_method == BGRID_VELOCITY) || (interp_method == BGRID_W_VELOCITY) || (interp_method == BGRID_TRACER);
+  int m;
+  for (m = 0; m < search_memo_count; ++m){
+    SearchMemoEntry *e = &search_memo[m];
+    if ((e->grid == grid) && (e->x == x) && (e->y == y) && (e->z == z) && (e->gridindexingtype == gridindexingtype) &&
+        (!sgrid || ((e->ti == ti) && (e->bgrid == bgrid) && (e->time == time) && (e->t0 == t0) && (e->t1 == t1)))){
+      *xi = e->xi; *yi = e->yi; *zi = e->zi;
+      *xsi = e->xsi; *eta = e->eta; *zeta = e->zeta;
+      return SUCCESS;
+    }
+  }
+
+  StatusCode status;
   switch(gcode){
     case RECTILINEAR_Z_GRID:
     case RECTILINEAR_S_GRID:
-      return search_indices_rectilinear(x, y, z, grid, gcode, xi, yi, zi, xsi, eta, zeta,
-                                   ti, time, t0, t1, interp_method, gridindexingtype);
+      status = search_indices_rectilinear(x, y, z, grid, gcode, xi, yi, zi, xsi, eta, zeta,
+                                          ti, time, t0, t1, interp_method, gridindexingtype);
       break;
     case CURVILINEAR_Z_GRID:
     case CURVILINEAR_S_GRID:
-      return search_indices_curvilinear(x, y, z, grid, gcode, xi, yi, zi, xsi, eta, zeta,
-                                   ti, time, t0, t1, interp_method, gridindexingtype);
+      status = search_indices_curvilinear(x, y, z, grid, gcode, xi, yi, zi, xsi, eta, zeta,
+                                          ti, time, t0, t1, interp_method, gridindexingtype);
       break;
     default:
       printf("Only RECTILINEAR_Z_GRID, RECTILINEAR_S_GRID, CURVILINEAR_Z_GRID and CURVILINEAR_S_GRID grids are currently implemented\n");
       return ERROR;
   }
+  CHECKSTATUS(status);
+
+  SearchMemoEntry entry = {grid, x, y, z, ti, bgrid, gridindexingtype, time, t0, t1, *xi, *yi, *zi, *xsi, *eta, *zeta};
+  search_memo[search_memo_next] = entry;
+  search_memo_next = (search_memo_next + 1) % SEARCH_MEMO_SIZE;
+  if (search_memo_count < SEARCH_MEMO_SIZE) ++search_memo_count;
+  return SUCCESS;
 }
 
 /* Local linear search to update time index */
@@ -297,7 +297,7 @@ static inline StatusCode getCell2D(CField *f, int xi, int yi, int ti, float cell
     for (tii=0; tii<2; ++tii){
       for (yii=0; yii<2; ++yii){
         for (xii=0; xii<2; ++xii){
-          blockid = getBlock2D(chunk_info, yi+yii, xi+xii, block, ilocal);
+          blockid = getBlock2D(chunk_info, yi+yii, (xii == 0) ? xi : zonal_neighbour(xi, grid->xdim), block, ilocal);
           if (grid->load_chunk[blockid] < 2){
             grid->load_chunk[blockid] = 1;
             return REPEAT;
@@ -392,7 +392,7 @@ static inline StatusCode getCell3D(CField *f, int xi, int yi, int zi, int ti, fl
       for (zii=0; zii<2; ++zii){
         for (yii=0; yii<2; ++yii){
           for (xii=0; xii<2; ++xii){
-            blockid = getBlock3D(chunk_info, zi+zii, yi+yii, xi+xii, block, ilocal);
+            blockid = getBlock3D(chunk_info, zi+zii, yi+yii, (xii == 0) ? xi : zonal_neighbour(xi, grid->xdim), block, ilocal);
             if (grid->load_chunk[blockid] < 2){
               grid->load_chunk[blockid] = 1;
               return REPEAT;
@@ -434,41 +434,20 @@ static inline StatusCode getCell3D(CField *f, int xi, int yi, int zi, int ti, fl
 
 
 /* Linear interpolation along the time axis */
-static inline StatusCode temporal_interpolation_structured_grid(type_coord x, type_coord y, type_coord z, double time, CField *f,
-                                                               GridCode gcode, int *xi, int *yi, int *zi, int *ti,
-                                                               float *value, int interp_method, int gridindexingtype)
+/* Interpolates Field f in the cell (xi, yi, zi) found by the index search, at time tsrch between
+   the time levels ti (at t0) and ti+1 (at t1). Only time level ti is used if tii == 1 */
+static inline StatusCode interpolate_structured_grid_cell(CField *f, int *xi, int *yi, int *zi, int *ti,
+                                                          double xsi, double eta, double zeta,
+                                                          int tii, double tsrch, double t0, double t1,
+                                                          float *value, int interp_method, int gridindexingtype)
 {
   StatusCode status;
   CStructuredGrid *grid = f->grid->grid;
   int igrid = f->igrid;
 
-  /* Find time index for temporal interpolation */
-  if (f->time_periodic == 0 && f->allow_time_extrapolation == 0 && (time < grid->time[0] || time > grid->time[grid->tdim-1])){
-    return ERROR_TIME_EXTRAPOLATION;
-  }
-  status = search_time_index(&time, grid->tdim, grid->time, &ti[igrid], f->time_periodic, grid->tfull_min, grid->tfull_max, grid->periods); CHECKSTATUS(status);
-
-  double xsi, eta, zeta;
-
   float data2D[2][2][2];
   float data3D[2][2][2][2];
-
-  // if we're in between time indices, and not at the end of the timeseries,
-  // we'll make sure to interpolate data between the two time values
-  // otherwise, we'll only use the data at the current time index
-  int tii = (ti[igrid] < grid->tdim-1 && time > grid->time[ti[igrid]]) ? 2 : 1;
-
   float val[2] = {0.0f, 0.0f};
-  double t0 = grid->time[ti[igrid]];
-  // we set our second time bound and search time depending on the
-  // index critereon above
-  double t1 = (tii == 2) ? grid->time[ti[igrid]+1] : t0+1;
-  double tsrch = (tii == 2) ? time : t0;
-
-  status = search_indices(x, y, z, grid, &xi[igrid], &yi[igrid], &zi[igrid],
-			  &xsi, &eta, &zeta, gcode, ti[igrid],
-			  tsrch, t0, t1, interp_method, gridindexingtype);
-  CHECKSTATUS(status);
 
   if (grid->zdim == 1) {
     // last param is a flag, which denotes that we only want the first timestep
@@ -550,6 +529,175 @@ static inline StatusCode temporal_interpolation_structured_grid(type_coord x, ty
 #undef INTERP
 }
 
+/* Finds the time levels around time for Field f and returns them as in temporal_interpolation_structured_grid */
+static inline StatusCode search_time_bracket(double time, CField *f, int *ti, int *tii, double *tsrch, double *t0, double *t1)
+{
+  StatusCode status;
+  CStructuredGrid *grid = f->grid->grid;
+  int igrid = f->igrid;
+
+  /* Find time index for temporal interpolation */
+  if (f->time_periodic == 0 && f->allow_time_extrapolation == 0 && (time < grid->time[0] || time > grid->time[grid->tdim-1])){
+    return ERROR_TIME_EXTRAPOLATION;
+  }
+  status = search_time_index(&time, grid->tdim, grid->time, &ti[igrid], f->time_periodic, grid->tfull_min, grid->tfull_max, grid->periods); CHECKSTATUS(status);
+
+  // if we're in between time indices, and not at the end of the timeseries,
+  // we'll make sure to interpolate data between the two time values
+  // otherwise, we'll only use the data at the current time index
+  *tii = (ti[igrid] < grid->tdim-1 && time > grid->time[ti[igrid]]) ? 2 : 1;
+
+  *t0 = grid->time[ti[igrid]];
+  // we set our second time bound and search time depending on the
+  // index critereon above
+  *t1 = (*tii == 2) ? grid->time[ti[igrid]+1] : *t0+1;
+  *tsrch = (*tii == 2) ? time : *t0;
+  return SUCCESS;
+}
+
+static inline StatusCode temporal_interpolation_structured_grid(type_coord x, type_coord y, type_coord z, double time, CField *f,
+                                                               GridCode gcode, int *xi, int *yi, int *zi, int *ti,
+                                                               float *value, int interp_method, int gridindexingtype)
+{
+  StatusCode status;
+  CStructuredGrid *grid = f->grid->grid;
+  int igrid = f->igrid;
+  int tii;
+  double xsi, eta, zeta, tsrch, t0, t1;
+
+  status = search_time_bracket(time, f, ti, &tii, &tsrch, &t0, &t1); CHECKSTATUS(status);
+  status = search_indices(x, y, z, grid, &xi[igrid], &yi[igrid], &zi[igrid],
+			  &xsi, &eta, &zeta, gcode, ti[igrid],
+			  tsrch, t0, t1, interp_method, gridindexingtype);
+  CHECKSTATUS(status);
+  return interpolate_structured_grid_cell(f, xi, yi, zi, ti, xsi, eta, zeta, tii, tsrch, t0, t1,
+                                          value, interp_method, gridindexingtype);
+}
+
+/* Samples the nfields Fields f, which share a Grid, the time settings and the gridindexingtype, at the same
+   location: the time levels and the cell are searched once, after which the cells of all Fields are interpolated */
+static inline StatusCode temporal_interpolation_multi(type_coord x, type_coord y, type_coord z, double time,
+                                                      CField **f, int nfields, int *xi, int *yi, int *zi, int *ti,
+                                                      float **values, int *interp_methods, int gridindexingtype)
+{
+  StatusCode status;
+  GridCode gcode = f[0]->grid->gtype;
+  if (gcode != RECTILINEAR_Z_GRID && gcode != RECTILINEAR_S_GRID && gcode != CURVILINEAR_Z_GRID && gcode != CURVILINEAR_S_GRID){
+    printf("Only RECTILINEAR_Z_GRID, RECTILINEAR_S_GRID, CURVILINEAR_Z_GRID and CURVILINEAR_S_GRID grids are currently implemented\n");
+    return ERROR;
+  }
+  CStructuredGrid *grid = f[0]->grid->grid;
+  int igrid = f[0]->igrid;
+  int tii, i;
+  double xsi, eta, zeta, tsrch, t0, t1;
+
+  status = search_time_bracket(time, f[0], ti, &tii, &tsrch, &t0, &t1); CHECKSTATUS(status);
+  status = search_indices(x, y, z, grid, &xi[igrid], &yi[igrid], &zi[igrid],
+			  &xsi, &eta, &zeta, gcode, ti[igrid],
+			  tsrch, t0, t1, interp_methods[0], gridindexingtype);
+  CHECKSTATUS(status);
+  for (i = 0; i < nfields; ++i){
+    status = interpolate_structured_grid_cell(f[i], xi, yi, zi, ti, xsi, eta, zeta, tii, tsrch, t0, t1,
+                                              values[i], interp_methods[i], gridindexingtype);
+    CHECKSTATUS(status);
+  }
+  return SUCCESS;
+}
+
+/* Number of particles that are advanced together in the batched particle loop */
+#define PARCELS_BATCH_SIZE 16
+#define PARCELS_BATCH_MAX_FIELDS 3
+
+/* Linear interpolation of the nfields (at most PARCELS_BATCH_MAX_FIELDS) Fields f, which share a Grid, the time
+   settings and the gridindexingtype, at the n (at most PARCELS_BATCH_SIZE) locations b for which mask[b] is set.
+   The index arrays of location b start at xi[b*stride] etc. The time and index search and the gathering of the
+   cell corners into contiguous arrays is done per location, after which the interpolation of the whole batch
+   is done in straight-line loops that the compiler can vectorise. The result is the same as that of
+   temporal_interpolation with interp_method LINEAR, and status[b] is set for each location in the mask */
+static inline void temporal_interpolation_linear_batch(int n, int *mask, type_coord *x, type_coord *y, type_coord *z,
+                                                       double *time, CField **f, int nfields,
+                                                       int *xi, int *yi, int *zi, int *ti, int stride,
+                                                       float **values, StatusCode *status, int gridindexingtype)
+{
+  CStructuredGrid *grid = f[0]->grid->grid;
+  GridCode gcode = f[0]->grid->gtype;
+  int igrid = f[0]->igrid;
+  int ncorners = (grid->zdim == 1) ? 4 : 8;
+  int b, i, k, tii, c;
+  double xsi[PARCELS_BATCH_SIZE], eta[PARCELS_BATCH_SIZE], zeta[PARCELS_BATCH_SIZE];
+  float tw[PARCELS_BATCH_SIZE];
+  float corners[PARCELS_BATCH_MAX_FIELDS][2][8][PARCELS_BATCH_SIZE];
+  float data2D[2][2][2];
+  float data3D[2][2][2][2];
+
+  for (b = 0; b < n; ++b){
+    double tsrch, t0, t1;
+    int *bxi = &xi[b*stride], *byi = &yi[b*stride], *bzi = &zi[b*stride], *bti = &ti[b*stride];
+    StatusCode s = SUCCESS;
+    xsi[b] = eta[b] = zeta[b] = 0;
+    tw[b] = 0;
+    tii = 1;
+    if (mask[b]){
+      s = search_time_bracket(time[b], f[0], bti, &tii, &tsrch, &t0, &t1);
+      if (s == SUCCESS)
+        s = search_indices(x[b], y[b], z[b], grid, &bxi[igrid], &byi[igrid], &bzi[igrid], &xsi[b], &eta[b], &zeta[b],
+                           gcode, bti[igrid], tsrch, t0, t1, LINEAR, gridindexingtype);
+      for (k = 0; k < nfields && s == SUCCESS; ++k){
+        if (grid->zdim == 1){
+          s = getCell2D(f[k], bxi[igrid], byi[igrid], bti[igrid], data2D, tii == 1);
+          for (i = 0; i < tii && s == SUCCESS; ++i)
+            for (c = 0; c < 4; ++c)
+              corners[k][i][c][b] = data2D[i][c/2][c%2];
+        } else {
+          s = getCell3D(f[k], bxi[igrid], byi[igrid], bzi[igrid], bti[igrid], data3D, tii == 1);
+          for (i = 0; i < tii && s == SUCCESS; ++i)
+            for (c = 0; c < 8; ++c)
+              corners[k][i][c][b] = data3D[i][c/4][(c/2)%2][c%2];
+        }
+      }
+      status[b] = s;
+      if (s == SUCCESS)
+        tw[b] = (float)((tsrch - t0) / (t1 - t0));
+    }
+    if (!mask[b] || s != SUCCESS){
+      xsi[b] = eta[b] = zeta[b] = 0;
+      tii = 0;
+    }
+    // unused time levels and locations are zeroed, so that the loops below have no branches
+    for (k = 0; k < nfields; ++k)
+      for (i = tii; i < 2; ++i)
+        for (c = 0; c < ncorners; ++c)
+          corners[k][i][c][b] = 0;
+  }
+
+  for (k = 0; k < nfields; ++k){
+    float *value = values[k];
+    if (grid->zdim == 1){
+      for (b = 0; b < n; ++b){
+        float val0 = (1-xsi[b])*(1-eta[b]) * corners[k][0][0][b] + xsi[b]*(1-eta[b]) * corners[k][0][1][b]
+                   + xsi[b]*eta[b] * corners[k][0][3][b] + (1-xsi[b])*eta[b] * corners[k][0][2][b];
+        float val1 = (1-xsi[b])*(1-eta[b]) * corners[k][1][0][b] + xsi[b]*(1-eta[b]) * corners[k][1][1][b]
+                   + xsi[b]*eta[b] * corners[k][1][3][b] + (1-xsi[b])*eta[b] * corners[k][1][2][b];
+        value[b] = val0 + (val1 - val0) * tw[b];
+      }
+    } else {
+      for (b = 0; b < n; ++b){
+        float f00 = (1-xsi[b])*(1-eta[b]) * corners[k][0][0][b] + xsi[b]*(1-eta[b]) * corners[k][0][1][b]
+                  + xsi[b]*eta[b] * corners[k][0][3][b] + (1-xsi[b])*eta[b] * corners[k][0][2][b];
+        float f01 = (1-xsi[b])*(1-eta[b]) * corners[k][0][4][b] + xsi[b]*(1-eta[b]) * corners[k][0][5][b]
+                  + xsi[b]*eta[b] * corners[k][0][7][b] + (1-xsi[b])*eta[b] * corners[k][0][6][b];
+        float f10 = (1-xsi[b])*(1-eta[b]) * corners[k][1][0][b] + xsi[b]*(1-eta[b]) * corners[k][1][1][b]
+                  + xsi[b]*eta[b] * corners[k][1][3][b] + (1-xsi[b])*eta[b] * corners[k][1][2][b];
+        float f11 = (1-xsi[b])*(1-eta[b]) * corners[k][1][4][b] + xsi[b]*(1-eta[b]) * corners[k][1][5][b]
+                  + xsi[b]*eta[b] * corners[k][1][7][b] + (1-xsi[b])*eta[b] * corners[k][1][6][b];
+        float val0 = (1-zeta[b]) * f00 + zeta[b] * f01;
+        float val1 = (1-zeta[b]) * f10 + zeta[b] * f11;
+        value[b] = val0 + (val1 - val0) * tw[b];
+      }
+    }
+  }
+}
+
 static double dist(double lon1, double lon2, double lat1, double lat2, int sphere_mesh, double lat)
 {
   if (sphere_mesh == 1){
@@ -572,11 +720,13 @@ static inline StatusCode spatial_interpolation_UV_c_grid(double xsi, double eta,
   double xgrid_loc[4];
   double ygrid_loc[4];
   int iN;
+  int xii[4] = {xi, zonal_neighbour(xi, xdim), zonal_neighbour(xi, xdim), xi};
   if( (gcode == RECTILINEAR_Z_GRID) || (gcode == RECTILINEAR_S_GRID) ){
     float *xgrid = grid->lon;
     float *ygrid = grid->lat;
     for (iN=0; iN < 4; ++iN){
-      xgrid_loc[iN] = xgrid[xi+min(1, (iN%3))];
+      xgrid_loc[iN] = xgrid[xii[iN]];
+      if (xii[iN] < xi) xgrid_loc[iN] += grid->zonal_period;
       ygrid_loc[iN] = ygrid[yi+iN/2];
     }
   }
@@ -584,8 +734,8 @@ static inline StatusCode spatial_interpolation_UV_c_grid(double xsi, double eta,
     float (* xgrid)[xdim] = (float (*)[xdim]) grid->lon;
     float (* ygrid)[xdim] = (float (*)[xdim]) grid->lat;
     for (iN=0; iN < 4; ++iN){
-      xgrid_loc[iN] = xgrid[yi+iN/2][xi+min(1, (iN%3))];
-      ygrid_loc[iN] = ygrid[yi+iN/2][xi+min(1, (iN%3))];
+      xgrid_loc[iN] = xgrid[yi+iN/2][xii[iN]];
+      ygrid_loc[iN] = ygrid[yi+iN/2][xii[iN]];
     }
   }
   int i4;
@@ -736,11 +886,13 @@ static inline StatusCode spatial_interpolation_UVW_c_grid(double xsi, double eta
   float xgrid_loc[4];
   float ygrid_loc[4];
   int iN;
+  int xii[4] = {xi, zonal_neighbour(xi, xdim), zonal_neighbour(xi, xdim), xi};
   if( gcode == RECTILINEAR_S_GRID ){
     float *xgrid = grid->lon;
     float *ygrid = grid->lat;
     for (iN=0; iN < 4; ++iN){
-      xgrid_loc[iN] = xgrid[xi+min(1, (iN%3))];
+      xgrid_loc[iN] = xgrid[xii[iN]];
+      if (xii[iN] < xi) xgrid_loc[iN] += grid->zonal_period;
       ygrid_loc[iN] = ygrid[yi+iN/2];
     }
   }
@@ -748,8 +900,8 @@ static inline StatusCode spatial_interpolation_UVW_c_grid(double xsi, double eta
     float (* xgrid)[xdim] = (float (*)[xdim]) grid->lon;
     float (* ygrid)[xdim] = (float (*)[xdim]) grid->lat;
     for (iN=0; iN < 4; ++iN){
-      xgrid_loc[iN] = xgrid[yi+iN/2][xi+min(1, (iN%3))];
-      ygrid_loc[iN] = ygrid[yi+iN/2][xi+min(1, (iN%3))];
+      xgrid_loc[iN] = xgrid[yi+iN/2][xii[iN]];
+      ygrid_loc[iN] = ygrid[yi+iN/2][xii[iN]];
     }
   }
   int i4;
@@ -773,15 +925,15 @@ static inline StatusCode spatial_interpolation_UVW_c_grid(double xsi, double eta
   if (grid->z4d == 1){
     float (*zvals)[zdim][ydim][xdim] = (float (*)[zdim][ydim][xdim]) grid->depth;
     for (iN=0; iN < 4; ++iN){
-      pz[iN] = zvals[ti][zi][yi+iN/2][xi+min(1, (iN%3))];
-      pz[iN+4] = zvals[ti][zi+1][yi+iN/2][xi+min(1, (iN%3))];
+      pz[iN] = zvals[ti][zi][yi+iN/2][xii[iN]];
+      pz[iN+4] = zvals[ti][zi+1][yi+iN/2][xii[iN]];
     }
   }
   else{
     float (*zvals)[ydim][xdim] = (float (*)[ydim][xdim]) grid->depth;
     for (iN=0; iN < 4; ++iN){
-      pz[iN] = zvals[zi][yi+iN/2][xi+min(1, (iN%3))];
-      pz[iN+4] = zvals[zi+1][yi+iN/2][xi+min(1, (iN%3))];
+      pz[iN] = zvals[zi][yi+iN/2][xii[iN]];
+      pz[iN+4] = zvals[zi+1][yi+iN/2][xii[iN]];
     }
   }
 
@@ -1199,6 +1351,17 @@ static inline StatusCode temporal_interpolation_pstruct(type_coord x, type_coord
   return temporal_interpolation(x, y, z, time, f, xi, yi, zi, ti, value, interp_method, gridindexingtype);
 }
 
+static inline StatusCode temporal_interpolation_multi_pstruct(type_coord x, type_coord y, type_coord z, double time,
+                                                              CField **f, int nfields, void *vxi, void *vyi, void *vzi, void *vti,
+                                                              float **values, int *interp_methods, int gridindexingtype)
+{
+  int *xi = (int *) vxi;
+  int *yi = (int *) vyi;
+  int *zi = (int *) vzi;
+  int *ti = (int *) vti;
+  return temporal_interpolation_multi(x, y, z, time, f, nfields, xi, yi, zi, ti, values, interp_methods, gridindexingtype);
+}
+
 static inline StatusCode temporal_interpolationUV(type_coord x, type_coord y, type_coord z, double time,
                                                  CField *U, CField *V,
                                                  int *xi, int *yi, int *zi, int *ti,
@@ -1275,6 +1438,245 @@ static inline StatusCode temporal_interpolationUVW_pstruct(type_coord x, type_co
   return temporal_interpolationUVW(x, y, z, time, U, V, W, xi, yi, zi, ti, valueU, valueV, valueW, interp_method, gridindexingtype);
 }
 
+/* Travel time (in the transformed time of the analytical scheme) needed to cross a cell face along one
+   direction, for face fluxes F0 and F1 and relative position r in the cell */
+static inline double analytical_compute_ds(double F0, double F1, double r, double direction, double tol, double *B, double *delta)
+{
+  double up = F0 * (1-r) + F1 * r;
+  double r_target = (direction * up >= 0.) ? 1. : 0.;
+  double ds;
+  *B = F0 - F1;
+  *delta = -F0;
+  if (fabs(*B) < tol) *B = 0;
+
+  if (fabs(*B) < tol && fabs(*delta) < tol){
+    ds = INFINITY;
+  } else if (*B == 0){
+    ds = -(r_target - r) / *delta;
+  } else {
+    double F_r1 = r_target + *delta / *B;
+    double F_r0 = r + *delta / *B;
+    ds = (F_r1 * F_r0 < tol) ? INFINITY : -1. / *B * log(F_r1 / F_r0);
+  }
+  if (fabs(ds) < tol) ds = INFINITY;
+  return ds;
+}
+
+/* Relative position in the cell after travel time s_min */
+static inline double analytical_compute_rs(double r, double B, double delta, double s_min, double tol)
+{
+  if (fabs(B) < tol)
+    return -delta * s_min + r;
+  return (r + delta / B) * exp(-B * s_min) - delta / B;
+}
+
+/* Reads the cell (xi, yi, zi) at time level ti (and ti+1 if first_tstep_only == 0) of a C-grid velocity Field
+   into cell_data[tii][zii][yii][xii]; zii is always 0 for 2D grids */
+static inline StatusCode analytical_get_cell(CField *f, int xi, int yi, int zi, int ti, float cell_data[2][2][2][2], int first_tstep_only)
+{
+  StatusCode status;
+  int tii, yii, xii;
+  CStructuredGrid *grid = f->grid->grid;
+  if (grid->zdim > 1){
+    return getCell3D(f, xi, yi, zi, ti, cell_data, first_tstep_only);
+  }
+  float data2D[2][2][2];
+  status = getCell2D(f, xi, yi, ti, data2D, first_tstep_only); CHECKSTATUS(status);
+  for (tii=0; tii<2; ++tii)
+    for (yii=0; yii<2; ++yii)
+      for (xii=0; xii<2; ++xii)
+        cell_data[tii][0][yii][xii] = cell_data[tii][1][yii][xii] = data2D[tii][yii][xii];
+  return SUCCESS;
+}
+
+/* Analytical advection (Ariane/TRACMASS scheme) of a particle on a C-grid, as in the AdvectionAnalytical kernel:
+   the particle is moved to the first cell face it reaches (or as far as it gets within dt), and dt is updated
+   to the time this took. W is NULL for 2D advection */
+static inline StatusCode advection_analytical(type_coord *lon, type_coord *lat, type_coord *depth, double *dt, double time,
+                                              CField *U, CField *V, CField *W, int *xi, int *yi, int *zi, int *ti,
+                                              int with_time, int gridindexingtype)
+{
+  StatusCode status;
+  CStructuredGrid *grid = U->grid->grid;
+  GridCode gcode = U->grid->gtype;
+  int igrid = U->igrid;
+  int withW = (W != NULL);
+  int I_s = 10;  /* number of intermediate time steps */
+  double tol = 1e-10;
+  double direction = (*dt > 0) ? 1. : -1.;
+  double ds_t = *dt;
+  double tau = 0;
+  int k, i4;
+
+  if (U->time_periodic == 0 && U->allow_time_extrapolation == 0 && (time < grid->time[0] || time > grid->time[grid->tdim-1])){
+    return ERROR_TIME_EXTRAPOLATION;
+  }
+  status = search_time_index(&time, grid->tdim, grid->time, &ti[igrid], U->time_periodic, grid->tfull_min, grid->tfull_max, grid->periods); CHECKSTATUS(status);
+  while (ti[igrid] < grid->tdim-1 && time >= grid->time[ti[igrid]+1]) ++ti[igrid];
+  if (with_time){
+    if (ti[igrid] >= grid->tdim-1)
+      return ERROR_TIME_EXTRAPOLATION;
+    double T0 = grid->time[ti[igrid]];
+    double T1 = grid->time[ti[igrid]+1];
+    tau = (time - T0) / (T1 - T0);
+    for (k = 0; k < I_s; ++k){
+      double time_k = k * (T1 - T0) / (I_s - 1);
+      if (time - T0 < time_k){
+        ds_t = fmin(ds_t, time_k);
+        break;
+      }
+    }
+    if (k == I_s)
+      return ERROR;
+  }
+
+  double xsi, eta, zeta;
+  status = search_indices(*lon, *lat, *depth, grid, &xi[igrid], &yi[igrid], &zi[igrid], &xsi, &eta, &zeta,
+                          gcode, ti[igrid], time, time, time+1, CGRID_VELOCITY, gridindexingtype); CHECKSTATUS(status);
+  if (!withW){
+    zi[igrid] = 0;
+    zeta = 0;
+  }
+
+  /* Move particles that are on a cell face into the downstream cell */
+  float cell[2][2][2][2];
+  if (fabs(xsi - 1) < tol || (fabs(xsi) < tol && xi[igrid] > 0)){
+    status = analytical_get_cell(U, xi[igrid], yi[igrid], zi[igrid], 0, cell, 1); CHECKSTATUS(status);
+    if (fabs(xsi - 1) < tol && direction * cell[0][1][1][1] > 0){
+      xi[igrid] += 1;
+      xsi = 0;
+    } else if (fabs(xsi) < tol && direction * cell[0][1][1][0] < 0){
+      xi[igrid] -= 1;
+      xsi = 1;
+    }
+  }
+  if (fabs(eta - 1) < tol || (fabs(eta) < tol && yi[igrid] > 0)){
+    status = analytical_get_cell(V, xi[igrid], yi[igrid], zi[igrid], 0, cell, 1); CHECKSTATUS(status);
+    if (fabs(eta - 1) < tol && direction * cell[0][1][1][1] > 0){
+      yi[igrid] += 1;
+      eta = 0;
+    } else if (fabs(eta) < tol && direction * cell[0][1][0][1] < 0){
+      yi[igrid] -= 1;
+      eta = 1;
+    }
+  }
+  if (withW && (fabs(zeta - 1) < tol || (fabs(zeta) < tol && zi[igrid] > 0))){
+    status = analytical_get_cell(W, xi[igrid], yi[igrid], zi[igrid], 0, cell, 1); CHECKSTATUS(status);
+    if (fabs(zeta - 1) < tol && direction * cell[0][1][1][1] > 0){
+      zi[igrid] += 1;
+      zeta = 0;
+    } else if (fabs(zeta) < tol && direction * cell[0][0][1][1] < 0){
+      zi[igrid] -= 1;
+      zeta = 1;
+    }
+  }
+  int xii = xi[igrid], yii = yi[igrid], zii = zi[igrid];
+
+  double px[4], py[4];
+  if ((gcode == RECTILINEAR_Z_GRID) || (gcode == RECTILINEAR_S_GRID)){
+    px[0] = grid->lon[xii]; px[1] = grid->lon[xii+1]; px[2] = grid->lon[xii+1]; px[3] = grid->lon[xii];
+    py[0] = grid->lat[yii]; py[1] = grid->lat[yii]; py[2] = grid->lat[yii+1]; py[3] = grid->lat[yii+1];
+  } else {
+    int xdim = grid->xdim;
+    float (* xgrid)[xdim] = (float (*)[xdim]) grid->lon;
+    float (* ygrid)[xdim] = (float (*)[xdim]) grid->lat;
+    px[0] = xgrid[yii][xii]; px[1] = xgrid[yii][xii+1]; px[2] = xgrid[yii+1][xii+1]; px[3] = xgrid[yii+1][xii];
+    py[0] = ygrid[yii][xii]; py[1] = ygrid[yii][xii+1]; py[2] = ygrid[yii+1][xii+1]; py[3] = ygrid[yii+1][xii];
+  }
+  if (grid->sphere_mesh == 1){
+    if (px[0] < *lon - 225) px[0] += 360;
+    if (px[0] > *lon + 225) px[0] -= 360;
+    for (i4 = 1; i4 < 4; ++i4){
+      if (px[i4] - px[0] > 180) px[i4] -= 360;
+      if (-px[i4] + px[0] > 180) px[i4] += 360;
+    }
+  }
+  double pz[2] = {0, 1};
+  if (withW){
+    pz[0] = grid->depth[zii];
+    pz[1] = grid->depth[zii+1];
+  }
+  double dz = pz[1] - pz[0];
+
+  double phi[4];
+  phi2D_lin(xsi, 0., phi);
+  double c1 = dist(px[0], px[1], py[0], py[1], grid->sphere_mesh, dot_prod(phi, py, 4));
+  phi2D_lin(1., eta, phi);
+  double c2 = dist(px[1], px[2], py[1], py[2], grid->sphere_mesh, dot_prod(phi, py, 4));
+  phi2D_lin(xsi, 1., phi);
+  double c3 = dist(px[2], px[3], py[2], py[3], grid->sphere_mesh, dot_prod(phi, py, 4));
+  phi2D_lin(0., eta, phi);
+  double c4 = dist(px[3], px[0], py[3], py[0], grid->sphere_mesh, dot_prod(phi, py, 4));
+
+  double meshJac = 1;
+  if (grid->sphere_mesh == 1){
+    double deg2m = 1852 * 60.;
+    double rad = M_PI / 180.;
+    meshJac = deg2m * deg2m * cos(rad * *lat);
+  }
+  double dphidxsi[4] = {eta-1, 1-eta, eta, -eta};
+  double dphideta[4] = {xsi-1, -xsi, xsi, 1-xsi};
+  double dxdy = (dot_prod(px, dphidxsi, 4) * dot_prod(py, dphideta, 4)
+                 - dot_prod(px, dphideta, 4) * dot_prod(py, dphidxsi, 4)) * meshJac;
+
+  /* Face fluxes, linearly interpolated in time between time levels ti and ti+1 */
+  float cellU[2][2][2][2], cellV[2][2][2][2], cellW[2][2][2][2];
+  status = analytical_get_cell(U, xii, yii, zii, ti[igrid], cellU, !with_time); CHECKSTATUS(status);
+  status = analytical_get_cell(V, xii, yii, zii, ti[igrid], cellV, !with_time); CHECKSTATUS(status);
+  int ntlevels = with_time ? 2 : 1;
+  double U0 = 0, U1 = 0, V0 = 0, V1 = 0, W0 = 0, W1 = 0;
+  int tii;
+  for (tii = 0; tii < ntlevels; ++tii){
+    double w = with_time ? ((tii == 0) ? 1 - tau : tau) : 1;
+    U0 += w * direction * cellU[tii][1][1][0] * c4 * dz;
+    U1 += w * direction * cellU[tii][1][1][1] * c2 * dz;
+    V0 += w * direction * cellV[tii][1][0][1] * c1 * dz;
+    V1 += w * direction * cellV[tii][1][1][1] * c3 * dz;
+  }
+
+  double B_x, delta_x, B_y, delta_y, B_z = 0, delta_z = 0;
+  double ds_x = analytical_compute_ds(U0, U1, xsi, direction, tol, &B_x, &delta_x);
+  double ds_y = analytical_compute_ds(V0, V1, eta, direction, tol, &B_y, &delta_y);
+  double ds_z = INFINITY;
+  if (withW){
+    status = analytical_get_cell(W, xii, yii, zii, ti[igrid], cellW, !with_time); CHECKSTATUS(status);
+    for (tii = 0; tii < ntlevels; ++tii){
+      double w = with_time ? ((tii == 0) ? 1 - tau : tau) : 1;
+      W0 += w * direction * cellW[tii][0][1][1] * dxdy;
+      W1 += w * direction * cellW[tii][1][1][1] * dxdy;
+    }
+    ds_z = analytical_compute_ds(W0, W1, zeta, direction, tol, &B_z, &delta_z);
+  }
+
+  /* take the minimum travel time */
+  double s_min = fmin(fmin(fabs(ds_x), fabs(ds_y)), fmin(fabs(ds_z), fabs(ds_t / (dxdy * dz))));
+
+  double rs_x = analytical_compute_rs(xsi, B_x, delta_x, s_min, tol);
+  double rs_y = analytical_compute_rs(eta, B_y, delta_y, s_min, tol);
+  *lon = (1.-rs_x)*(1.-rs_y) * px[0] + rs_x * (1.-rs_y) * px[1] + rs_x * rs_y * px[2] + (1.-rs_x)*rs_y * px[3];
+  *lat = (1.-rs_x)*(1.-rs_y) * py[0] + rs_x * (1.-rs_y) * py[1] + rs_x * rs_y * py[2] + (1.-rs_x)*rs_y * py[3];
+  if (withW){
+    double rs_z = analytical_compute_rs(zeta, B_z, delta_z, s_min, tol);
+    *depth = (1.-rs_z) * pz[0] + rs_z * pz[1];
+  }
+
+  /* update the passed time for the main loop */
+  *dt = direction * s_min * (dxdy * dz);
+  return SUCCESS;
+}
+
+static inline StatusCode advection_analytical_pstruct(type_coord *lon, type_coord *lat, type_coord *depth, double *dt, double time,
+                                                      CField *U, CField *V, CField *W,
+                                                      void *vxi, void *vyi, void *vzi, void *vti,
+                                                      int with_time, int gridindexingtype)
+{
+  int *xi = (int *) vxi;
+  int *yi = (int *) vyi;
+  int *zi = (int *) vzi;
+  int *ti = (int *) vti;
+  return advection_analytical(lon, lat, depth, dt, time, U, V, W, xi, yi, zi, ti, with_time, gridindexingtype);
+}
+
 
 
 #ifdef __cplusplus
@@ -139,8 +139,7 @@ class InteractionKernelSOA(BaseInteractionKernel):
         if pset.fieldset is not None:
             for g in pset.fieldset.gridset.grids:
                 if len(g.load_chunk) > g.chunk_not_loaded:  # not the case if a field in not called in the kernel
-                    g.load_chunk = np.where(g.load_chunk == g.chunk_loaded_touched,
-                                            g.chunk_deprecated, g.load_chunk)
+                    g.load_chunk[g.load_chunk == g.chunk_loaded_touched] = g.chunk_deprecated
 
         # Execute the kernel over the particle set
         if self.ptype.uses_jit:
@@ -8,6 +8,7 @@ from os import remove
 from sys import platform
 from sys import version_info
 from ast import FunctionDef
+from ast import parse
 from hashlib import md5
 from parcels.tools.loggers import logger
 import numpy as np
@@ -83,6 +84,7 @@ class BaseKernel(object):
         self.src_file = None
         self.lib_file = None
         self.log_file = None
+        self.compiler_profile = 'default'
 
         # Generate the kernel function and add the outer loop
         if self._ptype.uses_jit:
@@ -128,7 +130,7 @@ class BaseKernel(object):
         if self.field_args is not None:
             field_keys = "-".join(
                 ["%s:%s" % (name, field.units.__class__.__name__) for name, field in self.field_args.items()])
-        key = self.name + self.ptype._cache_key + field_keys + ('TIME:%f' % ostime())
+        key = self.name + self.ptype._cache_key + field_keys + ('PROFILE:%s' % self.compiler_profile) + ('TIME:%f' % ostime())
         return md5(key.encode('utf-8')).hexdigest()
 
     @staticmethod
@@ -159,13 +161,19 @@ class BaseKernel(object):
                     logger.warning_once('Note that in AdvectionRK4_3D, vertical velocity is assumed positive towards increasing z.\n'
                                         '  If z increases downward and w is positive upward you can re-orient it downwards by setting fieldset.W.set_scaling_factor(-1.)')
             elif pyfunc is AdvectionAnalytical:
-                if self._ptype.uses_jit:
-                    raise NotImplementedError('Analytical Advection only works in Scipy mode')
                 if self._fieldset.U.interp_method != 'cgrid_velocity':
                     raise NotImplementedError('Analytical Advection only works with C-grids')
                 if self._fieldset.U.grid.gtype not in [GridCode.CurvilinearZGrid, GridCode.RectilinearZGrid]:
                     raise NotImplementedError('Analytical Advection only works with Z-grids in the vertical')
 
+    def analytical_jit_ast(self):
+        """Returns the AST of AdvectionAnalytical for JIT mode, in which the scheme
+        is not generated from the Python kernel but calls its native C implementation"""
+        uvfield = 'UVW' if 'W' in [f.name for f in self.fieldset.get_fields()] else 'UV'
+        funccode = "def AdvectionAnalytical(particle, fieldset, time):\n" \
+                   "    fieldset.%s.advect_analytical(particle, time)\n" % uvfield
+        return parse(funccode).body[0]
+
     def check_kernel_signature_on_version(self):
         """
         returns numkernelargs
@@ -259,6 +267,11 @@ class BaseKernel(object):
     def load_lib(self):
         self._lib = npct.load_library(self.lib_file, '.')
         self._function = self._lib.particle_loop
+        if self.delete_cfiles:
+            # The source and log files are not needed once the library is loaded, while the kernel itself
+            # can stay alive for the whole run in the kernel registry of the ParticleSet
+            cfiles = list(self.dyn_srcs) if self.src_file is None and self.dyn_srcs is not None else [self.src_file]
+            [remove(s) for s in cfiles + [self.log_file] if s is not None and path.exists(s)]
 
     def merge(self, kernel, kclass):
         funcname = self.funcname + kernel.funcname
@@ -318,8 +331,6 @@ class BaseKernel(object):
         Updates the loaded fields of pset's fieldset according to the chunk information within their grids
         """
         if pset.fieldset is not None:
-            for g in pset.fieldset.gridset.grids:
-                g.cstruct = None  # This force to point newly the grids from Python to C
             # Make a copy of the transposed array to enforce
             # C-contiguous memory layout for JIT mode.
             for f in pset.fieldset.get_fields():
@@ -335,8 +346,9 @@ class BaseKernel(object):
                         f.c_data_chunks[block_id] = None
 
             for g in pset.fieldset.gridset.grids:
-                g.load_chunk = np.where(g.load_chunk == g.chunk_loading_requested,
-                                        g.chunk_loaded_touched, g.load_chunk)
+                # Update in place, so that the cached grid cstruct keeps pointing to load_chunk
+                g.load_chunk = np.asarray(g.load_chunk)
+                g.load_chunk[g.load_chunk == g.chunk_loading_requested] = g.chunk_loaded_touched
                 if len(g.load_chunk) > g.chunk_not_loaded:  # not the case if a field in not called in the kernel
                     if not g.load_chunk.flags.c_contiguous:
                         g.load_chunk = g.load_chunk.copy()
@@ -459,5 +471,5 @@ class BaseKernel(object):
     def execute_python(self, pset, endtime, dt):
         pass
 
-    def execute(self, pset, endtime, dt, recovery=None, output_file=None, execute_once=False):
+    def execute(self, pset, endtime, dt, recovery=None, output_file=None, execute_once=False, dt_buckets=False):
         pass
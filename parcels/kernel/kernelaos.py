@@ -20,6 +20,7 @@ from parcels.compilation.codegenerator import ParticleObjectLoopGenerator
 from parcels.field import NestedField
 from parcels.field import SummedField
 from parcels.field import VectorField
+from parcels.application_kernels.advection import AdvectionAnalytical
 import parcels.rng as ParcelsRandom  # noqa
 from parcels.tools.statuscodes import StateCode, OperationCode, ErrorCode  # noqa
 from parcels.tools.statuscodes import recovery_map as recovery_base_map
@@ -56,6 +57,9 @@ class KernelAOS(BaseKernel):
         else:
             self.funcvars = None
         self.funccode = funccode or inspect.getsource(pyfunc.__code__)
+        if py_ast is None and self.ptype.uses_jit and pyfunc is AdvectionAnalytical:
+            py_ast = self.analytical_jit_ast()
+            self.funcvars = [arg.arg for arg in py_ast.args.args]
         # Parse AST if it is not provided explicitly
         self.py_ast = py_ast or parse(BaseKernel.fix_indentation(self.funccode)).body[0]
         if pyfunc is None:
@@ -108,7 +112,7 @@ class KernelAOS(BaseKernel):
             else:
                 c_include_str = c_include
             self.ccode = loopgen.generate(self.funcname, self.field_args, self.const_args,
-                                          kernel_ccode, c_include_str)
+                                          kernel_ccode, c_include_str, analytical='AdvectionAnalytical' in self.funcname)
 
             src_file_or_files, self.lib_file, self.log_file = self.get_kernel_compile_files()
             if type(src_file_or_files) in (list, dict, tuple, np.ndarray):
@@ -134,6 +138,10 @@ class KernelAOS(BaseKernel):
 
     def execute_jit(self, pset, endtime, dt):
         """Invokes JIT engine to perform the core update loop"""
+        if 'AdvectionAnalytical' in self.funcname:
+            if not np.isinf(dt):
+                logger.warning_once('dt is not used in AnalyticalAdvection, so is set to np.inf')
+            dt = np.copysign(np.inf, dt)
         self.load_fieldset_jit(pset)
 
         fargs = []
@@ -176,8 +184,10 @@ class KernelAOS(BaseKernel):
             output_file.write(pset, endtime, deleted_only=indices)
         pset.remove_indices(indices)
 
-    def execute(self, pset, endtime, dt, recovery=None, output_file=None, execute_once=False):
+    def execute(self, pset, endtime, dt, recovery=None, output_file=None, execute_once=False, dt_buckets=False):
         """Execute this Kernel over a ParticleSet for several timesteps"""
+        if dt_buckets:
+            raise NotImplementedError('dt-bucketed execution is only implemented for ParticleSetSOA')
         for p in pset:
             p.reset_state()
 
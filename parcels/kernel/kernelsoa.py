@@ -6,6 +6,8 @@ from copy import deepcopy
 from ctypes import byref
 from ctypes import c_double
 from ctypes import c_int
+from datetime import timedelta as delta
+from functools import partial
 from os import path
 
 import numpy as np
@@ -20,6 +22,9 @@ from parcels.compilation.codegenerator import LoopGenerator
 from parcels.field import NestedField
 from parcels.field import SummedField
 from parcels.field import VectorField
+from parcels.application_kernels.advection import AdvectionAnalytical
+from parcels.application_kernels.advection import AdvectionRK4
+from parcels.application_kernels.advection import AdvectionRK4_3D
 import parcels.rng as ParcelsRandom  # noqa
 from parcels.tools.statuscodes import StateCode, OperationCode, ErrorCode
 from parcels.tools.statuscodes import recovery_map as recovery_base_map
@@ -35,15 +40,20 @@ class KernelSOA(BaseKernel):
     :arg fieldset: FieldSet object providing the field information
     :arg ptype: PType object for the kernel particle
     :param delete_cfiles: Boolean whether to delete the C-files after compilation in JIT mode (default is True)
+    :param batched: Boolean whether to advance the particles in blocks in JIT mode, with the field interpolations
+           of a whole block done at once in vectorisable loops (default is False). Only available for the built-in
+           AdvectionRK4 and AdvectionRK4_3D kernels on linearly interpolated velocity Fields that share a Grid;
+           otherwise the particle-by-particle loop is used
 
     Note: A Kernel is either created from a compiled <function ...> object
     or the necessary information (funcname, funccode, funcvars) is provided.
     The py_ast argument may be derived from the code string, but for
     concatenation, the merged AST plus the new header definition is required.
     """
+    records_output = False
 
     def __init__(self, fieldset, ptype, pyfunc=None, funcname=None,
-                 funccode=None, py_ast=None, funcvars=None, c_include="", delete_cfiles=True):
+                 funccode=None, py_ast=None, funcvars=None, c_include="", delete_cfiles=True, batched=False):
         super(KernelSOA, self).__init__(fieldset=fieldset, ptype=ptype, pyfunc=pyfunc, funcname=funcname, funccode=funccode, py_ast=py_ast, funcvars=funcvars, c_include=c_include, delete_cfiles=delete_cfiles)
 
         # Derive meta information from pyfunc, if not given
@@ -56,6 +66,9 @@ class KernelSOA(BaseKernel):
         else:
             self.funcvars = None
         self.funccode = funccode or inspect.getsource(pyfunc.__code__)
+        if py_ast is None and self.ptype.uses_jit and pyfunc is AdvectionAnalytical:
+            py_ast = self.analytical_jit_ast()
+            self.funcvars = [arg.arg for arg in py_ast.args.args]
         # Parse AST if it is not provided explicitly
         self.py_ast = py_ast or parse(BaseKernel.fix_indentation(self.funccode)).body[0]
         if pyfunc is None:
@@ -104,6 +117,10 @@ class KernelSOA(BaseKernel):
                         if sF_name != 'not_defined':
                             self.field_args[sF_name] = getattr(f, sF_component)
             self.const_args = kernelgen.const_args
+            batched_field = self.batched_vectorfield(pyfunc) if batched else None
+            if batched and batched_field is None:
+                logger.warning_once("Batched execution is only available for the AdvectionRK4 and AdvectionRK4_3D kernels "
+                                    "on linearly interpolated velocity Fields that share a Grid. Using the particle-by-particle loop instead")
             loopgen = LoopGenerator(fieldset, ptype)
             if path.isfile(self._c_include):
                 with open(self._c_include, 'r') as f:
@@ -111,7 +128,10 @@ class KernelSOA(BaseKernel):
             else:
                 c_include_str = self._c_include
             self.ccode = loopgen.generate(self.funcname, self.field_args, self.const_args,
-                                          kernel_ccode, c_include_str)
+                                          kernel_ccode, c_include_str, analytical='AdvectionAnalytical' in self.funcname,
+                                          batched=batched_field)
+            # the particle-by-particle loop can record the particles at the output times itself
+            self.records_output = batched_field is None
 
             src_file_or_files, self.lib_file, self.log_file = self.get_kernel_compile_files()
             if type(src_file_or_files) in (list, dict, tuple, np.ndarray):
@@ -119,18 +139,99 @@ class KernelSOA(BaseKernel):
             else:
                 self.src_file = src_file_or_files
 
-    def execute_jit(self, pset, endtime, dt):
-        """Invokes JIT engine to perform the core update loop"""
+    def batched_vectorfield(self, pyfunc):
+        """Returns the VectorField advected by pyfunc if the particles can be advanced in blocks, i.e. if pyfunc is
+        AdvectionRK4 or AdvectionRK4_3D (so that no user code sits between the field evaluations) and the velocity
+        Fields are linearly interpolated on the same Grid, with the same time settings. Returns None otherwise"""
+        if pyfunc not in [AdvectionRK4, AdvectionRK4_3D]:
+            return None
+        vfield = getattr(self.fieldset, 'UVW' if pyfunc is AdvectionRK4_3D else 'UV', None)
+        if not isinstance(vfield, VectorField):
+            return None
+        fields = [vfield.U, vfield.V] + ([vfield.W] if pyfunc is AdvectionRK4_3D else [])
+        for f in fields:
+            if f.interp_method != 'linear' or f.grid is not vfield.U.grid or f.gridindexingtype in ['mom5', 'pop'] \
+                    or f.gridindexingtype != vfield.U.gridindexingtype or f.time_periodic != vfield.U.time_periodic \
+                    or f.allow_time_extrapolation != vfield.U.allow_time_extrapolation:
+                return None
+        return vfield
+
+    def execute_jit(self, pset, endtime, dt, reset_state=False, output_file=None, output_times=None):
+        """Invokes JIT engine to perform the core update loop
+
+        :param reset_state: Boolean whether the loop first sets the state of every particle to StateCode.Evaluate
+        :param output_file: ParticleFile into whose buffer the particles are recorded at output_times
+        :param output_times: output times (spaced by the outputdt of output_file) before endtime, at which the
+               loop stops each particle and records it into the buffer of output_file
+        :return: the number of particles that ended in another state than Success or Evaluate
+        """
+        if 'AdvectionAnalytical' in self.funcname:
+            if not np.isinf(dt):
+                logger.warning_once('dt is not used in AnalyticalAdvection, so is set to np.inf')
+            dt = np.copysign(np.inf, dt)
         self.load_fieldset_jit(pset)
 
         fargs = [byref(f.ctypes_struct) for f in self.field_args.values()]
         fargs += [c_double(f) for f in self.const_args.values()]
         particle_data = byref(pset.ctypes_struct)
+        if output_times is not None and len(output_times) > 0:
+            outputdt = output_file.outputdt
+            if isinstance(outputdt, delta):
+                outputdt = outputdt.total_seconds()
+            output_mask, output_vars = output_file.kernel_output_buffer(pset, len(output_times))
+            oargs = [c_int(len(output_times)), c_double(output_times[0]), c_double(outputdt), output_mask, output_vars]
+        else:
+            oargs = [c_int(0), c_double(0), c_double(0), None, None]
         return self._function(c_int(len(pset)), particle_data,
-                              c_double(endtime), c_double(dt), *fargs)
+                              c_double(endtime), c_double(dt), c_int(reset_state), *oargs, *fargs)
+
+    def execute_dt_buckets(self, pset, endtime, dt, reset_state=False):
+        """Performs the core update loop in lock-step sub-steps for buckets of particles with the same dt.
 
-    def execute_python(self, pset, endtime, dt):
-        """Performs the core update loop via Python"""
+        The dt of each particle is rounded down to a power-of-two fraction (or multiple) of dt, so that particles
+        with similar time steps share a bucket and stay in step. In each sub-step, the bucket with the smallest dt
+        among the particles whose next step ends first is advanced, so that every call of the core update loop
+        does exactly one time step for each of its particles. As the states are already scanned in every sub-step,
+        returns None rather than the number of particles that ended in an error state
+        """
+        if reset_state:
+            pset.collection.state[:] = StateCode.Evaluate
+        tol = 1e-8
+        sign_dt = np.sign(dt)
+        base_dt = abs(dt)
+        execute_loop = self.execute_jit if self.ptype.uses_jit else self.execute_python
+        while True:
+            state = pset.collection.state
+            ptime = pset.collection.time
+            pending = (state == StateCode.Evaluate) & (sign_dt * (endtime - ptime) > tol)
+            if not np.any(pending):
+                break
+            pdt = np.abs(pset.collection.dt[pending])
+            pdt = np.where(pdt > 0, base_dt * 2. ** np.floor(np.log2(np.where(pdt > 0, pdt, base_dt) / base_dt)), base_dt)
+            pset.collection.dt[pending] = sign_dt * pdt
+            tnext = ptime[pending] + sign_dt * pdt
+            tnext = np.minimum(tnext, endtime) if sign_dt > 0 else np.maximum(tnext, endtime)
+            substep_end = tnext.min() if sign_dt > 0 else tnext.max()
+            first = np.abs(tnext - substep_end) <= tol
+            bucket_dt = pdt[first].min()
+            in_bucket = np.zeros_like(pending)
+            in_bucket[pending] = first & (pdt == bucket_dt)
+            waiting = pending & ~in_bucket
+            state[waiting] = StateCode.Success
+            execute_loop(pset, substep_end, sign_dt * bucket_dt)
+            state = pset.collection.state
+            state[waiting] = StateCode.Evaluate
+            continuing = in_bucket & (state == StateCode.Success) & (sign_dt * (endtime - pset.collection.time) > tol)
+            state[continuing] = StateCode.Evaluate
+
+    def execute_python(self, pset, endtime, dt, reset_state=False):
+        """Performs the core update loop via Python
+
+        :param reset_state: Boolean whether to first set the state of every particle to StateCode.Evaluate
+        :return: the number of particles that ended in another state than Success or Evaluate
+        """
+        if reset_state:
+            pset.collection.state[:] = StateCode.Evaluate
         # sign of dt: { [0, 1]: forward simulation; -1: backward simulation }
         sign_dt = np.sign(dt)
 
@@ -147,8 +248,12 @@ class KernelSOA(BaseKernel):
                     continue
                 f.data = np.array(f.data)
 
+        nflagged = 0
         for p in pset:
             self.evaluate_particle(p, endtime, sign_dt, dt, analytical=analytical)
+            if p.state not in [StateCode.Success, StateCode.Evaluate]:
+                nflagged += 1
+        return nflagged
 
     def __del__(self):
         # Clean-up the in-memory dynamic linked libraries.
@@ -179,10 +284,19 @@ class KernelSOA(BaseKernel):
             output_file.write(pset, endtime, deleted_only=bool_indices)
         pset.remove_indices(indices)
 
-    def execute(self, pset, endtime, dt, recovery=None, output_file=None, execute_once=False):
-        """Execute this Kernel over a ParticleSet for several timesteps"""
-        pset.collection.state[:] = StateCode.Evaluate
+    def execute(self, pset, endtime, dt, recovery=None, output_file=None, execute_once=False, dt_buckets=False,
+                output_times=None):
+        """Execute this Kernel over a ParticleSet for several timesteps
+
+        :param dt_buckets: Boolean whether to advance the particles in lock-step sub-steps, grouped by their dt
+                           (see execute_dt_buckets). Ignored for AdvectionAnalytical and if dt is zero
+        :param output_times: output times before endtime at which the JIT particle loop records the particles into
+                             the buffer of output_file (see execute_jit), which is written before particles are
+                             removed and at the end of this call. Only used if self.records_output is True
 
+        The states of the particles are reset inside the core update loop, which also counts the particles that
+        signalled deletion or threw errors, so that the particle set is only scanned for those if there are any
+        """
         if abs(dt) < 1e-6 and not execute_once:
             logger.warning_once("'dt' is too small, causing numerical accuracy limit problems. Please chose a higher 'dt' and rather scale the 'time' axis of the field accordingly. (related issue #762)")
 
@@ -196,14 +310,23 @@ class KernelSOA(BaseKernel):
         if pset.fieldset is not None:
             for g in pset.fieldset.gridset.grids:
                 if len(g.load_chunk) > g.chunk_not_loaded:  # not the case if a field in not called in the kernel
-                    g.load_chunk = np.where(g.load_chunk == g.chunk_loaded_touched,
-                                            g.chunk_deprecated, g.load_chunk)
+                    g.load_chunk[g.load_chunk == g.chunk_loaded_touched] = g.chunk_deprecated
 
-        # Execute the kernel over the particle set
-        if self.ptype.uses_jit:
-            self.execute_jit(pset, endtime, dt)
+        if dt_buckets and not execute_once and dt != 0 and 'AdvectionAnalytical' not in self.funcname:
+            execute_loop = self.execute_dt_buckets
+        elif output_times is not None:
+            execute_loop = partial(self.execute_jit, output_file=output_file, output_times=output_times)
         else:
-            self.execute_python(pset, endtime, dt)
+            execute_loop = self.execute_jit if self.ptype.uses_jit else self.execute_python
+
+        # Execute the kernel over the particle set
+        nflagged = execute_loop(pset, endtime, dt, reset_state=True)
+
+        if output_times is not None:
+            output_file.write_kernel_output(pset, output_times)
+
+        if nflagged == 0:
+            return
 
         # Remove all particles that signalled deletion
         self.remove_deleted(pset, output_file=output_file, endtime=endtime)   # Generalizable version!
@@ -235,9 +358,9 @@ class KernelSOA(BaseKernel):
             self.remove_deleted(pset, output_file=output_file, endtime=endtime)   # Generalizable version!
 
             # Execute core loop again to continue interrupted particles
-            if self.ptype.uses_jit:
-                self.execute_jit(pset, endtime, dt)
-            else:
-                self.execute_python(pset, endtime, dt)
+            nflagged = execute_loop(pset, endtime, dt)
+
+            if output_times is not None:
+                output_file.write_kernel_output(pset, output_times)
 
-            n_error = pset.num_error_particles
+            n_error = 0 if nflagged == 0 else pset.num_error_particles
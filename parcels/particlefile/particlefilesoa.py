@@ -1,5 +1,6 @@
 """Module controlling the writing of ParticleSets to NetCDF file"""
 import os
+from ctypes import c_void_p
 from glob import glob
 import numpy as np
 
@@ -28,7 +29,13 @@ class ParticleFileSOA(BaseParticleFile):
                      processors are written to subdirectories 0, 1, 2 etc under tempwritedir
     :param pset_info: dictionary of info on the ParticleSet, stored in tempwritedir/XX/pset_info.npy,
                      used to create NetCDF file from npy-files.
+
+    kernel_output_slots is the maximum number of output times that the JIT particle loop records into the
+    buffer of the ParticleFile in one call, when executing with output_in_kernel=True
     """
+    kernel_output_slots = 64
+    _kernel_buffer = None
+    _kernel_output_vars = None
 
     def __init__(self, name, particleset, outputdt=np.infty, write_ondelete=False, convert_at_end=True,
                  tempwritedir=None, pset_info=None):
@@ -39,6 +46,59 @@ class ParticleFileSOA(BaseParticleFile):
     def __del__(self):
         super(ParticleFileSOA, self).__del__()
 
+    def kernel_output_buffer(self, pset, noutputs):
+        """Returns the output mask and the array of pointers to the variable buffers (NULL for the variables that
+        are not written) into which the JIT particle loop records the particles at noutputs output times.
+        The buffers are allocated once for kernel_output_slots output times, and only reallocated if the
+        ParticleSet grows beyond the size they were allocated for
+        """
+        size = noutputs * len(pset)
+        if self._kernel_buffer is None or self._kernel_buffer['mask'].size < size:
+            size = max(size, self.kernel_output_slots * len(pset))
+            recorded = set(['id'] + self.var_names + self.var_names_once)
+            variables = pset.collection.ptype.variables
+            self._kernel_buffer = {'mask': np.zeros(size, dtype=np.uint8)}
+            for v in variables:
+                if v.name in recorded:
+                    self._kernel_buffer[v.name] = np.empty(size, dtype=v.dtype)
+            self._kernel_output_vars = (c_void_p * len(variables))(
+                *[self._kernel_buffer[v.name].ctypes.data if v.name in self._kernel_buffer else None for v in variables])
+        return self._kernel_buffer['mask'].ctypes.data_as(c_void_p), self._kernel_output_vars
+
+    def write_kernel_output(self, pset, output_times):
+        """Writes the particles that the JIT particle loop recorded at output_times into the buffer
+        (see kernel_output_buffer) to temporary npy-files, one per output time, and clears the buffer.
+        This is called before particles are removed from pset, as the buffer is indexed by particle
+
+        :param pset: ParticleSet that was executed
+        :param output_times: output times of the buffer slots
+        """
+        if self._kernel_buffer is None:
+            return
+        npart = len(pset)
+        written = False
+        for k, time in enumerate(output_times):
+            mask = self._kernel_buffer['mask'][k * npart:(k + 1) * npart]
+            recorded = mask.astype(bool)
+            if not np.any(recorded):
+                continue
+            data_dict = {var: self._kernel_buffer[var][k * npart:(k + 1) * npart][recorded] for var in self.var_names}
+            data_dict_once = {}
+            if len(self.var_names_once) > 0:
+                ids = self._kernel_buffer['id'][k * npart:(k + 1) * npart][recorded]
+                first_write = np.isin(ids, self.written_once, invert=True)
+                if np.any(first_write):
+                    data_dict_once['id'] = ids[first_write].astype(dtype=np.int64)
+                    for var in self.var_names_once:
+                        data_dict_once[var] = self._kernel_buffer[var][k * npart:(k + 1) * npart][recorded][first_write]
+                    self.written_once.extend(data_dict_once['id'].tolist())
+            self.dump_dict_to_npy(data_dict, data_dict_once)
+            self.lasttime_written = time
+            mask[:] = 0
+            written = True
+        if written:
+            self.dump_psetinfo_to_npy()
+
     def _reserved_var_names(self):
         """
         returns the reserved dimension names not to be written just once.
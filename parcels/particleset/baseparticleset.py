@@ -12,6 +12,7 @@ from tqdm import tqdm
 from parcels.tools.statuscodes import StateCode
 from parcels.tools.global_statics import get_package_dir
 from parcels.compilation.codecompiler import GNUCompiler
+from parcels.compilation.codecompiler import get_compiler_profile
 from parcels.field import NestedField
 from parcels.field import SummedField
 from parcels.application_kernels.advection import AdvectionRK4
@@ -30,6 +31,7 @@ class BaseParticleSet(NDCluster):
     _collection = None
     kernel = None
     interaction_kernel = None
+    _kernel_registry = None
     fieldset = None
     time_origin = None
     repeat_starttime = None
@@ -50,6 +52,7 @@ class BaseParticleSet(NDCluster):
         self.repeatkwargs = None
         self.kernel = None
         self.interaction_kernel = None
+        self._kernel_registry = {}
         self.fieldset = None
         self.time_origin = None
 
@@ -297,7 +300,8 @@ class BaseParticleSet(NDCluster):
 
     def execute(self, pyfunc=AdvectionRK4, pyfunc_inter=None, endtime=None, runtime=None, dt=1.,
                 moviedt=None, recovery=None, output_file=None, movie_background_field=None,
-                verbose_progress=None, postIterationCallbacks=None, callbackdt=None):
+                verbose_progress=None, postIterationCallbacks=None, callbackdt=None, compiler_profile=None,
+                dt_buckets=False, output_in_kernel=False, analytics=None, snapshot_dt=None):
         """Execute a given kernel function over the particle set for
         multiple timesteps. Optionally also provide sub-timestepping
         for particle output.
@@ -325,9 +329,35 @@ class BaseParticleSet(NDCluster):
         :param verbose_progress: Boolean for providing a progress bar for the kernel execution loop.
         :param postIterationCallbacks: (Optional) Array of functions that are to be called after each iteration (post-process, non-Kernel)
         :param callbackdt: (Optional, in conjecture with 'postIterationCallbacks) timestep inverval to (latestly) interrupt the running kernel and invoke post-iteration callbacks from 'postIterationCallbacks'
+        :param compiler_profile: (Optional) name of the compiler optimisation profile for JIT kernels
+                                 ('debug', 'default', 'fast' or 'native'). Defaults to the environment
+                                 variable PARCELS_COMPILER_PROFILE, or 'default' if that is not set
+        :param dt_buckets: Boolean whether to group the particles by their (rounded down to a power-of-two
+                           fraction or multiple of dt) time step, and advance these buckets in lock-step
+                           sub-steps, so that each pass of the kernel loop does the same amount of work per
+                           particle. Useful for adaptive time stepping kernels such as AdvectionRK45 (default False)
+        :param output_in_kernel: Boolean whether the JIT particle loop records the particles at the output times
+                                 itself, into a buffer of output_file that is written after each call of the loop.
+                                 One call then covers up to output_file.kernel_output_slots output times, until the
+                                 next field load or other interruption, instead of returning to Python at every
+                                 output time. Only for SoA ParticleSets in JIT mode, without interaction kernels,
+                                 dt_buckets, write_ondelete or Fields that are written during execution (default False)
+        :param analytics: (Optional) :mod:`parcels.analytics` object, or list of these (e.g. a ParticleBinning),
+                          that is sampled at every outputdt of that object during the execution. The results
+                          are reduced over the MPI ranks at the end of the execution
+        :param snapshot_dt: (Optional) interval over which the Fields with more than one time snapshot are sampled
+                            from a single copy of their loaded data, interpolated in time to the middle of the
+                            interval, instead of interpolating in time at every sample. This is an approximation
+                            that saves half of the data gathering and arithmetic of each interpolation, and is
+                            useful when dt is much smaller than the time step of the Fields (e.g. for RK4 and
+                            diffusion kernels). It is at least dt; default None samples at the particle time.
+                            It is either a timedelta object or a positive double
         """
-        # check if pyfunc has changed since last compile. If so, recompile
-        if self.kernel is None or (self.kernel.pyfunc is not pyfunc and self.kernel is not pyfunc):
+        compiler_profile = get_compiler_profile(compiler_profile)
+        # check if pyfunc or the compiler profile has changed since last compile. If so, reuse the kernel
+        # from the registry of loaded kernel libraries, or compile it if it is not there yet
+        if self.kernel is None or (self.kernel.pyfunc is not pyfunc and self.kernel is not pyfunc) or \
+                (self.collection.ptype.uses_jit and self.kernel.compiler_profile != compiler_profile):
             # Generate and store Kernel
             if isinstance(pyfunc, Kernel):
                 self.kernel = pyfunc
@@ -335,10 +365,17 @@ class BaseParticleSet(NDCluster):
                 self.kernel = self.Kernel(pyfunc)
             # Prepare JIT kernel execution
             if self.collection.ptype.uses_jit:
-                self.kernel.remove_lib()
-                cppargs = ['-DDOUBLE_COORD_VARIABLES'] if self.collection.lonlatdepth_dtype else None
-                self.kernel.compile(compiler=GNUCompiler(cppargs=cppargs, incdirs=[path.join(get_package_dir(), 'include'), "."]))
-                self.kernel.load_lib()
+                registry_key = self._kernel_registry_key(self.kernel, compiler_profile)
+                if registry_key in self._kernel_registry:
+                    self.kernel = self._kernel_registry[registry_key]
+                else:
+                    self.kernel.compiler_profile = compiler_profile
+                    self.kernel.remove_lib()
+                    cppargs = ['-DDOUBLE_COORD_VARIABLES'] if self.collection.lonlatdepth_dtype else None
+                    self.kernel.compile(compiler=GNUCompiler(cppargs=cppargs, incdirs=[path.join(get_package_dir(), 'include'), "."],
+                                                             profile=compiler_profile))
+                    self.kernel.load_lib()
+                    self._kernel_registry[registry_key] = self.kernel
 
         # Set up the interaction kernel(s) if not set and given.
         if self.interaction_kernel is None and pyfunc_inter is not None:
@@ -369,10 +406,13 @@ class BaseParticleSet(NDCluster):
             moviedt = moviedt.total_seconds()
         if isinstance(callbackdt, delta):
             callbackdt = callbackdt.total_seconds()
+        if isinstance(snapshot_dt, delta):
+            snapshot_dt = snapshot_dt.total_seconds()
 
         assert runtime is None or runtime >= 0, 'runtime must be positive'
         assert outputdt is None or outputdt >= 0, 'outputdt must be positive'
         assert moviedt is None or moviedt >= 0, 'moviedt must be positive'
+        assert snapshot_dt is None or snapshot_dt >= 0, 'snapshot_dt must be positive'
 
         if runtime is not None and endtime is not None:
             raise RuntimeError('Only one of (endtime, runtime) can be specified')
@@ -403,16 +443,32 @@ class BaseParticleSet(NDCluster):
 
         self._set_particle_vector('dt', dt)
 
+        if output_in_kernel:
+            fields_to_write = [f for f in self.fieldset.get_fields() if getattr(f, 'to_write', False)] if self.fieldset is not None else []
+            if not output_file or output_file.write_ondelete or not np.isfinite(outputdt) or outputdt == 0 \
+                    or not getattr(self.kernel, 'records_output', False) or self.interaction_kernel is not None or dt_buckets \
+                    or execute_once or len(fields_to_write) > 0:
+                logger.warning_once("Output can only be recorded in the kernel for JIT kernels of SoA ParticleSets, without interaction "
+                                    "kernels, dt_buckets, write_ondelete or Fields that are written during execution. "
+                                    "Writing the output from Python instead")
+                output_in_kernel = False
+
         # First write output_file, because particles could have been added
         if output_file:
             output_file.write(self, _starttime)
         if moviedt:
             self.show(field=movie_background_field, show_time=_starttime, animation=True)
+        if analytics is None:
+            analytics = []
+        elif not isinstance(analytics, list):
+            analytics = [analytics]
+        for a in analytics:
+            a.sample(self, _starttime)
 
         if moviedt is None:
             moviedt = np.infty
         if callbackdt is None:
-            interupt_dts = [np.infty, moviedt, outputdt]
+            interupt_dts = [np.infty, moviedt, np.infty if output_in_kernel else outputdt]
             if self.repeatdt is not None:
                 interupt_dts.append(self.repeatdt)
             callbackdt = np.min(np.array(interupt_dts))
@@ -424,6 +480,7 @@ class BaseParticleSet(NDCluster):
         next_output = time + outputdt if dt > 0 else time - outputdt
         next_movie = time + moviedt if dt > 0 else time - moviedt
         next_callback = time + callbackdt if dt > 0 else time - callbackdt
+        next_analytics = [time + a.outputdt * np.sign(dt) for a in analytics]
         next_input = self.fieldset.computeTimeChunk(time, np.sign(dt)) if self.fieldset is not None else np.inf
 
         tol = 1e-12
@@ -442,15 +499,26 @@ class BaseParticleSet(NDCluster):
                 pbar = self.__create_progressbar(_starttime, endtime)
                 verbose_progress = True
 
+            # the kernel records the output times before the last output time in its buffer itself
+            next_output_stop = next_output + np.sign(dt) * (output_file.kernel_output_slots * outputdt) if output_in_kernel else next_output
             if dt > 0:
-                next_time = min(next_prelease, next_input, next_output, next_movie, next_callback, endtime)
+                next_time = min(next_prelease, next_input, next_output_stop, next_movie, next_callback, endtime, *next_analytics)
             else:
-                next_time = max(next_prelease, next_input, next_output, next_movie, next_callback, endtime)
+                next_time = max(next_prelease, next_input, next_output_stop, next_movie, next_callback, endtime, *next_analytics)
+            if snapshot_dt and dt != 0 and self.fieldset is not None:
+                next_time = min(next_time, time + max(snapshot_dt, dt)) if dt > 0 else max(next_time, time - max(snapshot_dt, -dt))
+                self.fieldset.set_time_snapshot((time + next_time) / 2.)
 
             # If we don't perform interaction, only execute the normal kernel efficiently.
-            if self.interaction_kernel is None:
+            if self.interaction_kernel is None and output_in_kernel:
+                noutputs = int(np.ceil(abs(next_time - next_output) / outputdt - 1e-6)) if np.sign(dt) * (next_time - next_output) > tol else 0
+                output_times = next_output + np.sign(dt) * outputdt * np.arange(noutputs)
+                self.kernel.execute(self, endtime=next_time, dt=dt, recovery=recovery, output_file=output_file,
+                                    execute_once=execute_once, output_times=output_times)
+                next_output += np.sign(dt) * outputdt * noutputs
+            elif self.interaction_kernel is None:
                 self.kernel.execute(self, endtime=next_time, dt=dt, recovery=recovery, output_file=output_file,
-                                    execute_once=execute_once)
+                                    execute_once=execute_once, dt_buckets=dt_buckets)
             # Interaction: interleave the interaction and non-interaction kernel for each time step.
             # E.g. Inter -> Normal -> Inter -> Normal if endtime-time == 2*dt
             else:
@@ -465,7 +533,7 @@ class BaseParticleSet(NDCluster):
                         output_file=output_file, execute_once=execute_once)
                     self.kernel.execute(
                         self, endtime=cur_end_time, dt=dt, recovery=recovery,
-                        output_file=output_file, execute_once=execute_once)
+                        output_file=output_file, execute_once=execute_once, dt_buckets=dt_buckets)
                     cur_time += dt
                     if dt == 0:
                         break
@@ -497,6 +565,10 @@ class BaseParticleSet(NDCluster):
             if abs(time-next_movie) < tol:
                 self.show(field=movie_background_field, show_time=time, animation=True)
                 next_movie += moviedt * np.sign(dt)
+            for i, a in enumerate(analytics):
+                if abs(time - next_analytics[i]) < tol:
+                    a.sample(self, time)
+                    next_analytics[i] += a.outputdt * np.sign(dt)
             # ==== insert post-process here to also allow for memory clean-up via external func ==== #
             if abs(time-next_callback) < tol:
                 if postIterationCallbacks is not None:
@@ -511,11 +583,24 @@ class BaseParticleSet(NDCluster):
                 pbar.update(abs(time - pbar.prevtime))
                 pbar.prevtime = time
 
+        if snapshot_dt and self.fieldset is not None:
+            self.fieldset.set_time_snapshot(None)
         if output_file:
             output_file.write(self, time)
+        for a in analytics:
+            a.reduce()
         if verbose_progress:
             pbar.close()
 
+    def _kernel_registry_key(self, kernel, compiler_profile):
+        """Key of a JIT kernel in the registry of loaded kernel libraries of this ParticleSet, so that alternating
+        between kernels in execute() is a dictionary lookup instead of a recompilation. Kernels are identified by
+        their generated code, the particle type and the Fields of the FieldSet (which the code refers to by name),
+        together with the compiler profile
+        """
+        fields = tuple(id(f) for f in self.fieldset.get_fields()) if self.fieldset is not None else ()
+        return (kernel.ccode, self.collection.ptype._cache_key, fields, compiler_profile)
+
     def show(self, with_particles=True, show_time=None, field=None, domain=None, projection=None,
              land=True, vmin=None, vmax=None, savefile=None, animation=False, **kwargs):
         """Method to 'show' a Parcels ParticleSet
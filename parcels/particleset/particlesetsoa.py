@@ -2,10 +2,14 @@ from datetime import date
 from datetime import datetime
 from datetime import timedelta as delta
 
+import os
+import random
 import sys
+import warnings
 import numpy as np
 import xarray as xr
 from copy import copy
+from ctypes import c_int
 
 from parcels.grid import GridCode
 from parcels.grid import CurvilinearGrid
@@ -37,6 +41,13 @@ except:
 __all__ = ['ParticleSetSOA']
 
 
+def _rank_dirname(dirname):
+    """Returns the subdirectory of a snapshot or checkpoint directory used by this MPI rank"""
+    if MPI and MPI.COMM_WORLD.Get_size() > 1:
+        return os.path.join(str(dirname), 'proc%02d' % MPI.COMM_WORLD.Get_rank())
+    return str(dirname)
+
+
 def _convert_to_array(var):
     """Convert lists and single integers/floats to one-dimensional numpy
     arrays
@@ -87,6 +98,8 @@ class ParticleSetSOA(BaseParticleSet):
     Other Variables can be initialised using further arguments (e.g. v=... for a Variable named 'v')
     """
 
+    restart_chunk_size = 2**24  # number of (traj x obs) values read at once by from_particlefile
+
     def __init__(self, fieldset=None, pclass=JITParticle, lon=None, lat=None,
                  depth=None, time=None, repeatdt=None, lonlatdepth_dtype=None,
                  pid_orig=None, interaction_distance=None, periodic_domain_zonal=None, **kwargs):
@@ -421,12 +434,15 @@ class ParticleSetSOA(BaseParticleSet):
         :param fieldset: :mod:`parcels.fieldset.FieldSet` object from which to sample velocity
         :param pclass: mod:`parcels.particle.JITParticle` or :mod:`parcels.particle.ScipyParticle`
                  object that defines custom particle
-        :param filename: Name of the particlefile from which to read initial conditions
+        :param filename: Name of the particlefile from which to read initial conditions. This can also be
+               a snapshot directory written by :meth:`to_snapshot`
         :param restart: Boolean to signal if pset is used for a restart (default is True).
                In that case, Particle IDs are preserved.
         :param restarttime: time at which the Particles will be restarted. Default is the last time written.
                Alternatively, restarttime could be a time value (including np.datetime64) or
                a callable function such as np.nanmin. The last is useful when running with dt < 0.
+               A callable is applied to blocks of the particlefile and then to the results of these blocks,
+               so it should be a reduction such as np.nanmin or np.nanmax
         :param repeatdt: Optional interval (in seconds) on which to repeat the release of the ParticleSet
         :param lonlatdepth_dtype: Floating precision for lon, lat, depth particle coordinates.
                It is either np.float32 or np.float64. Default is np.float32 if fieldset.U.interp_method is 'linear'
@@ -438,48 +454,200 @@ class ParticleSetSOA(BaseParticleSet):
                            'setting a new repeatdt will start particles from the _new_ particle '
                            'locations.' % filename)
 
+        if os.path.isdir(str(filename)):
+            vars = cls._read_snapshot(pclass, filename, restarttime)
+        else:
+            vars = cls._read_particlefile(pclass, filename, restarttime)
+        for v in vars:
+            if v not in ['lon', 'lat', 'depth', 'time', 'id']:
+                kwargs[v] = vars[v]
+
+        if restart:
+            pclass.setLastID(0)  # reset to zero offset
+        else:
+            vars['id'] = None
+
+        return cls(fieldset=fieldset, pclass=pclass, lon=vars['lon'], lat=vars['lat'],
+                   depth=vars['depth'], time=vars['time'], pid_orig=vars['id'],
+                   lonlatdepth_dtype=lonlatdepth_dtype, repeatdt=repeatdt, **kwargs)
+
+    @staticmethod
+    def _reduce_restarttime(restarttime, time_blocks):
+        """Resolves the restarttime argument of from_particlefile, evaluating a callable
+        (e.g. np.nanmax) first on each block of times and then on the results of all blocks"""
+        if restarttime is None:
+            restarttime = np.nanmax
+        if not callable(restarttime):
+            return restarttime
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # blocks of only deleted particles are all-NaN
+            return restarttime(np.array([restarttime(t) for t in time_blocks if t.size > 0]))
+
+    @classmethod
+    def _read_particlefile(cls, pclass, filename, restarttime):
+        """Reads the observation at restarttime of every trajectory in a netcdf ParticleFile.
+
+        The (traj x obs) variables are never loaded as a whole: the time variable is scanned in blocks of
+        trajectories to find the observation index of each trajectory at restarttime, and only the slabs
+        of observations spanning these indices are read for the other variables
+        """
         pfile = xr.open_dataset(str(filename), decode_cf=True)
         pfile_vars = [v for v in pfile.data_vars]
 
-        vars = {}
+        names = {}
         to_write = {}
         for v in pclass.getPType().variables:
             if v.name in pfile_vars:
-                vars[v.name] = np.ma.filled(pfile.variables[v.name], np.nan)
+                names[v.name] = v.name
             elif v.name not in ['xi', 'yi', 'zi', 'ti', 'dt', '_next_dt', 'depth', 'id', 'fileid', 'state'] \
                     and v.to_write:
                 raise RuntimeError('Variable %s is in pclass but not in the particlefile' % v.name)
             to_write[v.name] = v.to_write
-        vars['depth'] = np.ma.filled(pfile.variables['z'], np.nan)
-        vars['id'] = np.ma.filled(pfile.variables['trajectory'], np.nan)
-
-        if isinstance(vars['time'][0, 0], np.timedelta64):
-            vars['time'] = np.array([t/np.timedelta64(1, 's') for t in vars['time']])
-
-        if restarttime is None:
-            restarttime = np.nanmax(vars['time'])
-        elif callable(restarttime):
-            restarttime = restarttime(vars['time'])
-        else:
-            restarttime = restarttime
+        names['depth'] = 'z'
+        names['id'] = 'trajectory'
+
+        ntraj = pfile['time'].shape[0]
+        nobs = pfile['time'].shape[1] if len(pfile['time'].shape) > 1 else 1
+        blocksize = max(1, cls.restart_chunk_size // max(nobs, 1))
+        blocks = [slice(b, min(b + blocksize, ntraj)) for b in range(0, ntraj, blocksize)]
+
+        def read_time(block):
+            time = np.ma.filled(pfile.variables['time'][block].values, np.nan)
+            if np.issubdtype(time.dtype, np.timedelta64):
+                time = time / np.timedelta64(1, 's')
+            return time
+
+        if restarttime is None or callable(restarttime):
+            restarttime = cls._reduce_restarttime(restarttime, (read_time(block) for block in blocks))
+
+        vars = {v: [] for v in names}
+        for block in blocks:
+            match = read_time(block) == restarttime
+            rows = np.where(match.any(axis=1))[0]
+            if len(rows) == 0:
+                continue
+            obs = np.argmax(match[rows], axis=1)
+            obs_slab = slice(obs.min(), obs.max() + 1)
+            for v, name in names.items():
+                if to_write[v] == 'once':
+                    data = np.ma.filled(pfile.variables[name][block].values, np.nan)
+                    vars[v].append(data[rows])
+                else:
+                    data = np.ma.filled(pfile.variables[name][block, obs_slab].values, np.nan)
+                    if np.issubdtype(data.dtype, np.timedelta64):
+                        data = data / np.timedelta64(1, 's')
+                    vars[v].append(data[rows, obs - obs_slab.start])
+        pfile.close()
 
-        inds = np.where(vars['time'] == restarttime)
         for v in vars:
-            if to_write[v] is True:
-                vars[v] = vars[v][inds]
-            elif to_write[v] == 'once':
-                vars[v] = vars[v][inds[0]]
-            if v not in ['lon', 'lat', 'depth', 'time', 'id']:
-                kwargs[v] = vars[v]
+            vars[v] = np.concatenate(vars[v]) if len(vars[v]) > 0 else np.empty(0)
+        return vars
+
+    @staticmethod
+    def _read_snapshot(pclass, dirname, restarttime):
+        """Reads the particles at restarttime from a snapshot directory written by :meth:`to_snapshot`,
+        which holds one memory-mappable .npy file per particle variable (in a subdirectory per MPI rank
+        if the snapshot was written by an MPI run)"""
+        procdirs = sorted(d for d in os.listdir(str(dirname)) if d.startswith('proc'))
+        dirnames = [os.path.join(str(dirname), d) for d in procdirs] if len(procdirs) > 0 else [str(dirname)]
+
+        columns = {}
+        for v in pclass.getPType().variables:
+            if v.name in ['xi', 'yi', 'zi', 'ti', 'dt', '_next_dt', 'fileid', 'state']:
+                continue
+            fnames = [os.path.join(d, '%s.npy' % v.name) for d in dirnames]
+            if all([os.path.exists(f) for f in fnames]):
+                columns[v.name] = [np.load(f, mmap_mode='r') for f in fnames]
+            elif v.to_write:
+                raise RuntimeError('Variable %s is in pclass but not in the snapshot' % v.name)
+
+        restarttime = ParticleSetSOA._reduce_restarttime(restarttime, columns['time'])
+        inds = [np.where(t == restarttime)[0] for t in columns['time']]
+        return {v: np.concatenate([c[i] for c, i in zip(columns[v], inds)]) for v in columns}
+
+    def to_snapshot(self, dirname):
+        """Writes the current state of all particles to a snapshot directory, with one .npy file
+        per particle variable (including those that are not written to a ParticleFile).
+        The snapshot can be used to restart a simulation with :meth:`from_particlefile`
+
+        :param dirname: Name of the directory to write the snapshot to
+        """
+        dirname = _rank_dirname(dirname)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        for v in self.collection.ptype.variables:
+            np.save(os.path.join(dirname, '%s.npy' % v.name), self.collection._data[v.name])
+
+    def checkpoint(self, dirname):
+        """Writes a checkpoint of the ParticleSet, from which the simulation can be continued
+        with :meth:`restore`. Next to a snapshot of all particle variables (see :meth:`to_snapshot`),
+        including the search indices xi/yi/zi/ti, the checkpoint holds the particle ID counter,
+        the repeatdt release state, the time periods of the grids and the state of the python and
+        numpy random generators. Note that the state of the C random generator used in JIT mode
+        cannot be stored.
+
+        :param dirname: Name of the directory to write the checkpoint to (one subdirectory per MPI rank)
+        """
+        self.to_snapshot(dirname)
+        state = {'variables': {v.name: np.dtype(v.dtype).str for v in self.collection.ptype.variables},
+                 'lastID': self.collection.pclass.lastID,
+                 'repeatdt': self.repeatdt,
+                 'python_random_state': random.getstate(),
+                 'numpy_random_state': np.random.get_state()}
+        if self.repeatdt:
+            for attr in ['repeat_starttime', 'repeatlon', 'repeatlat', 'repeatdepth', 'repeatkwargs']:
+                state[attr] = getattr(self, attr)
+            state['repeatpid'] = getattr(self, 'repeatpid', None)
+        if self.fieldset is not None:
+            state['grid_periods'] = [g.periods.value if isinstance(g.periods, c_int) else g.periods
+                                     for g in self.fieldset.gridset.grids]
+        np.save(os.path.join(_rank_dirname(dirname), 'pset_state.npy'), state)
 
-        if restart:
-            pclass.setLastID(0)  # reset to zero offset
-        else:
-            vars['id'] = None
+    @classmethod
+    def restore(cls, dirname, fieldset, pclass=JITParticle, lonlatdepth_dtype=None):
+        """Restores a ParticleSet from a checkpoint written by :meth:`checkpoint`, so that
+        the simulation continues exactly as it would have without the restart.
+        In MPI runs, each rank restores the particles it held when the checkpoint was written.
 
-        return cls(fieldset=fieldset, pclass=pclass, lon=vars['lon'], lat=vars['lat'],
-                   depth=vars['depth'], time=vars['time'], pid_orig=vars['id'],
-                   lonlatdepth_dtype=lonlatdepth_dtype, repeatdt=repeatdt, **kwargs)
+        :param dirname: Name of the checkpoint directory
+        :param fieldset: :mod:`parcels.fieldset.FieldSet` object from which to sample velocity
+        :param pclass: mod:`parcels.particle.JITParticle` or :mod:`parcels.particle.ScipyParticle`
+                 object with the same Variables as the checkpointed ParticleSet
+        :param lonlatdepth_dtype: Floating precision for lon, lat, depth particle coordinates.
+               Default is the precision of the checkpointed ParticleSet
+        """
+        dirname = _rank_dirname(dirname)
+        state = np.load(os.path.join(dirname, 'pset_state.npy'), allow_pickle=True).item()
+        columns = {v: np.load(os.path.join(dirname, '%s.npy' % v), mmap_mode='r') for v in state['variables']}
+        missing = [v.name for v in pclass.getPType().variables if v.name not in columns]
+        if len(missing) > 0:
+            raise RuntimeError('Variable(s) %s are in pclass but not in the checkpoint' % missing)
+
+        if lonlatdepth_dtype is None:
+            lonlatdepth_dtype = columns['lon'].dtype.type
+        kwargs = {v: columns[v] for v in columns if hasattr(pclass, v) and v not in
+                  ['lon', 'lat', 'depth', 'time', 'id', 'xi', 'yi', 'zi', 'ti', 'ngrids']}
+        pset = cls(fieldset=fieldset, pclass=pclass, lon=columns['lon'], lat=columns['lat'], depth=columns['depth'],
+                   time=columns['time'], lonlatdepth_dtype=lonlatdepth_dtype, partitions=False, **kwargs)
+        for v in pset.collection.ptype.variables:
+            if v.name in columns:
+                pset.collection._data[v.name][:] = columns[v.name]
+        pclass.setLastID(state['lastID'])
+
+        pset.repeatdt = state['repeatdt']
+        if pset.repeatdt:
+            pset.repeatpclass = pclass
+            for attr in ['repeat_starttime', 'repeatlon', 'repeatlat', 'repeatdepth', 'repeatkwargs', 'repeatpid']:
+                setattr(pset, attr, state[attr])
+        if fieldset is not None and 'grid_periods' in state:
+            for g, periods in zip(fieldset.gridset.grids, state['grid_periods']):
+                if isinstance(g.periods, c_int):
+                    g.periods.value = periods
+                else:
+                    g.periods = periods
+        random.setstate(state['python_random_state'])
+        np.random.set_state(state['numpy_random_state'])
+        return pset
 
     def to_dict(self, pfile, time, deleted_only=False):
         """
@@ -619,18 +787,18 @@ def search_kernel(particle, fieldset, time):
         if isinstance(particle_val, str):
             particle_val = self._collection._data[particle_val]
         else:
-            particle_val = particle_val if particle_val else np.ones(self.size)
-        density = np.zeros((field.grid.lat.size, field.grid.lon.size), dtype=np.float32)
-
-        for i, p in enumerate(self):
-            try:  # breaks if either p.xi, p.yi, p.zi, p.ti do not exist (in scipy) or field not in fieldset
-                if p.ti[field.igrid] < 0:  # xi, yi, zi, ti, not initialised
-                    raise('error')
-                xi = p.xi[field.igrid]
-                yi = p.yi[field.igrid]
-            except:
-                _, _, _, xi, yi, _ = field.search_indices(p.lon, p.lat, p.depth, 0, 0, search2D=True)
-            density[yi, xi] += particle_val[i]
+            particle_val = particle_val if particle_val is not None else np.ones(self.size)
+
+        # the search kernel has set the indices of each particle on the field grid; the indices of
+        # particles for which they are not initialised (e.g. not yet released) are searched here
+        xi = self._collection._data['xi'][:, field.igrid].copy()
+        yi = self._collection._data['yi'][:, field.igrid].copy()
+        for i in np.where(self._collection._data['ti'][:, field.igrid] < 0)[0]:
+            _, _, _, xi[i], yi[i], _ = field.search_indices(self._collection._data['lon'][i], self._collection._data['lat'][i],
+                                                            self._collection._data['depth'][i], 0, 0, search2D=True)
+        density = np.bincount(yi * field.grid.xdim + xi, weights=particle_val,
+                              minlength=field.grid.ydim * field.grid.xdim)
+        density = density.reshape((field.grid.ydim, field.grid.xdim)).astype(np.float32)
 
         if relative:
             density /= np.sum(particle_val)
@@ -640,14 +808,16 @@ def search_kernel(particle, fieldset, time):
 
         return density
 
-    def Kernel(self, pyfunc, c_include="", delete_cfiles=True):
+    def Kernel(self, pyfunc, c_include="", delete_cfiles=True, batched=False):
         """Wrapper method to convert a `pyfunc` into a :class:`parcels.kernel.Kernel` object
         based on `fieldset` and `ptype` of the ParticleSet
 
         :param delete_cfiles: Boolean whether to delete the C-files after compilation in JIT mode (default is True)
+        :param batched: Boolean whether to advance the particles in blocks in JIT mode (default is False).
+               See :class:`parcels.kernel.kernelsoa.KernelSOA`
         """
         return Kernel(self.fieldset, self.collection.ptype, pyfunc=pyfunc, c_include=c_include,
-                      delete_cfiles=delete_cfiles)
+                      delete_cfiles=delete_cfiles, batched=batched)
 
     def InteractionKernel(self, pyfunc_inter):
         if pyfunc_inter is None:
@@ -1 +1,2 @@
 from .plottrajectoriesfile import plotTrajectoriesFile  # NOQA get flake8 to ignore unused import.
+from .plottrajectoriesfile import renderTrajectoriesFile  # NOQA get flake8 to ignore unused import.
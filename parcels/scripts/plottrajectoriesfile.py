@@ -1,5 +1,8 @@
 from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
 from os import environ
+from os import makedirs
+from os import path
 
 import numpy as np
 import xarray as xr
@@ -144,9 +147,100 @@ def plotTrajectoriesFile(filename, mode='2d', tracerfile=None, tracerfield='P',
         return plt
 
 
+def _read_blocks(pfile, variables, chunksize, decimate):
+    """Yields the given (traj x obs) variables of a particle file, for blocks of trajectories of about
+    chunksize values, and taking every decimate'th trajectory"""
+    ntraj, nobs = pfile['lon'].shape
+    blocksize = max(1, chunksize // nobs) * decimate
+    for start in range(0, ntraj, blocksize):
+        block = slice(start, min(start + blocksize, ntraj), decimate)
+        yield [np.ma.filled(pfile.variables[v][block].values, np.nan).astype(np.float64) for v in variables]
+
+
+def _write_frame(args):
+    fname, image, vmax, cmap = args
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.imsave(fname, np.log1p(image), vmin=0, vmax=np.log1p(vmax), cmap=cmap, origin='lower')
+    return fname
+
+
+def renderTrajectoriesFile(filename, framedir=None, mode='positions', resolution=(400, 300), domain=None,
+                           decimate=1, trail=None, chunksize=2**24, processes=None, cmap='viridis'):
+    """Fast rendering of large Parcels trajectory files into one density image per output time.
+
+    The particle file is read in blocks of trajectories, and the particle positions of each block are
+    binned into the images of all output times at once, so that memory use does not depend on the
+    number of particles. The frames are written as png files in parallel.
+
+    :param filename: Name of Parcels-generated NetCDF file with particle positions
+    :param framedir: Optional name of the directory to write the frames to, as frame_00000.png etc.
+                     Default is None, in which case only the images are returned
+    :param mode: 'positions' for the density of the particle positions at each time, or 'trajectories'
+                 for the density of all positions up to each time
+    :param resolution: Number of pixels (in longitude, latitude) of the images
+    :param domain: Optional dictionary (with keys 'N', 'S', 'E', 'W') of the domain to render.
+                   Default is the domain of all particle positions
+    :param decimate: Only render every decimate'th trajectory (default 1)
+    :param trail: Optional number of frames that trajectories are shown for in 'trajectories' mode.
+                  Default is None, showing the full trajectories
+    :param chunksize: Number of (traj x obs) values read from the file at once
+    :param processes: Number of processes used to write the frames. Default is the number of cores
+    :param cmap: Name of the matplotlib colormap of the frames
+    :return: Tuple of the times of the frames and the array of images, of shape (frames, latitude, longitude)
+    """
+    environ["HDF5_USE_FILE_LOCKING"] = "FALSE"
+    pfile = xr.open_dataset(str(filename), decode_times=False)
+
+    # first pass: the times of the frames and the domain
+    frametimes = np.empty(0)
+    lonmin = latmin = np.inf
+    lonmax = latmax = -np.inf
+    for time, lon, lat in _read_blocks(pfile, ['time', 'lon', 'lat'], chunksize, decimate):
+        frametimes = np.union1d(frametimes, np.unique(time[np.isfinite(time)]))
+        if domain is None and np.any(np.isfinite(lon)):
+            lonmin, lonmax = min(lonmin, np.nanmin(lon)), max(lonmax, np.nanmax(lon))
+            latmin, latmax = min(latmin, np.nanmin(lat)), max(latmax, np.nanmax(lat))
+    if domain is not None:
+        lonmin, lonmax, latmin, latmax = domain['W'], domain['E'], domain['S'], domain['N']
+    lon_edges = np.linspace(lonmin, lonmax, resolution[0] + 1)
+    lat_edges = np.linspace(latmin, latmax, resolution[1] + 1)
+
+    # second pass: bin all positions of each block into the images of all frames at once
+    npix = resolution[0] * resolution[1]
+    images = np.zeros(len(frametimes) * npix, dtype=np.float32)
+    for time, lon, lat in _read_blocks(pfile, ['time', 'lon', 'lat'], chunksize, decimate):
+        valid = np.isfinite(time) & np.isfinite(lon) & np.isfinite(lat)
+        frame = np.searchsorted(frametimes, time[valid])
+        xi = np.minimum(np.searchsorted(lon_edges, lon[valid], side='right') - 1, resolution[0] - 1)
+        yi = np.minimum(np.searchsorted(lat_edges, lat[valid], side='right') - 1, resolution[1] - 1)
+        inside = (xi >= 0) & (yi >= 0) & (lon[valid] <= lon_edges[-1]) & (lat[valid] <= lat_edges[-1])
+        keys = (frame * resolution[1] + yi) * resolution[0] + xi
+        images += np.bincount(keys[inside], minlength=images.size).astype(np.float32)
+    pfile.close()
+    images = images.reshape((len(frametimes), resolution[1], resolution[0]))
+
+    if mode == 'trajectories':
+        images = np.cumsum(images, axis=0)
+        if trail is not None and trail < len(frametimes):
+            images[trail:] -= images[:-trail].copy()
+    elif mode != 'positions':
+        raise RuntimeError('mode %s not known' % mode)
+
+    if framedir is not None:
+        if not path.exists(str(framedir)):
+            makedirs(str(framedir))
+        vmax = max(images.max(), 1)
+        frames = [(path.join(str(framedir), 'frame_%05d.png' % i), images[i], vmax, cmap) for i in range(len(frametimes))]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            list(executor.map(_write_frame, frames))
+    return frametimes, images
+
+
 if __name__ == "__main__":
     p = ArgumentParser(description="""Quick and simple plotting of Parcels trajectories""")
-    p.add_argument('mode', choices=('2d', '3d', 'hist2d', 'movie2d', 'movie2d_notebook'), nargs='?',
+    p.add_argument('mode', choices=('2d', '3d', 'hist2d', 'movie2d', 'movie2d_notebook', 'frames'), nargs='?',
                    default='movie2d', help='Type of display')
     p.add_argument('-p', '--particlefile', type=str, default='MyParticle.nc',
                    help='Name of particle file')
@@ -162,9 +256,14 @@ if __name__ == "__main__":
                    help='Name of a variable recorded along trajectory')
     p.add_argument('-bins', type=int, default=20,
                    help='Number of bins for mode=hist2d')
+    p.add_argument('-o', '--framedir', type=str, default='frames',
+                   help='Directory to write the density images to for mode=frames')
     args = p.parse_args()
 
-    plotTrajectoriesFile(args.particlefile, mode=args.mode, tracerfile=args.tracerfile,
-                         tracerfield=args.tracerfilefield, tracerlon=args.tracerfilelon,
-                         tracerlat=args.tracerfilelat, recordedvar=args.recordedvar,
-                         bins=args.bins, show_plt=True)
+    if args.mode == 'frames':
+        renderTrajectoriesFile(args.particlefile, framedir=args.framedir)
+    else:
+        plotTrajectoriesFile(args.particlefile, mode=args.mode, tracerfile=args.tracerfile,
+                             tracerfield=args.tracerfilefield, tracerlon=args.tracerfilelon,
+                             tracerlat=args.tracerfilelat, recordedvar=args.recordedvar,
+                             bins=args.bins, show_plt=True)
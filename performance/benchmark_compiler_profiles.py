@@ -0,0 +1,67 @@
+"""Benchmark of the compiler optimisation profiles for JIT kernels on the standard examples.
+
+For each example and profile, the first (short) execute call compiles the kernel,
+so that only the second one, which does the actual integration, is timed.
+"""
+from argparse import ArgumentParser
+from datetime import timedelta as delta
+import time as ostime
+
+from parcels import AdvectionRK4
+from parcels import JITParticle
+from parcels import ParticleSet
+from parcels.compilation.codecompiler import compiler_profiles
+from parcels.examples.example_moving_eddies import moving_eddies_fieldset
+from parcels.examples.example_peninsula import peninsula_fieldset
+from parcels.examples.example_stommel import stommel_fieldset
+
+
+def peninsula_setup():
+    fieldset = peninsula_fieldset(100, 50, mesh='flat')
+    x = 3000  # 3 km offset from boundary
+    return fieldset, (x, fieldset.U.lat[0] + x), (x, fieldset.U.lat[-1] - x), delta(hours=24), delta(minutes=5)
+
+
+def stommel_setup():
+    fieldset = stommel_fieldset()
+    return fieldset, (10e3, 5000e3), (100e3, 5000e3), delta(days=50), delta(hours=1)
+
+
+def moving_eddies_setup():
+    fieldset = moving_eddies_fieldset(mesh='spherical')
+    return fieldset, (3.3, 46.), (3.3, 47.8), delta(days=2), delta(minutes=5)
+
+
+examples = {'peninsula': peninsula_setup,
+            'stommel': stommel_setup,
+            'moving_eddies': moving_eddies_setup}
+
+
+def run_benchmark(example, profile, npart):
+    fieldset, start, finish, runtime, dt = examples[example]()
+    pset = ParticleSet.from_line(fieldset, size=npart, pclass=JITParticle, start=start, finish=finish)
+    pset.execute(AdvectionRK4, runtime=dt, dt=dt, compiler_profile=profile)
+    tic = ostime.time()
+    pset.execute(AdvectionRK4, runtime=runtime, dt=dt, compiler_profile=profile)
+    return ostime.time() - tic
+
+
+if __name__ == "__main__":
+    p = ArgumentParser(description="Compare the run time of the compiler optimisation profiles on the standard examples")
+    p.add_argument('-p', '--particles', type=int, default=1000,
+                   help='Number of particles to advect')
+    p.add_argument('-e', '--examples', nargs='+', choices=list(examples.keys()), default=list(examples.keys()),
+                   help='Examples to run')
+    p.add_argument('--profiles', nargs='+', choices=list(compiler_profiles.keys()), default=list(compiler_profiles.keys()),
+                   help='Compiler profiles to compare')
+    p.add_argument('-r', '--repeat', type=int, default=3,
+                   help='Number of repetitions per profile; the fastest one is reported')
+    args = p.parse_args()
+
+    print("%-15s %-10s %10s %10s" % ('example', 'profile', 'time [s]', 'speed-up'))
+    for example in args.examples:
+        timings = {profile: min([run_benchmark(example, profile, args.particles) for _ in range(args.repeat)])
+                   for profile in args.profiles}
+        reference = timings.get('default', timings[args.profiles[0]])
+        for profile in args.profiles:
+            print("%-15s %-10s %10.3f %9.2fx" % (example, profile, timings[profile], reference / timings[profile]))
@@ -1,5 +1,5 @@
-from parcels import (FieldSet, Field, ScipyParticle, JITParticle, ErrorCode, StateCode,
-                     AdvectionEE, AdvectionRK4, AdvectionRK45, AdvectionRK4_3D,
+from parcels import (FieldSet, Field, ScipyParticle, JITParticle, ErrorCode, StateCode, Variable,
+                     AdvectionEE, AdvectionRK4, AdvectionRK45, AdvectionRK4_3D, AdvectionDormandPrince,
                      AdvectionAnalytical, AdvectionDiffusionM1, AdvectionDiffusionEM)
 from parcels import ParticleSetSOA, ParticleFileSOA, KernelSOA  # noqa
 from parcels import ParticleSetAOS, ParticleFileAOS, KernelAOS  # noqa
@@ -14,7 +14,7 @@ pset_modes = ['soa', 'aos']
 ptype = {'scipy': ScipyParticle, 'jit': JITParticle}
 pset_type = {'soa': {'pset': ParticleSetSOA, 'pfile': ParticleFileSOA, 'kernel': KernelSOA},
              'aos': {'pset': ParticleSetAOS, 'pfile': ParticleFileAOS, 'kernel': KernelAOS}}
-kernel = {'EE': AdvectionEE, 'RK4': AdvectionRK4, 'RK45': AdvectionRK45,
+kernel = {'EE': AdvectionEE, 'RK4': AdvectionRK4, 'RK4_3D': AdvectionRK4_3D, 'RK45': AdvectionRK45, 'DP45': AdvectionDormandPrince,
           'AdvDiffEM': AdvectionDiffusionEM, 'AdvDiffM1': AdvectionDiffusionM1}
 
 # Some constants
@@ -162,6 +162,39 @@ def test_advection_3D_outofbounds(pset_mode, mode, direction, wErrorThroughSurfa
         assert len(pset) == 0
 
 
+@pytest.mark.parametrize('method', ['RK4', 'RK4_3D'])
+def test_advection_batched(method, npart=21):
+    """ Batched JIT execution gives the same result as the particle-by-particle loop,
+        also for particles that leave the domain
+    """
+    dimensions = {'lon': np.linspace(0., 1e4, 20, dtype=np.float32),
+                  'lat': np.linspace(0., 1e4, 15, dtype=np.float32),
+                  'depth': np.linspace(0., 100., 5, dtype=np.float32),
+                  'time': [0., 86400.]}
+    depth, lat, lon = np.meshgrid(dimensions['depth'], dimensions['lat'], dimensions['lon'], indexing='ij')
+    U = 0.1 + 0.05 * np.cos(lat / 1e4 * np.pi) + 0.01 * depth / 100.
+    V = 0.05 * np.sin(lon / 1e4 * np.pi)
+    data = {'U': np.array([U, 1.2 * U], dtype=np.float32),
+            'V': np.array([V, 0.8 * V], dtype=np.float32),
+            'W': np.array([1e-3 * np.sin(lon / 1e4 * np.pi)] * 2, dtype=np.float32)}
+    fieldset = FieldSet.from_data(data, dimensions, mesh='flat')
+
+    def DeleteParticle(particle, fieldset, time):
+        particle.delete()
+
+    psets = []
+    for batched in [False, True]:
+        pset = ParticleSetSOA(fieldset, pclass=JITParticle, lon=np.linspace(1e3, 9e3, npart),
+                              lat=np.linspace(2e3, 8e3, npart), depth=np.linspace(10, 90, npart))
+        pset.execute(pset.Kernel(kernel[method], batched=batched), runtime=delta(hours=6), dt=delta(minutes=5),
+                     recovery={ErrorCode.ErrorOutOfBounds: DeleteParticle})
+        psets.append(pset)
+    assert 0 < len(psets[0]) < npart
+    assert len(psets[0]) == len(psets[1])
+    for var in ['lon', 'lat', 'depth', 'time']:
+        assert np.allclose(getattr(psets[0], var), getattr(psets[1], var), rtol=1e-6)
+
+
 def periodicfields(xdim, ydim, uvel, vvel):
     dimensions = {'lon': np.linspace(0., 1., xdim+1, dtype=np.float32)[1:],  # don't include both 0 and 1, for periodic b.c.
                   'lat': np.linspace(0., 1., ydim+1, dtype=np.float32)[1:]}
@@ -188,6 +221,44 @@ def test_advection_periodic_zonal(pset_mode, mode, xdim=100, ydim=100, halosize=
     assert abs(pset.lon[0] - 0.15) < 0.1
 
 
+@pytest.mark.parametrize('pset_mode', pset_modes)
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+def test_advection_periodic_zonal_lazy(pset_mode, mode, xdim=100, ydim=100):
+    fieldset = periodicfields(xdim, ydim, uvel=1., vvel=0.)
+    fieldset.add_periodic_halo(zonal=True, lazy=True)
+    assert len(fieldset.U.lon) == xdim
+    assert fieldset.U.data.shape[-1] == xdim
+    assert np.isclose(fieldset.U.grid.zonal_period, 1.)
+
+    pset = pset_type[pset_mode]['pset'](fieldset, pclass=ptype[mode], lon=[0.5], lat=[0.5])
+    pset.execute(AdvectionRK4 + pset.Kernel(periodicBC), runtime=delta(hours=20), dt=delta(seconds=30))
+    assert abs(pset.lon[0] - 0.15) < 0.1
+
+
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+@pytest.mark.parametrize('lazy', [True, False])
+def test_sampling_periodic_zonal_seam(mode, lazy, xdim=20, ydim=10):
+    lon = np.linspace(0., 360., xdim, endpoint=False, dtype=np.float32)
+    lat = np.linspace(-10., 10., ydim, dtype=np.float32)
+    data = {'U': np.zeros((ydim, xdim), dtype=np.float32),
+            'V': np.zeros((ydim, xdim), dtype=np.float32),
+            'P': np.tile(np.arange(xdim, dtype=np.float32), (ydim, 1))}
+    fieldset = FieldSet.from_data(data, {'lon': lon, 'lat': lat}, mesh='spherical')
+    fieldset.add_periodic_halo(zonal=True, halosize=2, lazy=lazy)
+
+    class SampleParticle(ptype[mode]):
+        p = Variable('p', dtype=np.float32)
+
+    def SampleP(particle, fieldset, time):
+        particle.p = fieldset.P[time, particle.depth, particle.lat, particle.lon]
+
+    # halfway between the last column (lon=342) and the first one (lon=360)
+    lons = [351., -9., 711.] if lazy else [351., -9.]
+    pset = pset_type['soa']['pset'](fieldset, pclass=SampleParticle, lon=lons, lat=np.zeros(len(lons)))
+    pset.execute(SampleP, runtime=0, dt=0)
+    assert np.allclose(pset.p, (xdim - 1) / 2., rtol=1e-5)
+
+
 @pytest.mark.parametrize('pset_mode', pset_modes)
 @pytest.mark.parametrize('mode', ['scipy', 'jit'])
 def test_advection_periodic_meridional(pset_mode, mode, xdim=100, ydim=100):
@@ -290,7 +361,8 @@ def fieldset_stationary(xdim=100, ydim=100, maxtime=delta(hours=6)):
     ('AdvDiffEM', 1e-2, True),
     ('AdvDiffM1', 1e-2, True),
     ('RK4', 1e-5, False),
-    ('RK45', 1e-5, False)])
+    ('RK45', 1e-5, False),
+    ('DP45', 1e-5, False)])
 def test_stationary_eddy(pset_mode, fieldset_stationary, mode, method, rtol, diffField, npart=1):
     fieldset = fieldset_stationary
     if diffField:
@@ -308,6 +380,22 @@ def test_stationary_eddy(pset_mode, fieldset_stationary, mode, method, rtol, dif
     assert np.allclose(pset.lat, exp_lat, rtol=rtol)
 
 
+@pytest.mark.parametrize('pset_mode', pset_modes)
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+def test_dormandprince_substeps(pset_mode, fieldset_stationary, mode, npart=2):
+    """A dt that is too large is split into sub-steps inside the kernel instead of being repeated"""
+    lon = np.linspace(12000, 21000, npart)
+    lat = np.linspace(12500, 12500, npart)
+    pset = pset_type[pset_mode]['pset'](fieldset_stationary, pclass=ptype[mode], lon=lon, lat=lat)
+    endtime = delta(hours=6).total_seconds()
+    pset.execute(AdvectionDormandPrince, dt=delta(hours=2), endtime=endtime)
+    exp_lon = [truth_stationary(x, y, endtime)[0] for x, y, in zip(lon, lat)]
+    exp_lat = [truth_stationary(x, y, endtime)[1] for x, y, in zip(lon, lat)]
+    assert np.allclose(pset.lon, exp_lon, rtol=1e-5)
+    assert np.allclose(pset.lat, exp_lat, rtol=1e-5)
+    assert np.allclose(pset.time, endtime)
+
+
 @pytest.mark.parametrize('pset_mode', pset_modes)
 @pytest.mark.parametrize('mode', ['scipy', 'jit'])
 def test_stationary_eddy_vertical(pset_mode, mode, npart=1):
@@ -377,7 +465,8 @@ def fieldset_moving(xdim=100, ydim=100, maxtime=delta(hours=6)):
     ('AdvDiffEM', 1e-2, True),
     ('AdvDiffM1', 1e-2, True),
     ('RK4', 1e-5, False),
-    ('RK45', 1e-5, False)])
+    ('RK45', 1e-5, False),
+    ('DP45', 1e-5, False)])
 def test_moving_eddy(pset_mode, fieldset_moving, mode, method, rtol, diffField, npart=1):
     fieldset = fieldset_moving
     if diffField:
@@ -428,7 +517,8 @@ def fieldset_decaying(xdim=100, ydim=100, maxtime=delta(hours=6)):
     ('AdvDiffEM', 1e-2, True),
     ('AdvDiffM1', 1e-2, True),
     ('RK4', 1e-5, False),
-    ('RK45', 1e-5, False)])
+    ('RK45', 1e-5, False),
+    ('DP45', 1e-5, False)])
 def test_decaying_eddy(pset_mode, fieldset_decaying, mode, method, rtol, diffField, npart=1):
     fieldset = fieldset_decaying
     if diffField:
@@ -464,7 +554,7 @@ def test_analyticalAgrid(pset_mode, mode):
 
 
 @pytest.mark.parametrize('pset_mode', pset_modes)
-@pytest.mark.parametrize('mode', ['scipy'])  # JIT not implemented
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
 @pytest.mark.parametrize('u', [1, -0.2, -0.3, 0])
 @pytest.mark.parametrize('v', [1, -0.3, 0, -1])
 @pytest.mark.parametrize('w', [None, 1, -0.3, 0, -1])
@@ -507,3 +597,21 @@ def test_uniform_analytical(pset_mode, mode, u, v, w, direction, tmpdir):
     assert np.allclose(times, timeref)
     lons = dataset.variables['lon'][:]
     assert np.allclose(lons, x0+direction*u*np.arange(0, 5))
+
+
+@pytest.mark.parametrize('pset_mode', pset_modes)
+@pytest.mark.parametrize('direction', [1, -1])
+def test_analytical_jit_vs_scipy(pset_mode, fieldset_decaying, direction, npart=4):
+    fieldset = fieldset_decaying
+    fieldset.U.interp_method = 'cgrid_velocity'
+    fieldset.V.interp_method = 'cgrid_velocity'
+    lon = np.linspace(12000, 21000, npart)
+    lat = np.linspace(12500, 13500, npart)
+    starttime = delta(hours=1 if direction > 0 else 4).total_seconds()
+    psets = [pset_type[pset_mode]['pset'](fieldset, pclass=ptype[mode], lon=lon, lat=lat, time=starttime)
+             for mode in ['scipy', 'jit']]
+    for pset in psets:
+        pset.execute(AdvectionAnalytical, runtime=delta(hours=2), dt=direction)
+    assert np.allclose(psets[0].time, psets[1].time)
+    assert np.allclose(psets[0].lon, psets[1].lon, rtol=1e-5)
+    assert np.allclose(psets[0].lat, psets[1].lat, rtol=1e-5)
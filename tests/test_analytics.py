@@ -0,0 +1,84 @@
+from parcels import (FieldSet, Field, ParticleSet, ScipyParticle, JITParticle, Variable, ParticleBinning, TransitionMatrix)
+import numpy as np
+import pytest
+
+ptype = {'scipy': ScipyParticle, 'jit': JITParticle}
+
+
+def fieldset(xdim=20, ydim=20):
+    """ Standard unit mesh fieldset with a uniform eastward flow"""
+    lon = np.linspace(0., 1., xdim, dtype=np.float32)
+    lat = np.linspace(0., 1., ydim, dtype=np.float32)
+    data = {'U': 0.1 * np.ones((ydim, xdim), dtype=np.float32), 'V': np.zeros((ydim, xdim), dtype=np.float32)}
+    dimensions = {'lat': lat, 'lon': lon}
+    return FieldSet.from_data(data, dimensions, mesh='flat')
+
+
+@pytest.fixture(name="fieldset")
+def fieldset_fixture(xdim=20, ydim=20):
+    return fieldset(xdim=xdim, ydim=ydim)
+
+
+def MoveEast(particle, fieldset, time):
+    particle.lon += fieldset.U[time, particle.depth, particle.lat, particle.lon] * particle.dt
+    particle.depth += 0.1 * particle.dt
+
+
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+@pytest.mark.parametrize('weighted', [False, True])
+def test_binning_2d(fieldset, mode, weighted, npart=50):
+    class WeightParticle(ptype[mode]):
+        w = Variable('w', dtype=np.float32)
+
+    lon = np.random.uniform(0, 0.5, npart)
+    lat = np.random.uniform(0, 1, npart)
+    w = np.random.uniform(0, 1, npart)
+    pset = ParticleSet(fieldset, pclass=WeightParticle, lon=lon, lat=lat, w=w)
+    lon_edges = np.linspace(0, 1, 11)
+    lat_edges = np.linspace(0, 1, 6)
+    binning = ParticleBinning(lon_edges, lat_edges, weight='w' if weighted else None, outputdt=1)
+    pset.execute(MoveEast, runtime=3, dt=0.5, analytics=binning)
+
+    expected = np.zeros((5, 10))
+    for t in range(4):
+        expected += np.histogram2d(lat, lon + 0.1 * t, bins=[lat_edges, lon_edges], weights=w if weighted else None)[0]
+    assert binning.nsamples == 4
+    assert np.allclose(binning.counts, expected, rtol=1e-5)
+    assert np.allclose(binning.mean, expected / 4, rtol=1e-5)
+
+    # a next execute continues the accumulation, without sampling the shared time twice
+    pset.execute(MoveEast, runtime=1, dt=0.5, analytics=binning)
+    assert binning.nsamples == 5
+
+
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+def test_binning_3d(fieldset, mode, npart=20):
+    pset = ParticleSet(fieldset, pclass=ptype[mode], lon=np.linspace(0, 0.5, npart), lat=np.linspace(0, 1, npart))
+    binning = ParticleBinning(np.linspace(0, 1, 5), np.linspace(0, 1, 3), depth_edges=[0, 0.15, 1], outputdt=1)
+    pset.execute(MoveEast, runtime=2, dt=1, analytics=binning)
+    assert binning.counts.shape == (2, 2, 4)
+    assert np.isclose(binning.counts[0].sum(), 2 * npart)  # the samples at time 0 and 1 are at depth < 0.15
+    assert np.isclose(binning.counts.sum(), 3 * npart)
+
+
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+def test_transition_matrix(fieldset, mode, npart=10):
+    # four regions of 0.25 wide in longitude, and no region in the upper half of the domain
+    lon, lat = np.linspace(0, 1, 41), np.linspace(0, 1, 41)
+    region_ids = np.tile(np.minimum(lon // 0.25, 3), (lat.size, 1))
+    region_ids[lat > 0.5, :] = -1
+    regions = Field('regions', region_ids, lon=lon, lat=lat, mesh='flat')
+
+    pset = ParticleSet(fieldset, pclass=ptype[mode], lon=np.full(npart, 0.05), lat=np.linspace(0.05, 0.95, npart),
+                       repeatdt=2)
+    tm = TransitionMatrix(regions, outputdt=1)
+    pset.execute(MoveEast, runtime=4, dt=0.5, analytics=tm)
+
+    # particles move 0.1 eastward per outputdt, and so from region 0 to region 1 after two outputdt
+    assert tm.nregions == 4
+    assert np.all(tm.source == 0)
+    assert np.array_equal(tm.destination, [0, 0, 1, 1, 1])
+    assert np.array_equal(tm.lag, [0, 1, 2, 3, 4])
+    # releases at time 0, 2 and 4 of npart/2 particles in the regions
+    assert np.array_equal(tm.count, [15, 10, 10, 5, 5])
+    assert tm.matrix(2).toarray()[0, 1] == 10
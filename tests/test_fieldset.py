@@ -816,6 +816,25 @@ def test_fieldset_defer_loading_with_diff_time_origin(pset_mode, tmpdir, fail, f
     pset.execute(AdvectionRK4_3D, runtime=delta(hours=4), dt=delta(hours=1))
 
 
+@pytest.mark.parametrize('chunksize', [None, {'time': ('time', 1), 'lat': ('lat', 4), 'lon': ('lon', 4)}])
+@pytest.mark.parametrize('scale_fac', [None, 2])
+def test_fieldset_defer_loading_rescale(chunksize, scale_fac, tmpdir, tdim=4, vmin=-0.8, vmax=0.6):
+    data = np.random.randn(tdim, 10, 10).astype(np.float32)
+    data[data > 1.2] = np.nan
+    xr.Dataset({'U': (('time', 'lat', 'lon'), data), 'V': (('time', 'lat', 'lon'), data)},
+               coords={'time': np.arange(tdim) * 3600., 'lat': np.arange(10.), 'lon': np.arange(10.)}).to_netcdf(str(tmpdir.join('rescale.nc')))
+    fieldset = FieldSet.from_netcdf(str(tmpdir.join('rescale.nc')), {'U': 'U', 'V': 'V'},
+                                    {'lat': 'lat', 'lon': 'lon', 'time': 'time'}, chunksize=chunksize, vmin=vmin, vmax=vmax)
+    if scale_fac:
+        fieldset.U.set_scaling_factor(scale_fac)
+    fieldset.computeTimeChunk(0, 1)
+
+    expected = np.where(np.isnan(data[:2]), 0, data[:2]) * (scale_fac or 1)
+    expected[(expected < vmin) | (expected > vmax)] = 0
+    assert isinstance(fieldset.U.data, np.ndarray if chunksize is None else da.core.Array)
+    assert np.allclose(np.array(fieldset.U.data), expected)
+
+
 @pytest.mark.parametrize('pset_mode', pset_modes)
 @pytest.mark.parametrize('zdim', [2, 8])
 @pytest.mark.parametrize('scale_fac', [0.2, 4, 1])
@@ -937,6 +956,95 @@ def test_fieldset_from_xarray(pset_mode, tdim):
         assert np.allclose(pset.lon[0], 5.0) and np.allclose(pset.lat[0], 10)
 
 
+@pytest.mark.parametrize('pset_mode', pset_modes)
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+@pytest.mark.parametrize('dt', [600., -600.])
+def test_fieldset_from_xarray_deferred_load(pset_mode, mode, dt, tdim=6):
+    lon = np.linspace(0., 1e5, 11, dtype=np.float32)
+    lat = np.linspace(0., 1e5, 11, dtype=np.float32)
+    time = np.arange(tdim) * 86400.
+    U = 0.05 * np.random.rand(tdim, lat.size, lon.size).astype(np.float32)
+    V = 0.05 * np.random.rand(tdim, lat.size, lon.size).astype(np.float32)
+    ds = xr.Dataset({'Uxr': (('time', 'lat', 'lon'), U), 'Vxr': (('time', 'lat', 'lon'), V)},
+                    coords={'time': time, 'lat': lat, 'lon': lon}).chunk({'time': 1})
+    variables = {'U': 'Uxr', 'V': 'Vxr'}
+    dimensions = {'lat': 'lat', 'lon': 'lon', 'time': 'time'}
+
+    lons = {}
+    for deferred_load in [True, False]:
+        fieldset = FieldSet.from_xarray_dataset(ds, variables, dimensions, mesh='flat', deferred_load=deferred_load)
+        assert fieldset.U.grid.defer_load == deferred_load
+        pset = pset_type[pset_mode]['pset'](fieldset, ptype[mode], lon=[2e4, 5e4], lat=[2e4, 5e4], time=0 if dt > 0 else time[-1])
+        pset.execute(AdvectionRK4, runtime=time[-1] - 1, dt=dt)
+        if deferred_load:
+            assert fieldset.U.data.shape[0] < tdim
+        lons[deferred_load] = pset.lon
+    assert np.allclose(lons[True], lons[False])
+
+
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+@pytest.mark.parametrize('chunksize', [None, 'auto'])
+def test_fieldset_concurrent_loading(mode, chunksize, tmpdir, tdim=6):
+    lon = np.linspace(0., 1e5, 20, dtype=np.float32)
+    lat = np.linspace(0., 1e5, 20, dtype=np.float32)
+    time = np.arange(tdim) * 86400.
+    variables = {'U': 'U', 'V': 'V', 'T': 'T', 'S': 'S'}
+    filenames = {}
+    for var in variables:
+        scale = 0.05 if var in ['U', 'V'] else 10
+        data = scale * np.random.rand(tdim, lat.size, lon.size).astype(np.float32)
+        filenames[var] = str(tmpdir.join('%s.nc' % var))
+        xr.Dataset({var: (('time', 'lat', 'lon'), data)}, coords={'time': time, 'lat': lat, 'lon': lon}).to_netcdf(filenames[var])
+    dimensions = {'lat': 'lat', 'lon': 'lon', 'time': 'time'}
+
+    class SampleParticle(ptype[mode]):
+        temp = Variable('temp', dtype=np.float32)
+        salt = Variable('salt', dtype=np.float32)
+
+    def Sample(particle, fieldset, time):
+        particle.temp = fieldset.T[time, particle.depth, particle.lat, particle.lon]
+        particle.salt = fieldset.S[time, particle.depth, particle.lat, particle.lon]
+
+    results = []
+    for io_workers in [1, None]:
+        fieldset = FieldSet.from_netcdf(filenames, variables, dimensions, mesh='flat', chunksize=chunksize)
+        fieldset.io_workers = io_workers
+        pset = ParticleSetSOA(fieldset, SampleParticle, lon=[2e4, 5e4], lat=[2e4, 5e4])
+        pset.execute(AdvectionRK4 + pset.Kernel(Sample), runtime=time[-1] - 1, dt=3600)
+        results.append(np.array([pset.lon, pset.lat, pset.temp, pset.salt]))
+    assert np.allclose(results[0], results[1])
+
+
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+@pytest.mark.parametrize('chunksize', ['auto', {'lat': ('lat', 15), 'lon': ('lon', 12)}, None])
+def test_fieldset_from_zarr(mode, chunksize, tmpdir, tdim=6):
+    lon = np.linspace(0., 1e5, 40, dtype=np.float32)
+    lat = np.linspace(0., 1e5, 30, dtype=np.float32)
+    time = np.arange(tdim) * 86400.
+    U = 0.05 * np.random.rand(tdim, lat.size, lon.size).astype(np.float32)
+    V = 0.05 * np.random.rand(tdim, lat.size, lon.size).astype(np.float32)
+    ds = xr.Dataset({'U': (('time', 'lat', 'lon'), U), 'V': (('time', 'lat', 'lon'), V)},
+                    coords={'time': time, 'lat': lat, 'lon': lon})
+    ds.to_netcdf(str(tmpdir.join('field.nc')))
+    ds.chunk({'time': 1, 'lat': 10, 'lon': 10}).to_zarr(str(tmpdir.join('field.zarr')))
+    variables = {'U': 'U', 'V': 'V'}
+    dimensions = {'lat': 'lat', 'lon': 'lon', 'time': 'time'}
+
+    fieldset = FieldSet.from_zarr(tmpdir.join('field.zarr'), variables, dimensions, mesh='flat', chunksize=chunksize)
+    assert fieldset.U.creation_log == 'from_zarr'
+    pset = ParticleSetSOA(fieldset, ptype[mode], lon=[2e4, 5e4], lat=[2e4, 5e4])
+    pset.execute(AdvectionRK4, runtime=time[-1] - 1, dt=600)
+    if mode == 'jit' and chunksize is not None:
+        # chunks are aligned to whole zarr chunks, and only those around the particles are loaded
+        assert all(c % 10 == 0 for c in fieldset.U.data.chunks[-1][:-1])
+        assert 0 < np.count_nonzero(fieldset.U.grid.load_chunk) < len(fieldset.U.grid.load_chunk)
+
+    fieldset_nc = FieldSet.from_netcdf(tmpdir.join('field.nc'), variables, dimensions, mesh='flat')
+    pset_nc = ParticleSetSOA(fieldset_nc, ptype[mode], lon=[2e4, 5e4], lat=[2e4, 5e4])
+    pset_nc.execute(AdvectionRK4, runtime=time[-1] - 1, dt=600)
+    assert np.allclose(pset.lon, pset_nc.lon) and np.allclose(pset.lat, pset_nc.lat)
+
+
 @pytest.mark.parametrize('pset_mode', pset_modes)
 @pytest.mark.parametrize('mode', ['scipy', 'jit'])
 def test_fieldset_frompop(pset_mode, mode):
@@ -1028,3 +1136,38 @@ def test_deferredload_simplefield(pset_mode, mode, direction, time_extrapolation
     runtime = tdim*2 if time_extrapolation else None
     pset.execute(SampleU, dt=direction, runtime=runtime)
     assert pset.p == tdim-1 if time_extrapolation else tdim-2
+
+
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+@pytest.mark.parametrize('chunksize', [None, {'time': ('time', 1), 'lat': ('lat', 4), 'lon': ('lon', 4)}])
+@pytest.mark.parametrize('direction', [1, -1])
+def test_fieldset_time_snapshot(mode, chunksize, direction, tmpdir, tdim=6):
+    lon = np.linspace(0., 100., 21, dtype=np.float32)
+    lat = np.linspace(0., 100., 11, dtype=np.float32)
+    time = np.arange(tdim) * 10.
+    U = (0.1 + 0.02 * time[:, None, None]) * (1 + lon[None, None, :] / 100.) * np.ones((tdim, lat.size, lon.size))
+    xr.Dataset({'U': (('time', 'lat', 'lon'), U.astype(np.float32)), 'V': (('time', 'lat', 'lon'), np.zeros(U.shape, dtype=np.float32)),
+                'P': (('time', 'lat', 'lon'), (0.1 + 0.02 * time[:, None, None]) * np.ones(U.shape, dtype=np.float32))},
+               coords={'time': time, 'lat': lat, 'lon': lon}).to_netcdf(str(tmpdir.join('snapshot.nc')))
+
+    class SampleParticle(ptype[mode]):
+        p = Variable('p', dtype=np.float32)
+
+    def SampleP(particle, fieldset, time):
+        particle.p = fieldset.P[time, particle.depth, particle.lat, particle.lon]
+
+    results = {}
+    for snapshot_dt in [None, 5]:
+        fieldset = FieldSet.from_netcdf(str(tmpdir.join('snapshot.nc')), {'U': 'U', 'V': 'V', 'P': 'P'},
+                                        {'lat': 'lat', 'lon': 'lon', 'time': 'time'}, mesh='flat', chunksize=chunksize)
+        pset = ParticleSetSOA(fieldset, SampleParticle, lon=[35, 40, 55], lat=[50, 50, 20], time=0 if direction == 1 else time[-1])
+        pset.execute(AdvectionRK4 + pset.Kernel(SampleP), runtime=30, dt=direction, snapshot_dt=snapshot_dt)
+        assert all(g.snapshot_time is None for g in fieldset.gridset.grids)
+        results[snapshot_dt] = (pset.lon, pset.p)
+
+    # the last sample is taken at 29 (or 21 backward), which is in the snapshot interval [25, 30] (or [20, 25])
+    tsample, tsnapshot = (29, 27.5) if direction == 1 else (21, 22.5)
+    assert np.allclose(results[None][1], 0.1 + 0.02 * tsample, rtol=1e-5)
+    assert np.allclose(results[5][1], 0.1 + 0.02 * tsnapshot, rtol=1e-5)
+    # the velocity is linear in time, so that RK4 with a snapshot at the middle of each interval stays close
+    assert np.allclose(results[None][0], results[5][0], rtol=1e-5)
@@ -136,6 +136,26 @@ def test_fieldset_sample_eval(fieldset, xdim=60, ydim=60):
     assert np.allclose(u_s, lat, rtol=1e-7)
 
 
+def test_fieldset_sample_search_memo(fieldset, monkeypatch):
+    """ Sample U and V, which share a Grid, at the same location with a single index search. """
+    assert fieldset.U.grid is fieldset.V.grid
+    search = fieldset.U.search_indices_rectilinear
+    ncalls = []
+
+    def counting_search(*args, **kwargs):
+        ncalls.append(1)
+        return search(*args, **kwargs)
+    monkeypatch.setattr(fieldset.U, 'search_indices_rectilinear', counting_search)
+    monkeypatch.setattr(fieldset.V, 'search_indices_rectilinear', counting_search)
+
+    for lon in [-45., 30.]:
+        v_s = fieldset.V.eval(0, 0., 70., lon)
+        u_s = fieldset.U.eval(0, 0., 70., lon)
+        assert np.isclose(v_s, lon, rtol=1e-7)
+        assert np.isclose(u_s, 70., rtol=1e-7)
+    assert len(ncalls) == 2
+
+
 @pytest.mark.parametrize('pset_mode', pset_modes)
 @pytest.mark.parametrize('mode', ['scipy', 'jit'])
 def test_fieldset_polar_with_halo(fieldset_geometric_polar, pset_mode, mode):
@@ -234,6 +254,105 @@ def test_nearest_neighbour_interpolation3D(pset_mode, mode, k_sample_p, npart=81
     assert np.allclose(pset.p[(pset.lon > 0.5) | (pset.lat < 0.5) & (pset.depth < 0.5)], 0.0, rtol=1e-5)
 
 
+@pytest.mark.parametrize('pset_mode', pset_modes)
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+@pytest.mark.parametrize('uniform', [True, False])
+@pytest.mark.parametrize('depth_sign', [1, -1])
+def test_sampling_uniform_and_stretched_axes(pset_mode, mode, uniform, depth_sign, k_sample_p, npart=50):
+    s = np.linspace(0., 1., 101, dtype=np.float32)
+    lon = 100 * s if uniform else 100 * s**2
+    lat = 50 * s if uniform else 50 * np.sin(s * np.pi/2)
+    depth = depth_sign * np.linspace(0., 1000., 21, dtype=np.float32)
+    if not uniform:
+        depth = depth_sign * 1000 * np.linspace(0., 1., 21, dtype=np.float32)**3
+    lons, lats, depths = np.meshgrid(lon, lat, depth, indexing='ij')
+    data = {'U': np.zeros(lons.shape, dtype=np.float32),
+            'V': np.zeros(lons.shape, dtype=np.float32),
+            'P': (lons + 10 * lats + depth_sign * depths / 100).astype(np.float32)}
+    fieldset = FieldSet.from_data(data, {'lon': lon, 'lat': lat, 'depth': depth}, mesh='flat', transpose=True)
+    assert (fieldset.P.grid.axis_spacing('lon') > 0) == uniform
+    assert (fieldset.P.grid.axis_spacing('lat') > 0) == uniform
+
+    np.random.seed(1234)
+    lonp = np.random.uniform(0, 100, npart)
+    latp = np.random.uniform(0, 50, npart)
+    depthp = depth_sign * np.random.uniform(0, 1000, npart)
+    pset = pset_type[pset_mode]['pset'](fieldset, pclass=pclass(mode), lon=lonp, lat=latp, depth=depthp)
+    pset.execute(k_sample_p, endtime=1, dt=1)
+    assert np.allclose(pset.p, lonp + 10 * latp + depth_sign * depthp / 100, rtol=1e-4)
+
+
+@pytest.mark.parametrize('pset_mode', pset_modes)
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+def test_fieldset_sample_multiple_fields(pset_mode, mode, npart=20):
+    lon = np.linspace(0., 10., 11, dtype=np.float32)
+    lat = np.linspace(0., 5., 6, dtype=np.float32)
+    lons, lats = np.meshgrid(lon, lat)
+    data = {'U': np.zeros(lons.shape, dtype=np.float32),
+            'V': np.zeros(lons.shape, dtype=np.float32),
+            'T': lons.astype(np.float32),
+            'S': lats.astype(np.float32),
+            'P': (lons * lats).astype(np.float32)}
+    fieldset = FieldSet.from_data(data, {'lon': lon, 'lat': lat}, mesh='flat')
+    lon_r = np.linspace(0., 10., 21, dtype=np.float32)
+    fieldset.add_field(Field('R', np.tile(lon_r, (lat.size, 1)), lon=lon_r, lat=lat, mesh='flat'))
+    assert fieldset.T.grid is fieldset.S.grid and fieldset.R.grid is not fieldset.T.grid
+
+    class MultiParticle(ptype[mode]):
+        t = Variable('t', dtype=np.float32)
+        s = Variable('s', dtype=np.float32)
+        p = Variable('p', dtype=np.float32)
+        r = Variable('r', dtype=np.float32)
+        p_single = Variable('p_single', dtype=np.float32)
+
+    def SampleMulti(particle, fieldset, time):
+        particle.t, particle.s, particle.p, particle.r = fieldset.sample(['T', 'S', 'P', 'R'], particle)
+        particle.p_single = fieldset.P[time, particle.depth, particle.lat, particle.lon]
+
+    np.random.seed(1234)
+    lonp = np.random.uniform(0, 10, npart)
+    latp = np.random.uniform(0, 5, npart)
+    pset = pset_type[pset_mode]['pset'](fieldset, pclass=MultiParticle, lon=lonp, lat=latp)
+    pset.execute(SampleMulti, endtime=1, dt=1)
+    assert np.allclose(pset.t, lonp, rtol=1e-5)
+    assert np.allclose(pset.s, latp, rtol=1e-5)
+    assert np.allclose(pset.r, lonp, rtol=1e-5)
+    assert np.allclose(pset.p, pset.p_single)
+
+
+@pytest.mark.parametrize('pset_mode', pset_modes)
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+def test_sampling_repeated_in_concatenated_kernels(pset_mode, mode, npart=10):
+    lon = np.linspace(0., 10., 11, dtype=np.float32)
+    lat = np.linspace(0., 5., 6, dtype=np.float32)
+    lons, lats = np.meshgrid(lon, lat)
+    data = {'U': np.zeros(lons.shape, dtype=np.float32),
+            'V': np.zeros(lons.shape, dtype=np.float32),
+            'T': lons.astype(np.float32)}
+    fieldset = FieldSet.from_data(data, {'lon': lon, 'lat': lat}, mesh='flat')
+
+    class SampleParticle(ptype[mode]):
+        a = Variable('a', dtype=np.float32)
+        b = Variable('b', dtype=np.float32)
+        c = Variable('c', dtype=np.float32)
+
+    def SampleA(particle, fieldset, time):
+        particle.a = fieldset.T[time, particle.depth, particle.lat, particle.lon]
+
+    def MoveAndSampleBC(particle, fieldset, time):
+        particle.b = fieldset.T[time, particle.depth, particle.lat, particle.lon]
+        particle.lon += 1
+        particle.c = fieldset.T[time, particle.depth, particle.lat, particle.lon]
+        particle.c += fieldset.T[time, particle.depth, particle.lat, particle.lon]
+
+    lonp = np.linspace(1, 8, npart)
+    pset = pset_type[pset_mode]['pset'](fieldset, pclass=SampleParticle, lon=lonp, lat=np.ones(npart))
+    pset.execute(pset.Kernel(SampleA) + MoveAndSampleBC, endtime=1, dt=1)
+    assert np.allclose(pset.a, lonp, rtol=1e-5)
+    assert np.allclose(pset.b, lonp, rtol=1e-5)
+    assert np.allclose(pset.c, 2 * (lonp + 1), rtol=1e-5)
+
+
 @pytest.mark.parametrize('pset_mode', pset_modes)
 @pytest.mark.parametrize('mode', ['scipy', 'jit'])
 @pytest.mark.parametrize('arrtype', ['ones', 'rand'])
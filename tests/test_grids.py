@@ -355,6 +355,42 @@ def test_curvilinear_grids(pset_mode, mode):
     assert(np.allclose(pset.speed[0], 1000))
 
 
+@pytest.mark.parametrize('pset_mode', pset_modes)
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+def test_curvilinear_grid_seed_index(pset_mode, mode):
+    x = np.linspace(100, 1e3, 91, dtype=np.float32)
+    y = np.linspace(0, 1e3, 61, dtype=np.float32)
+    (xx, yy) = np.meshgrid(x, y)
+    theta = np.arctan2(yy, xx) + np.pi/6.
+    r = np.sqrt(xx*xx+yy*yy)
+    lon = r * np.cos(theta)
+    lat = r * np.sin(theta)
+    grid = CurvilinearZGrid(lon, lat)
+
+    assert grid.seed_index.shape[2] == 2
+    (xi, yi) = grid.search_start(lon[50, 80], lat[50, 80])
+    assert abs(xi - 80) < 10 and abs(yi - 50) < 10
+    # a valid first guess close to the location is kept
+    assert grid.search_start(lon[50, 80], lat[50, 80], 80, 50) == (80, 50)
+
+    fieldset = FieldSet(Field('U', lon, grid=grid, transpose=False), Field('V', lat, grid=grid, transpose=False))
+
+    def sampleLonLat(particle, fieldset, time):
+        particle.u = fieldset.U[time, particle.depth, particle.lat, particle.lon]
+        particle.v = fieldset.V[time, particle.depth, particle.lat, particle.lon]
+
+    class MyParticle(ptype[mode]):
+        u = Variable('u', dtype=np.float32, initial=0.)
+        v = Variable('v', dtype=np.float32, initial=0.)
+
+    lonp = [lon[55, 85] + 1, lon[3, 4] + 1, lon[30, 60] - 1]
+    latp = [lat[55, 85] + 1, lat[3, 4] + 1, lat[30, 60] - 1]
+    pset = pset_type[pset_mode]['pset'].from_list(fieldset, MyParticle, lon=lonp, lat=latp)
+    pset.execute(pset.Kernel(sampleLonLat), runtime=0, dt=0)
+    assert np.allclose(pset.u, lonp, rtol=1e-4)
+    assert np.allclose(pset.v, latp, rtol=1e-4)
+
+
 @pytest.mark.parametrize('pset_mode', pset_modes)
 @pytest.mark.parametrize('mode', ['scipy', 'jit'])
 def test_nemo_grid(pset_mode, mode):
@@ -1,9 +1,10 @@
 from os import path
 from parcels import (
-    FieldSet, ScipyParticle, JITParticle, StateCode, OperationCode, ErrorCode, KernelError,
+    FieldSet, ScipyParticle, JITParticle, StateCode, OperationCode, ErrorCode, KernelError, Variable,
     OutOfBoundsError, AdvectionRK4
 )
 from parcels import ParticleSetSOA, ParticleFileSOA, KernelSOA  # noqa
+from parcels.compilation.codecompiler import compiler_profiles, GNU_parameters
 from parcels import ParticleSetAOS, ParticleFileAOS, KernelAOS  # noqa
 import numpy as np
 import pytest
@@ -302,3 +303,118 @@ def test_execution_keep_cfiles_and_nocompilation_warnings(pset_mode, fieldset, d
         assert path.exists(cfile)
         with open(logfile) as f:
             assert 'warning' not in f.read(), 'Compilation WARNING in log file'
+
+
+@pytest.mark.parametrize('pset_mode', pset_modes)
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="compiler profiles are only defined for the GNU compiler")
+def test_execution_compiler_profiles(pset_mode, fieldset, monkeypatch):
+    lons = {}
+    for profile in ['debug', 'default', 'fast', 'native']:
+        pset = pset_type[pset_mode]['pset'](fieldset, pclass=JITParticle, lon=[0.2, 0.5], lat=[0.3, 0.1])
+        pset.execute(AdvectionRK4, endtime=0.5, dt=0.1, compiler_profile=profile)
+        assert pset.kernel.compiler_profile == profile
+        assert set(compiler_profiles[profile]) <= set(GNU_parameters(profile=profile).cppargs)
+        lons[profile] = pset.lon
+    for profile in lons:
+        assert np.allclose(lons[profile], lons['default'], rtol=1e-5)
+
+    monkeypatch.setenv('PARCELS_COMPILER_PROFILE', 'debug')
+    pset = pset_type[pset_mode]['pset'](fieldset, pclass=JITParticle, lon=[0.2], lat=[0.3])
+    pset.execute(AdvectionRK4, endtime=0.1, dt=0.1)
+    assert pset.kernel.compiler_profile == 'debug'
+    with pytest.raises(ValueError):
+        pset.execute(AdvectionRK4, endtime=0.2, dt=0.1, compiler_profile='unknown')
+
+
+@pytest.mark.parametrize('pset_mode', pset_modes)
+def test_execution_kernel_registry(pset_mode, fieldset):
+    def MoveEast(particle, fieldset, time):
+        particle.lon += 0.01
+
+    pset = pset_type[pset_mode]['pset'](fieldset, pclass=JITParticle, lon=[0.2, 0.5], lat=[0.3, 0.1])
+    pset.execute(AdvectionRK4, endtime=0.1, dt=0.1)
+    kernel_rk4 = pset.kernel
+    pset.execute(MoveEast, endtime=0.2, dt=0.1)
+    kernel_east = pset.kernel
+    assert kernel_east is not kernel_rk4
+    pset.execute(AdvectionRK4, endtime=0.3, dt=0.1)
+    assert pset.kernel is kernel_rk4
+    pset.execute(pset.Kernel(AdvectionRK4) + MoveEast, endtime=0.4, dt=0.1)
+    kernel_merged = pset.kernel
+    pset.execute(pset.Kernel(AdvectionRK4) + MoveEast, endtime=0.5, dt=0.1)
+    assert pset.kernel is kernel_merged
+    pset.execute(MoveEast, endtime=0.6, dt=0.1)
+    assert pset.kernel is kernel_east
+    assert np.allclose(pset.time, 0.6)
+
+    pset.density()
+    kernel_search = pset.kernel
+    pset.density()
+    assert pset.kernel is kernel_search
+
+
+@pytest.mark.parametrize('pset_mode', pset_modes)
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+def test_execution_dt_buckets(pset_mode, mode, fieldset):
+    class StepParticle(ptype[mode]):
+        nsteps = Variable('nsteps', dtype=np.int32, initial=0)
+
+    def Step(particle, fieldset, time):
+        particle.lon += particle.dt
+        particle.nsteps += 1
+        if particle.lat > 0.5:
+            particle.update_next_dt(0.03)
+
+    pset = pset_type[pset_mode]['pset'](fieldset, pclass=StepParticle, lon=np.zeros(4), lat=[0.1, 0.7, 0.2, 0.9])
+    if pset_mode == 'aos':
+        with pytest.raises(NotImplementedError):
+            pset.execute(Step, runtime=0.4, dt=0.1, dt_buckets=True)
+        return
+    pset.execute(Step, runtime=0.4, dt=0.1, dt_buckets=True)
+    assert np.allclose(pset.time, 0.4)
+    assert np.allclose(pset.lon, 0.4)
+    # the requested dt of 0.03 is rounded down to the bucket of 0.1/4
+    assert np.array_equal(pset.nsteps, [4, 13, 4, 13])
+
+
+@pytest.mark.parametrize('pset_mode', pset_modes)
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+def test_execution_state_reset_between_outputs(pset_mode, mode, fieldset, tmpdir, npart=10):
+    class CountParticle(ptype[mode]):
+        nsteps = Variable('nsteps', dtype=np.int32, initial=0)
+
+    def DeleteLate(particle, fieldset, time):
+        particle.nsteps += 1
+        if time >= 3. and particle.lat > 0.45:
+            particle.delete()
+
+    pset = pset_type[pset_mode]['pset'](fieldset, pclass=CountParticle, lon=np.zeros(npart),
+                                        lat=np.linspace(0, 1, npart))
+    output_file = pset.ParticleFile(name=tmpdir.join("pfile_state_reset.nc"), outputdt=1.)
+    pset.execute(DeleteLate, runtime=6., dt=1., output_file=output_file)
+    # particles are evaluated again after every output time, and deleted particles are removed
+    assert len(pset) == npart // 2
+    assert np.allclose(pset.time, 6.)
+    assert np.array_equal(pset.nsteps, 6 * np.ones(npart // 2))
+    assert all([p.state == StateCode.Success for p in pset])
+    output_file.close()
+
+
+def test_execution_cstruct_reuse(fieldset):
+    def MoveEast(particle, fieldset, time):
+        particle.lon += fieldset.U[time, particle.depth, particle.lat, particle.lon] * particle.dt
+
+    pset = pset_type['soa']['pset'](fieldset, pclass=JITParticle, lon=[0.2, 0.5], lat=[0.3, 0.1])
+    pset.execute(MoveEast, endtime=0.1, dt=0.1)
+    field_cstruct = fieldset.U.ctypes_struct
+    pset_cstruct = pset.ctypes_struct
+    pset.execute(MoveEast, endtime=0.2, dt=0.1)
+    assert fieldset.U.ctypes_struct is field_cstruct
+    assert pset.ctypes_struct is pset_cstruct
+    # adding particles reallocates the particle arrays, which are then pointed to by the same struct
+    pset.add(pset_type['soa']['pset'](fieldset, pclass=JITParticle, lon=[0.4], lat=[0.9]))
+    pset.execute(MoveEast, endtime=0.3, dt=0.1)
+    assert pset.ctypes_struct is pset_cstruct
+    assert np.allclose(pset.time, 0.3)
+    # U equals lon, so each step of dt=0.1 multiplies lon by 1.1
+    assert np.allclose(pset.lon, np.array([0.2, 0.5, 0.4]) * 1.1**3)
@@ -6,6 +6,7 @@ from parcels import ParticleSetAOS, ParticleFileAOS, KernelAOS  # noqa
 import numpy as np
 import pytest
 import os
+import math
 from netCDF4 import Dataset
 import cftime
 import random as py_random
@@ -326,3 +327,36 @@ def test_reset_dt(fieldset, pset_mode, mode, tmpdir):
     pset.execute(pset.Kernel(Update_lon), endtime=0.1, dt=0.02, output_file=ofile)
 
     assert np.allclose(pset.lon, .6)
+
+
+@pytest.mark.parametrize('pset_mode', pset_modes)
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+@pytest.mark.parametrize('dt', [0.02, -0.02])
+def test_output_in_kernel(fieldset, pset_mode, mode, tmpdir, dt, npart=5):
+    class MyParticle(ptype[mode]):
+        v_once = Variable('v_once', dtype=np.float64, initial=0., to_write='once')
+        age = Variable('age', dtype=np.float32, initial=0.)
+
+    def Update(particle, fieldset, time):
+        particle.lon += 0.1
+        particle.age += particle.dt
+        if particle.age * math.copysign(1, particle.dt) > 0.5 and particle.lat > 0.5:
+            particle.delete()
+
+    ncfiles = []
+    for output_in_kernel in [False, True]:
+        filepath = tmpdir.join("pfile_output_in_kernel_%s.nc" % output_in_kernel)
+        time = np.linspace(0, 0.2, npart) if dt > 0 else np.linspace(1, 0.8, npart)
+        pset = pset_type[pset_mode]['pset'](fieldset, pclass=MyParticle, lon=np.zeros(npart), lat=np.linspace(0, 1, npart),
+                                            time=time, v_once=np.arange(npart))
+        ofile = pset.ParticleFile(name=filepath, outputdt=0.05)
+        ofile.kernel_output_slots = 4
+        pset.execute(Update, runtime=0.8, dt=dt, output_file=ofile, output_in_kernel=output_in_kernel)
+        assert len(pset) == 3
+        ofile.close()
+        ncfiles.append(Dataset(filepath, 'r', 'NETCDF4'))
+
+    for v in ['lon', 'lat', 'time', 'age', 'v_once']:
+        assert np.allclose(np.ma.filled(ncfiles[0].variables[v][:], np.nan),
+                           np.ma.filled(ncfiles[1].variables[v][:], np.nan), equal_nan=True)
+    [f.close() for f in ncfiles]
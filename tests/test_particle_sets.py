@@ -3,6 +3,7 @@ from parcels import (FieldSet, Field, ScipyParticle, JITParticle,
 from parcels import ParticleSetSOA, ParticleFileSOA, KernelSOA  # noqa
 from parcels import ParticleSetAOS, ParticleFileAOS, KernelAOS  # noqa
 import numpy as np
+import xarray as xr
 import pytest
 
 pset_modes = ['soa', 'aos']
@@ -102,6 +103,71 @@ def test_pset_create_fromparticlefile(fieldset, pset_mode, mode, restart, tmpdir
     assert len(pset_new) == 3*len(pset)
 
 
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+@pytest.mark.parametrize('restarttime', [None, np.nanmin, 1])
+def test_pset_create_fromparticlefile_blocks(fieldset, mode, restarttime, tmpdir, monkeypatch, npart=10):
+    filename = tmpdir.join("pset_fromparticlefile_blocks.nc")
+
+    class TestParticle(ptype[mode]):
+        p = Variable('p', np.float32, initial=0.)
+        p2 = Variable('p2', np.float32, initial=0., to_write=False)
+
+    def Kernel(particle, fieldset, time):
+        particle.p += particle.lat
+        particle.p2 += 1.
+        if particle.lat > 0.75 and time >= 1:
+            particle.delete()
+
+    pset = pset_type['soa']['pset'](fieldset, lon=np.zeros(npart), lat=np.linspace(0, 1, npart), pclass=TestParticle)
+    pfile = pset.ParticleFile(filename, outputdt=1)
+    pset.execute(Kernel, runtime=3, dt=1, output_file=pfile)
+    pfile.close()
+    pset.to_snapshot(tmpdir.join("snapshot"))
+
+    monkeypatch.setattr(pset_type['soa']['pset'], 'restart_chunk_size', 8)  # read the file in blocks of two trajectories
+    pset_file = pset_type['soa']['pset'].from_particlefile(fieldset, pclass=TestParticle, filename=filename, restarttime=restarttime)
+    ds = xr.open_dataset(filename, decode_times=False)
+    time = ds['time'].values
+    restarttime = np.nanmax(time) if restarttime is None else restarttime(time) if callable(restarttime) else restarttime
+    traj, obs = np.where(time == restarttime)
+    assert np.allclose(pset_file.lat, ds['lat'].values[traj, obs])
+    assert np.allclose(pset_file.p, ds['p'].values[traj, obs])
+    assert np.allclose(pset_file.id, ds['trajectory'].values[traj, obs])
+    assert np.allclose(pset_file.time, restarttime)
+    ds.close()
+
+    # a snapshot also holds variables that are not written to the particlefile
+    pset_snapshot = pset_type['soa']['pset'].from_particlefile(fieldset, pclass=TestParticle, filename=tmpdir.join("snapshot"))
+    for var in ['lon', 'lat', 'time', 'id', 'p', 'p2']:
+        assert np.allclose(getattr(pset_snapshot, var), getattr(pset, var))
+
+
+@pytest.mark.parametrize('mode', ['scipy', 'jit'])
+def test_pset_checkpoint_restore(fieldset, mode, tmpdir, npart=10):
+    class TestParticle(ptype[mode]):
+        p = Variable('p', np.float32, initial=0., to_write=False)
+
+    def Kernel(particle, fieldset, time):
+        particle.lon += fieldset.U[time, particle.depth, particle.lat, particle.lon] * particle.dt
+        particle.p += 1.
+        if particle.lat > 0.75 and time >= 2:
+            particle.delete()
+
+    pset = pset_type['soa']['pset'](fieldset, lon=np.zeros(npart), lat=np.linspace(0, 1, npart),
+                                    pclass=TestParticle, repeatdt=2)
+    pset.execute(Kernel, runtime=3, dt=0.5)
+    pset.checkpoint(tmpdir.join("checkpoint"))
+    pset.execute(Kernel, runtime=3, dt=0.5)
+
+    # restoring also resets the particle ID counter, so that repeated releases get the same IDs
+    pset_restored = pset_type['soa']['pset'].restore(tmpdir.join("checkpoint"), fieldset, pclass=TestParticle)
+    assert np.all(pset_restored.time == 3)
+    pset_restored.execute(Kernel, runtime=3, dt=0.5)
+    assert len(pset_restored) == len(pset)
+    for var in ['lon', 'lat', 'time', 'id', 'p', 'xi', 'yi', 'state']:
+        assert np.array_equal(getattr(pset_restored, var), getattr(pset, var))
+
+
 @pytest.mark.parametrize('pset_mode', pset_modes)
 @pytest.mark.parametrize('mode', ['scipy'])
 @pytest.mark.parametrize('lonlatdepth_dtype', [np.float64, np.float32])
@@ -1,8 +1,9 @@
-from parcels import (FieldSet, JITParticle, AdvectionRK4, plotTrajectoriesFile)
+from parcels import (FieldSet, JITParticle, AdvectionRK4, plotTrajectoriesFile, renderTrajectoriesFile)
 from parcels import ParticleSetSOA, ParticleFileSOA, KernelSOA  # noqa
 from parcels import ParticleSetAOS, ParticleFileAOS, KernelAOS  # noqa
 from datetime import timedelta as delta
 import numpy as np
+import xarray as xr
 import pytest
 from os import path
 from parcels.tools.loggers import logger
@@ -48,3 +49,19 @@ def test_plotting(pset_mode, mode, tmpdir):
         return
     fp = create_outputfiles(tmpdir, pset_mode)
     plotTrajectoriesFile(fp, mode=mode, show_plt=False)
+
+
+@pytest.mark.parametrize('mode', ['positions', 'trajectories'])
+def test_render_frames(mode, tmpdir):
+    fp = create_outputfiles(tmpdir, 'soa')
+    frametimes, images = renderTrajectoriesFile(fp, mode=mode, resolution=(20, 10), chunksize=50)
+
+    ds = xr.open_dataset(fp, decode_times=False)
+    time = ds['time'].values
+    ds.close()
+    assert np.array_equal(frametimes, np.unique(time[np.isfinite(time)]))
+    assert images.shape == (len(frametimes), 10, 20)
+    npositions = np.array([np.count_nonzero(time == t) for t in frametimes])
+    if mode == 'trajectories':
+        npositions = np.cumsum(npositions)
+    assert np.allclose(images.sum(axis=(1, 2)), npositions)